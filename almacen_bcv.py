@@ -0,0 +1,250 @@
+"""
+Almacen binario compacto de tasas (memory-mapped)
+Guarda compra/venta en una matriz densa dia x moneda de ancho fijo, de modo
+que la consulta (fecha, moneda) es un calculo de posicion sobre un mmap sin
+parseo. Varios procesos que abren el mismo archivo comparten la cache de
+paginas del sistema operativo en lugar de cargar cada uno su propia copia.
+
+Formato (little-endian, secciones alineadas a 8 bytes):
+- encabezado (64 bytes): magic, version, primer dia, dias, monedas,
+  fechas publicadas y firma del CSV de origen
+- monedas: codigo ASCII de 8 bytes por moneda
+- paises: nombre UTF-8 de 64 bytes por moneda
+- fechas publicadas: int32 (dias desde 1970-01-01), ordenadas
+- tasas: float64 [dias calendario x monedas x (compra, venta)], NaN si no hay dato
+"""
+
+import mmap
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from datos_bcv import ARCHIVO_CSV, fechas_a_dias, dias_a_fechas, firma_csv
+from fechas_bcv import IndiceFechas, dia_de
+
+
+MAGIC = b'BCVTASAS'
+VERSION_ALMACEN = 1
+ENCABEZADO = struct.Struct('<8sIiIIIqq')
+TAMANO_ENCABEZADO = 64
+ANCHO_MONEDA = 8
+ANCHO_PAIS = 64
+
+
+def ruta_almacen(archivo_csv=ARCHIVO_CSV):
+    """Ruta del almacén binario que acompaña a un CSV"""
+    return str(Path(archivo_csv).with_suffix('.tasas'))
+
+
+def _alinear(posicion):
+    return (posicion + 7) // 8 * 8
+
+
+def _secciones(n_dias, n_monedas, n_publicadas):
+    """Posiciones de cada sección dentro del archivo"""
+    monedas = TAMANO_ENCABEZADO
+    paises = monedas + n_monedas * ANCHO_MONEDA
+    publicadas = _alinear(paises + n_monedas * ANCHO_PAIS)
+    tasas = _alinear(publicadas + n_publicadas * 4)
+    fin = tasas + n_dias * n_monedas * 16
+    return monedas, paises, publicadas, tasas, fin
+
+
+def construir_almacen(df, archivo_csv=ARCHIVO_CSV, archivo_salida=None):
+    """
+    Construye el almacén binario a partir del dataset consolidado.
+    Se escribe en un archivo temporal y se reemplaza de forma atómica para
+    no afectar a los procesos que ya lo tienen abierto.
+    """
+    archivo_salida = archivo_salida or ruta_almacen(archivo_csv)
+
+    dias = fechas_a_dias(df['fecha'].to_numpy(dtype=str))
+    monedas = sorted(df['moneda'].unique().tolist())
+    indice_moneda = {m: i for i, m in enumerate(monedas)}
+
+    # País más reciente de cada moneda
+    cronologico = df.iloc[np.argsort(dias, kind='stable')]
+    paises = dict(zip(cronologico['moneda'], cronologico['pais'].fillna('').astype(str)))
+
+    primer_dia = int(dias.min())
+    n_dias = int(dias.max()) - primer_dia + 1
+    publicadas = np.unique(dias).astype('<i4')
+
+    tasas = np.full((n_dias, len(monedas), 2), np.nan, dtype='<f8')
+    filas = dias - primer_dia
+    columnas = np.array([indice_moneda[m] for m in df['moneda'].tolist()], dtype=np.intp)
+    tasas[filas, columnas, 0] = df['compra_bs'].to_numpy(dtype=np.float64)
+    tasas[filas, columnas, 1] = df['venta_bs'].to_numpy(dtype=np.float64)
+
+    tamano_csv, mtime_csv = firma_csv(archivo_csv) if os.path.exists(archivo_csv) else (0, 0)
+    pos_monedas, pos_paises, pos_publicadas, pos_tasas, fin = _secciones(n_dias, len(monedas), len(publicadas))
+
+    contenido = bytearray(fin)
+    ENCABEZADO.pack_into(contenido, 0, MAGIC, VERSION_ALMACEN, primer_dia, n_dias,
+                         len(monedas), len(publicadas), int(tamano_csv), int(mtime_csv))
+    contenido[pos_monedas:pos_paises] = np.array(monedas, dtype=f'S{ANCHO_MONEDA}').tobytes()
+    contenido[pos_paises:pos_paises + len(monedas) * ANCHO_PAIS] = np.array(
+        [paises[m].encode('utf-8')[:ANCHO_PAIS] for m in monedas], dtype=f'S{ANCHO_PAIS}').tobytes()
+    contenido[pos_publicadas:pos_publicadas + publicadas.nbytes] = publicadas.tobytes()
+    contenido[pos_tasas:fin] = tasas.tobytes()
+
+    temporal = archivo_salida + '.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(contenido)
+    os.replace(temporal, archivo_salida)
+
+    return archivo_salida
+
+
+class AlmacenTasas:
+    def __init__(self, archivo=None):
+        self.archivo = archivo or ruta_almacen()
+
+        with open(self.archivo, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.primer_dia, self.n_dias, n_monedas, n_publicadas,
+         tamano_csv, mtime_csv) = ENCABEZADO.unpack_from(self._mmap, 0)
+
+        if magic != MAGIC or version != VERSION_ALMACEN:
+            self._mmap.close()
+            raise ValueError(f"Archivo de tasas no valido: {self.archivo}")
+
+        self.firma_csv = (tamano_csv, mtime_csv)
+        pos_monedas, pos_paises, pos_publicadas, self._pos_tasas, _ = _secciones(
+            self.n_dias, n_monedas, n_publicadas)
+
+        # El diccionario de monedas es pequeño; las tasas se leen del mmap
+        self.monedas = [m.decode('ascii') for m in
+                        np.frombuffer(self._mmap, f'S{ANCHO_MONEDA}', n_monedas, pos_monedas)]
+        self.paises = {m: p.decode('utf-8') for m, p in zip(
+            self.monedas, np.frombuffer(self._mmap, f'S{ANCHO_PAIS}', n_monedas, pos_paises))}
+        self._indice = {m: i for i, m in enumerate(self.monedas)}
+        self._fila = n_monedas * 16
+
+        # Vistas sin copia sobre el mmap
+        self.dias_publicados = np.frombuffer(self._mmap, '<i4', n_publicadas, pos_publicadas)
+        self.tasas = np.frombuffer(self._mmap, '<f8', self.n_dias * n_monedas * 2,
+                                   self._pos_tasas).reshape(self.n_dias, n_monedas, 2)
+        self._indice_fechas = None
+
+    @classmethod
+    def abrir_vigente(cls, archivo_csv=ARCHIVO_CSV, archivo=None):
+        """
+        Abre el almacén si existe y fue generado a partir del CSV actual.
+        Retorna None si falta o está desactualizado.
+        """
+        archivo = archivo or ruta_almacen(archivo_csv)
+        if not os.path.exists(archivo):
+            return None
+
+        try:
+            almacen = cls(archivo)
+        except (OSError, ValueError, struct.error):
+            return None
+
+        if os.path.exists(archivo_csv) and almacen.firma_csv != tuple(firma_csv(archivo_csv).tolist()):
+            almacen.cerrar()
+            return None
+
+        return almacen
+
+    def cerrar(self):
+        # Las vistas de NumPy mantienen exportado el buffer; se sueltan primero
+        self.dias_publicados = self.tasas = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Aún hay vistas en uso fuera del almacén; se libera al recolectarlas
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+    def _dia(self, fecha_iso):
+        """Posición de la fecha en la matriz de tasas, o None si está fuera de rango"""
+        try:
+            dia = dia_de(fecha_iso) - self.primer_dia
+        except (TypeError, ValueError):
+            return None
+        return dia if 0 <= dia < self.n_dias else None
+
+    def tasa(self, fecha_iso, moneda):
+        """(compra_bs, venta_bs) de una moneda en una fecha, o None si no hay dato"""
+        dia = self._dia(fecha_iso)
+        columna = self._indice.get(moneda.upper())
+        if dia is None or columna is None:
+            return None
+
+        compra, venta = struct.unpack_from('<2d', self._mmap, self._pos_tasas + dia * self._fila + columna * 16)
+        if compra != compra:
+            return None
+        return compra, venta
+
+    def tasas_fecha(self, fecha_iso):
+        """{moneda: (compra_bs, venta_bs)} de una fecha, o None si no hay datos"""
+        dia = self._dia(fecha_iso)
+        if dia is None:
+            return None
+
+        fila = self.tasas[dia]
+        resultado = {
+            moneda: (float(fila[i, 0]), float(fila[i, 1]))
+            for i, moneda in enumerate(self.monedas)
+            if fila[i, 0] == fila[i, 0]
+        }
+        return resultado or None
+
+    def registro(self, fecha_iso, moneda):
+        """
+        Tasa de una moneda en una fecha con el formato de los JSON generados
+        (pais, compra_bs, venta_bs, promedio_bs), o None si no hay dato
+        """
+        valores = self.tasa(fecha_iso, moneda)
+        if valores is None:
+            return None
+        return self.formato_registro(moneda.upper(), *valores)
+
+    def registros_fecha(self, fecha_iso):
+        """Igual que tasas_fecha, con el formato de tipos_cambio_por_fecha.json"""
+        tasas = self.tasas_fecha(fecha_iso)
+        if tasas is None:
+            return None
+        return {moneda: self.formato_registro(moneda, *valores) for moneda, valores in tasas.items()}
+
+    def formato_registro(self, moneda, compra, venta):
+        """Registro con el formato de los JSON generados"""
+        return {
+            'pais': self.paises[moneda],
+            'compra_bs': round(compra, 8),
+            'venta_bs': round(venta, 8),
+            'promedio_bs': round((compra + venta) / 2, 8)
+        }
+
+    def historico(self, moneda):
+        """
+        (fechas, compra, venta) de una moneda en orden cronológico, solo en
+        las fechas con dato publicado
+        """
+        columna = self._indice.get(moneda.upper())
+        if columna is None:
+            return None
+
+        serie = self.tasas[:, columna, :]
+        dias = np.flatnonzero(~np.isnan(serie[:, 0]))
+        return dias_a_fechas(dias + self.primer_dia), serie[dias, 0], serie[dias, 1]
+
+    def indice_fechas(self):
+        """Índice de fechas publicadas (se construye en la primera llamada)"""
+        if self._indice_fechas is None:
+            self._indice_fechas = IndiceFechas.desde_dias(self.dias_publicados)
+        return self._indice_fechas
+
+    def fechas(self):
+        """Fechas publicadas ('YYYY-MM-DD') en orden cronológico"""
+        return dias_a_fechas(self.dias_publicados).tolist()
@@ -0,0 +1,162 @@
+"""
+Benchmark de los generadores JSON agrupados
+Genera un dataset sintetico de N anios (dias habiles x monedas), mide los
+agrupamientos de ConvertidorJSON (por fecha, por moneda y estadisticas) y los
+compara con la implementacion anterior (mascara booleana + iterrows por grupo),
+verificando que el resultado sea identico
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from convertir_json import ConvertidorJSON
+
+
+MONEDAS = {
+    'ANG': 'Curazao', 'ARS': 'Argentina', 'BOB': 'Bolivia', 'BRL': 'Brasil', 'CAD': 'Canada',
+    'CLP': 'Chile', 'CNY': 'China', 'COP': 'Colombia', 'CUC': 'Cuba', 'DOP': 'Republica Dominicana',
+    'EUR': 'Zona Euro', 'INR': 'India', 'JPY': 'Japon', 'MXP': 'Mexico', 'NIO': 'Nicaragua',
+    'PEN': 'Perú', 'RUB': 'Rusia', 'TRY': 'Turquia', 'TTD': 'Trinidad y Tobago', 'USD': 'E.U.A.',
+    'UYU': 'Uruguay'
+}
+
+
+def dataset_sintetico(anios, semilla=0):
+    """Dataset con la forma del consolidado: una fila por día hábil y moneda"""
+    rng = np.random.default_rng(semilla)
+    dias = pd.bdate_range(end='2025-10-14', periods=int(anios * 252))
+    monedas = list(MONEDAS)
+
+    # Caminata aleatoria multiplicativa por moneda
+    base = rng.uniform(0.01, 80, len(monedas))
+    pasos = rng.normal(0.0005, 0.01, (len(dias), len(monedas)))
+    compra = base * np.exp(np.cumsum(pasos, axis=0))
+    venta = compra * rng.uniform(1.001, 1.004, compra.shape)
+
+    fechas = np.repeat(dias.strftime('%Y-%m-%d').to_numpy(), len(monedas))
+    trimestres = np.repeat([f"2_1_2{'abcd'[(d.month - 1) // 3]}{d.year % 100}_smc.xls" for d in dias],
+                           len(monedas))
+    return pd.DataFrame({
+        'fecha': fechas,
+        'moneda': np.tile(monedas, len(dias)),
+        'pais': np.tile([MONEDAS[m] for m in monedas], len(dias)),
+        'compra_bs': compra.ravel().round(8),
+        'venta_bs': venta.ravel().round(8),
+        'fuente': trimestres,
+        'origen_fecha': 'fecha_valor'
+    })
+
+
+# Implementación anterior, como referencia de tiempo y de resultado
+
+def por_fecha_referencia(df):
+    datos_por_fecha = {}
+    for fecha in df['fecha'].unique():
+        datos_fecha = df[df['fecha'] == fecha]
+        monedas = {}
+        for _, row in datos_fecha.iterrows():
+            monedas[row['moneda']] = {
+                'pais': row['pais'],
+                'compra_bs': round(row['compra_bs'], 8),
+                'venta_bs': round(row['venta_bs'], 8),
+                'promedio_bs': round((row['compra_bs'] + row['venta_bs']) / 2, 8)
+            }
+        datos_por_fecha[fecha] = monedas
+    return datos_por_fecha
+
+
+def por_moneda_referencia(df):
+    datos_por_moneda = {}
+    for moneda in df['moneda'].unique():
+        datos_moneda = df[df['moneda'] == moneda].sort_values('fecha', ascending=False)
+        historico = []
+        for _, row in datos_moneda.iterrows():
+            historico.append({
+                'fecha': row['fecha'],
+                'compra_bs': round(row['compra_bs'], 8),
+                'venta_bs': round(row['venta_bs'], 8),
+                'promedio_bs': round((row['compra_bs'] + row['venta_bs']) / 2, 8),
+                'fuente': row['fuente']
+            })
+        datos_por_moneda[moneda] = {
+            'pais': datos_moneda.iloc[0]['pais'],
+            'total_registros': len(historico),
+            'fecha_inicio': datos_moneda['fecha'].min(),
+            'fecha_fin': datos_moneda['fecha'].max(),
+            'historico': historico
+        }
+    return datos_por_moneda
+
+
+def estadisticas_referencia(df):
+    stats_por_moneda = {}
+    for moneda in df['moneda'].unique():
+        datos_moneda = df[df['moneda'] == moneda]
+        stats_por_moneda[moneda] = {
+            'pais': datos_moneda.iloc[0]['pais'],
+            'registros': len(datos_moneda),
+            'compra_min': round(datos_moneda['compra_bs'].min(), 2),
+            'compra_max': round(datos_moneda['compra_bs'].max(), 2),
+            'compra_promedio': round(datos_moneda['compra_bs'].mean(), 2),
+            'venta_min': round(datos_moneda['venta_bs'].min(), 2),
+            'venta_max': round(datos_moneda['venta_bs'].max(), 2),
+            'venta_promedio': round(datos_moneda['venta_bs'].mean(), 2)
+        }
+    return stats_por_moneda
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, time.perf_counter() - inicio
+
+
+def ejecutar(anios, referencia=True):
+    print(f"\n{'Anios':>5} {'Filas':>9}  {'Generador':<14} {'Anterior (s)':>13} {'Actual (s)':>11} {'Mejora':>8}  Igual")
+    print('-' * 78)
+
+    for n in anios:
+        df = dataset_sintetico(n)
+
+        with tempfile.TemporaryDirectory() as temporal:
+            archivo = os.path.join(temporal, 'consolidado.csv')
+            df.to_csv(archivo, index=False, encoding='utf-8-sig')
+            with contextlib.redirect_stdout(io.StringIO()):
+                conversor = ConvertidorJSON(archivo)
+
+        casos = [
+            ('por_fecha', conversor.datos_por_fecha, por_fecha_referencia),
+            ('por_moneda', conversor.datos_por_moneda, por_moneda_referencia),
+            ('estadisticas', conversor.estadisticas_por_moneda, estadisticas_referencia)
+        ]
+        for nombre, actual, anterior in casos:
+            resultado, segundos = medir(actual)
+            if referencia:
+                esperado, segundos_ref = medir(lambda: anterior(conversor.df))
+                print(f"{n:>5g} {len(df):>9,}  {nombre:<14} {segundos_ref:>13.3f} {segundos:>11.3f} "
+                      f"{segundos_ref / segundos:>7.1f}x  {'si' if resultado == esperado else 'NO'}")
+            else:
+                print(f"{n:>5g} {len(df):>9,}  {nombre:<14} {'-':>13} {segundos:>11.3f} {'-':>8}  -")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de los generadores JSON sobre datos sinteticos')
+    parser.add_argument('--anios', type=float, nargs='+', default=[1, 2, 5, 10],
+                        help='Tamanos del dataset en anios (default: 1 2 5 10)')
+    parser.add_argument('--sin-referencia', action='store_true',
+                        help='No medir la implementacion anterior (lenta en datasets grandes)')
+    args = parser.parse_args()
+
+    ejecutar(args.anios, not args.sin_referencia)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Cache de resultados de consultas
+LRU acotado por numero de entradas y por antiguedad (TTL), con contadores
+de aciertos, fallos y desalojos para monitoreo
+"""
+
+import time
+from collections import OrderedDict
+
+
+class CacheConsultas:
+    def __init__(self, max_entradas=128, ttl=300):
+        """
+        max_entradas: entradas que se conservan antes de desalojar la menos usada
+        ttl: segundos que vale una entrada (None: sin vencimiento)
+        """
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.vencidas = 0
+        self.invalidaciones = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obtener(self, clave):
+        """Valor guardado para la clave, o None si no está o ya venció"""
+        entrada = self._entradas.get(clave)
+        if entrada is not None:
+            guardado, valor = entrada
+            if self.ttl is None or time.monotonic() - guardado < self.ttl:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return valor
+
+            del self._entradas[clave]
+            self.vencidas += 1
+
+        self.fallos += 1
+        return None
+
+    def guardar(self, clave, valor):
+        """Guarda un valor; si se supera el límite se desaloja el menos usado"""
+        if self.max_entradas <= 0:
+            return
+        self._entradas[clave] = (time.monotonic(), valor)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.desalojos += 1
+
+    def invalidar(self):
+        """Descarta todas las entradas (por ejemplo, al cambiar los datos)"""
+        self._entradas.clear()
+        self.invalidaciones += 1
+
+    def estadisticas(self):
+        """Contadores de uso del cache"""
+        consultas = self.aciertos + self.fallos
+        return {
+            'entradas': len(self._entradas),
+            'max_entradas': self.max_entradas,
+            'ttl': self.ttl,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0,
+            'desalojos': self.desalojos,
+            'vencidas': self.vencidas,
+            'invalidaciones': self.invalidaciones
+        }
@@ -3,15 +3,35 @@ Interfaz de Consulta Interactiva para Tipos de Cambio BCV
 Permite buscar tasas de cambio por fecha y visualizar tablas
 """
 
-import pandas as pd
+import argparse
+import contextlib
+import os
 import sys
-from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from almacen_bcv import AlmacenTasas, ruta_almacen
+from cache_bcv import CacheConsultas
+from datos_bcv import cargar_consolidado, dias_a_fechas
+from fechas_bcv import IndiceFechas, SerieTasas, fechas_a_dias_validas, normalizar_fecha, resolver_lote
+from formato_bcv import con_encabezados, escribir_registros, opciones_paginacion, paginar, tabla_texto
+
+
+def _invertir(tramo):
+    """El mismo tramo (slice con paso 1) recorrido en orden inverso"""
+    if tramo.stop <= tramo.start:
+        return slice(0, 0)
+    return slice(tramo.stop - 1, tramo.start - 1 if tramo.start else None, -1)
 
 
 class ConsultaBCV:
-    def __init__(self, archivo_csv='tipos_cambio_bcv_consolidado.csv'):
+    def __init__(self, archivo_csv='tipos_cambio_bcv_consolidado.csv', max_cache=128, ttl_cache=300):
+        self.archivo_csv = archivo_csv
+        # Resultados de consultar_fecha / consultar_moneda ya formateados
+        self._cache = CacheConsultas(max_cache, ttl_cache)
         try:
-            self.df = pd.read_csv(archivo_csv, encoding='utf-8-sig')
+            self._cargar()
             print(f"[OK] Base de datos cargada: {len(self.df)} registros")
             print(f"     Periodo: {self.df['fecha'].min()} a {self.df['fecha'].max()}")
             print(f"     Monedas: {self.df['moneda'].nunique()} diferentes\n")
@@ -20,45 +40,155 @@ class ConsultaBCV:
             print("    Ejecuta primero 'extractor_bcv.py' para generar los datos")
             sys.exit(1)
 
+    def _cargar(self):
+        """Carga el consolidado, construye el índice y abre el almacén binario"""
+        self._firma = self._firma_datos()
+        # Las series memorizadas (tasa_vigente) corresponden a los datos anteriores
+        self._series = {}
+        self.df = cargar_consolidado(self.archivo_csv)
+        self._construir_indice()
+        # Almacén binario para consultas puntuales (None si falta o está desactualizado)
+        self.almacen = AlmacenTasas.abrir_vigente(self.archivo_csv)
+
+    def _firma_datos(self):
+        """
+        Tamaño, fecha de modificación e inodo del CSV y del almacén (None si
+        falta alguno); el inodo distingue un archivo reemplazado de forma atómica
+        """
+        firma = []
+        for archivo in (self.archivo_csv, ruta_almacen(self.archivo_csv)):
+            try:
+                estado = os.stat(archivo)
+            except FileNotFoundError:
+                firma.append(None)
+            else:
+                firma.append((estado.st_size, estado.st_mtime_ns, estado.st_ino))
+        return tuple(firma)
+
+    def _verificar_datos(self):
+        """
+        Si el CSV o el almacén cambiaron desde la carga, recarga los datos y
+        descarta el cache. Mientras el CSV no exista se siguen usando los
+        datos ya cargados. Toda consulta pública la llama antes de leer el
+        DataFrame, el almacén o las series, para no mezclar versiones.
+        """
+        firma = self._firma_datos()
+        if firma == self._firma or firma[0] is None:
+            return
+
+        print("[*] Los datos cambiaron, recargando...")
+        if self.almacen is not None:
+            self.almacen.cerrar()
+        self._cargar()
+        self._cache.invalidar()
+
+    def estadisticas_cache(self):
+        """Contadores del cache de resultados (aciertos, fallos, desalojos, ...)"""
+        return self._cache.estadisticas()
+
+    def _construir_indice(self):
+        """
+        Índice de consulta, construido una vez al cargar:
+        - fechas ordenadas con el tramo contiguo de filas de cada una
+        - una segunda copia de las columnas ordenada por (moneda, fecha), con
+          el tramo contiguo de cada moneda, para que su histórico sea un
+          slice (vista) y no una selección por posiciones (copia)
+        """
+        fechas = self.df['fecha'].to_numpy(dtype=str)
+
+        # El consolidado ya viene ordenado por fecha; se reordena solo si no
+        if not (fechas[:-1] <= fechas[1:]).all():
+            orden = np.argsort(fechas, kind='stable')
+            self.df = self.df.iloc[orden]
+            fechas = fechas[orden]
+
+        self._fechas, inicios = np.unique(fechas, return_index=True)
+        self._limites = np.append(inicios, len(fechas))
+        self.indice_fechas = IndiceFechas(self._fechas)
+
+        # Columnas como arreglos de solo lectura: los resultados las referencian sin copiarlas
+        self._columnas = {
+            'indice': self.df.index.to_numpy(),
+            'fecha': fechas,
+            'moneda': self.df['moneda'].to_numpy(dtype=object),
+            'pais': self.df['pais'].to_numpy(dtype=object),
+            'compra_bs': self.df['compra_bs'].to_numpy(dtype=np.float64),
+            'venta_bs': self.df['venta_bs'].to_numpy(dtype=np.float64)
+        }
+
+        # Orden estable por moneda: dentro de cada moneda se conserva el orden por fecha
+        monedas = self.df['moneda'].astype(str).str.upper().to_numpy()
+        orden = np.argsort(monedas, kind='stable')
+        codigos, inicios = np.unique(monedas[orden], return_index=True)
+        limites = np.append(inicios, len(monedas))
+        self._tramos_moneda = {
+            moneda: slice(int(limites[i]), int(limites[i + 1])) for i, moneda in enumerate(codigos.tolist())
+        }
+        self._columnas_moneda = {nombre: columna[orden] for nombre, columna in self._columnas.items()}
+
+        for arreglo in (*self._columnas.values(), *self._columnas_moneda.values()):
+            arreglo.flags.writeable = False
+
+    def _tramo_fecha(self, fecha_iso):
+        """Tramo de filas de una fecha (slice), o None si no hay datos, por búsqueda binaria"""
+        i = np.searchsorted(self._fechas, fecha_iso)
+        if i == len(self._fechas) or self._fechas[i] != fecha_iso:
+            return None
+        return slice(self._limites[i], self._limites[i + 1])
+
+    def _filas_fecha(self, fecha_iso):
+        """Filas de una fecha (vacío si no hay datos)"""
+        tramo = self._tramo_fecha(fecha_iso)
+        return self.df.iloc[0:0] if tramo is None else self.df.iloc[tramo]
+
+    def _tabla(self, columnas, tramo, clave):
+        """
+        Resultado numérico de un tramo (slice) de columnas: clave ('fecha' o
+        'moneda'), pais, compra_bs, venta_bs y promedio_bs. Salvo
+        promedio_bs, las columnas son vistas de las de solo lectura.
+        """
+        compra = columnas['compra_bs'][tramo]
+        venta = columnas['venta_bs'][tramo]
+        return pd.DataFrame({
+            clave: columnas[clave][tramo],
+            'pais': columnas['pais'][tramo],
+            'compra_bs': compra,
+            'venta_bs': venta,
+            'promedio_bs': (compra + venta) / 2
+        }, index=columnas['indice'][tramo], copy=False)
+
     def normalizar_fecha(self, fecha_str):
         """Convierte diferentes formatos de fecha a ISO (YYYY-MM-DD)"""
-        formatos = [
-            '%Y-%m-%d',   # 2025-03-08
-            '%d/%m/%Y',   # 08/03/2025
-            '%m/%d/%Y',   # 03/08/2025
-            '%Y/%m/%d',   # 2025/03/08
-            '%d-%m-%Y',   # 08-03-2025
-        ]
-
-        # Intentar parseo directo
-        for fmt in formatos:
-            try:
-                fecha = datetime.strptime(fecha_str.strip(), fmt)
-                return fecha.strftime('%Y-%m-%d')
-            except:
-                continue
+        return normalizar_fecha(fecha_str)
+
+    def datos_fecha(self, fecha):
+        """
+        Tasas de una fecha como datos numéricos: DataFrame con moneda, pais,
+        compra_bs, venta_bs y promedio_bs (float64), o None si la fecha no es
+        valida o no hay datos
+        """
+        fecha_iso = self.normalizar_fecha(fecha)
+        if not fecha_iso:
+            return None
+        return self._datos_fecha(fecha_iso)
 
-        # Intentar parseo de texto: "marzo 8 2025"
-        try:
-            meses = {
-                'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4,
-                'mayo': 5, 'junio': 6, 'julio': 7, 'agosto': 8,
-                'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12
-            }
-            partes = fecha_str.lower().split()
-            if len(partes) == 3:
-                mes_texto, dia, anio = partes[0], partes[1], partes[2]
-                if mes_texto in meses:
-                    mes = meses[mes_texto]
-                    fecha = datetime(int(anio), mes, int(dia))
-                    return fecha.strftime('%Y-%m-%d')
-        except:
-            pass
-
-        return None
+    def _datos_fecha(self, fecha_iso):
+        self._verificar_datos()
+        clave = ('fecha', fecha_iso)
+        resultado = self._cache.obtener(clave)
+
+        if resultado is None:
+            tramo = self._tramo_fecha(fecha_iso)
+            if tramo is None:
+                return None
+            resultado = self._tabla(self._columnas, tramo, 'moneda')
+            self._cache.guardar(clave, resultado)
+
+        # Copia superficial: quien la modifique no altera la guardada en cache
+        return resultado.copy(deep=False)
 
     def consultar_fecha(self, fecha_busqueda):
-        """Consulta tipos de cambio por fecha"""
+        """Consulta tipos de cambio por fecha (con los encabezados de presentación)"""
         fecha_iso = self.normalizar_fecha(fecha_busqueda)
 
         if not fecha_iso:
@@ -69,54 +199,207 @@ class ConsultaBCV:
             print("    - marzo 8 2025")
             return None
 
-        # Filtrar datos
-        resultado = self.df[self.df['fecha'] == fecha_iso].copy()
+        resultado = self._datos_fecha(fecha_iso)
 
-        if resultado.empty:
+        if resultado is None:
             print(f"\n[!] No hay datos para la fecha: {fecha_iso}")
             self._sugerir_fechas_cercanas(fecha_iso)
             return None
 
-        # Formatear resultado
-        resultado_display = resultado[['moneda', 'pais', 'compra_bs', 'venta_bs']].copy()
-        resultado_display.columns = ['Moneda', 'Pais', 'Compra (Bs.)', 'Venta (Bs.)']
+        return con_encabezados(resultado)
+
+    def datos_moneda(self, codigo_moneda, fecha_desde=None, fecha_hasta=None):
+        """
+        Histórico de una moneda como datos numéricos, del más reciente al más
+        antiguo: DataFrame con fecha, pais, compra_bs, venta_bs y promedio_bs
+        (float64), o None si la moneda no existe. Las fechas no reconocidas no
+        filtran, igual que si no se indicaran. compra_bs y venta_bs son vistas
+        (en orden inverso) de las columnas ordenadas por moneda.
+        """
+        self._verificar_datos()
+        moneda = codigo_moneda.upper()
+        if moneda not in self._tramos_moneda:
+            return None
 
-        # Calcular promedio
-        resultado_display['Promedio (Bs.)'] = (
-            resultado_display['Compra (Bs.)'] + resultado_display['Venta (Bs.)']
-        ) / 2
+        fecha_desde_iso = self.normalizar_fecha(fecha_desde) if fecha_desde else None
+        fecha_hasta_iso = self.normalizar_fecha(fecha_hasta) if fecha_hasta else None
+
+        clave = ('moneda', moneda, fecha_desde_iso, fecha_hasta_iso)
+        resultado = self._cache.obtener(clave)
+
+        if resultado is None:
+            tramo = self._tramo_moneda(moneda, fecha_desde_iso, fecha_hasta_iso)
+            resultado = self._tabla(self._columnas_moneda, _invertir(tramo), 'fecha')
+            self._cache.guardar(clave, resultado)
+
+        return resultado.copy(deep=False)
+
+    def _tramo_moneda(self, moneda, fecha_desde_iso=None, fecha_hasta_iso=None):
+        """
+        Tramo (slice de las columnas por moneda) de una moneda dentro del
+        rango de fechas, en orden cronológico
+        """
+        # Las filas de la moneda están en orden cronológico: el rango es un tramo
+        tramo = self._tramos_moneda[moneda]
+        fechas = self._columnas_moneda['fecha'][tramo]
+        inicio = np.searchsorted(fechas, fecha_desde_iso, 'left') if fecha_desde_iso else 0
+        fin = np.searchsorted(fechas, fecha_hasta_iso, 'right') if fecha_hasta_iso else len(fechas)
+        return slice(tramo.start + int(inicio), tramo.start + int(max(inicio, fin)))
+
+    def iterar_moneda(self, codigo_moneda, fecha_desde=None, fecha_hasta=None):
+        """
+        Histórico de una moneda registro por registro, del más reciente al más
+        antiguo, sin armar la tabla completa: diccionarios con fecha, pais,
+        compra_bs, venta_bs y promedio_bs (redondeado a 8 decimales, como en
+        los JSON). No produce nada si la moneda no existe.
+        """
+        self._verificar_datos()
+        moneda = codigo_moneda.upper()
+        if moneda not in self._tramos_moneda:
+            return
 
-        return resultado_display
+        fecha_desde_iso = self.normalizar_fecha(fecha_desde) if fecha_desde else None
+        fecha_hasta_iso = self.normalizar_fecha(fecha_hasta) if fecha_hasta else None
+        columnas = self._columnas_moneda
+        tramo = self._tramo_moneda(moneda, fecha_desde_iso, fecha_hasta_iso)
+
+        for fila in range(tramo.stop - 1, tramo.start - 1, -1):
+            compra, venta = float(columnas['compra_bs'][fila]), float(columnas['venta_bs'][fila])
+            yield {
+                'fecha': str(columnas['fecha'][fila]),
+                'pais': columnas['pais'][fila],
+                'compra_bs': compra,
+                'venta_bs': venta,
+                'promedio_bs': round((compra + venta) / 2, 8)
+            }
 
     def consultar_moneda(self, codigo_moneda, fecha_desde=None, fecha_hasta=None):
-        """Consulta histórico de una moneda específica"""
-        datos = self.df[self.df['moneda'].str.upper() == codigo_moneda.upper()].copy()
+        """Consulta histórico de una moneda específica (con los encabezados de presentación)"""
+        resultado = self.datos_moneda(codigo_moneda, fecha_desde, fecha_hasta)
 
-        if datos.empty:
+        if resultado is None:
             print(f"[X] Moneda no encontrada: {codigo_moneda}")
             print(f"    Monedas disponibles: {', '.join(sorted(self.df['moneda'].unique()))}")
             return None
 
-        # Filtrar por rango de fechas si se especifica
-        if fecha_desde:
-            fecha_desde_iso = self.normalizar_fecha(fecha_desde)
-            if fecha_desde_iso:
-                datos = datos[datos['fecha'] >= fecha_desde_iso]
+        return con_encabezados(resultado)
+
+    def tasa(self, fecha, moneda='USD'):
+        """
+        Tasa de una moneda en una fecha: {'pais', 'compra_bs', 'venta_bs', 'promedio_bs'}
+        Retorna None si la fecha no es valida o no hay dato
+        """
+        fecha_iso = self.normalizar_fecha(fecha)
+        if not fecha_iso:
+            return None
 
-        if fecha_hasta:
-            fecha_hasta_iso = self.normalizar_fecha(fecha_hasta)
-            if fecha_hasta_iso:
-                datos = datos[datos['fecha'] <= fecha_hasta_iso]
+        # El almacén abierto al cargar puede haber sido reemplazado (queda
+        # mapeado el archivo anterior): se verifica antes de usarlo
+        self._verificar_datos()
+        if self.almacen is not None:
+            return self.almacen.registro(fecha_iso, moneda)
 
-        # Formatear resultado
-        resultado = datos[['fecha', 'pais', 'compra_bs', 'venta_bs']].copy()
-        resultado.columns = ['Fecha', 'Pais', 'Compra (Bs.)', 'Venta (Bs.)']
-        resultado['Promedio (Bs.)'] = (resultado['Compra (Bs.)'] + resultado['Venta (Bs.)']) / 2
+        fila = self._filas_fecha(fecha_iso)
+        fila = fila[fila['moneda'].str.upper() == moneda.upper()]
+        if fila.empty:
+            return None
 
-        return resultado.sort_values('Fecha', ascending=False)
+        fila = fila.iloc[0]
+        compra, venta = float(fila['compra_bs']), float(fila['venta_bs'])
+        return {
+            'pais': fila['pais'],
+            'compra_bs': round(compra, 8),
+            'venta_bs': round(venta, 8),
+            'promedio_bs': round((compra + venta) / 2, 8)
+        }
+
+    def _serie(self, moneda):
+        """Serie de tasas de una moneda (se construye en la primera consulta)"""
+        moneda = moneda.upper()
+        if moneda not in self._series:
+            tramo = self._tramos_moneda.get(moneda)
+            if tramo is None:
+                return None
+            columnas = self._columnas_moneda
+            self._series[moneda] = SerieTasas(columnas['fecha'][tramo], columnas['compra_bs'][tramo],
+                                              columnas['venta_bs'][tramo], str(columnas['pais'][tramo][-1]))
+        return self._series[moneda]
+
+    def tasa_vigente(self, fecha, moneda='USD', politica='anterior'):
+        """
+        Tasa de una moneda aplicable a una fecha cualquiera.
+        Politicas: 'anterior' (ultima tasa publicada, la vigente en fines de
+        semana y feriados), 'siguiente', 'cercana' o 'estricta' (solo la fecha exacta).
+        Retorna {'fecha', 'pais', 'compra_bs', 'venta_bs', 'promedio_bs'}, donde
+        'fecha' es la fecha de publicacion usada, o None si no hay tasa aplicable
+        """
+        self._verificar_datos()
+        fecha_iso = self.normalizar_fecha(fecha)
+        serie = self._serie(moneda)
+        if not fecha_iso or serie is None:
+            return None
+        return serie.vigente(fecha_iso, politica)
+
+    def tasas_vigentes(self, fechas, moneda='USD', politica='anterior'):
+        """
+        Version vectorizada de tasa_vigente para un arreglo de fechas (en
+        cualquier formato aceptado por normalizar_fecha). Retorna un DataFrame
+        con fecha_consulta, fecha, compra_bs, venta_bs y promedio_bs (NaN donde
+        no hay tasa aplicable o la fecha no se reconoce)
+        """
+        self._verificar_datos()
+        serie = self._serie(moneda)
+        if serie is None:
+            return None
+        return serie.vigentes(fechas, politica)
+
+    def tasas_lote(self, fechas, monedas='USD', politica='anterior'):
+        """
+        Consulta en lote: resuelve muchas combinaciones (fecha, moneda) de una
+        vez, con la misma politica de tasa_vigente.
+
+        Parámetros:
+        - fechas: arreglo de fechas (en cualquier formato aceptado por
+          normalizar_fecha), o un DataFrame con columnas 'fecha' y 'moneda'
+          (en ese caso se ignora monedas)
+        - monedas: un código para todas las fechas o un arreglo del mismo largo
+
+        Retorna un DataFrame alineado con la entrada con fecha, moneda,
+        fecha_tasa (publicacion usada), compra_bs, venta_bs y promedio_bs;
+        NaN donde no hay tasa aplicable, la fecha no se reconoce o la moneda no existe.
+        """
+        # Se verifica una vez al inicio: todo el lote se resuelve con los mismos datos
+        self._verificar_datos()
+        indice = None
+        if isinstance(fechas, pd.DataFrame):
+            indice = fechas.index
+            fechas, monedas = fechas['fecha'], fechas['moneda']
+
+        fechas = np.asarray(fechas, dtype=object)
+        total = len(fechas)
+        if np.ndim(monedas) == 0:
+            monedas = np.full(total, monedas, dtype=object)
+        monedas = np.asarray(monedas, dtype=object)
+
+        dias, validas = fechas_a_dias_validas(fechas)
+        dias_tasa, compra, venta = resolver_lote(self._serie, dias, monedas, politica, validas)
+
+        fecha_tasa = np.full(total, None, dtype=object)
+        resueltas = dias_tasa >= 0
+        fecha_tasa[resueltas] = dias_a_fechas(dias_tasa[resueltas])
+
+        return pd.DataFrame({
+            'fecha': fechas,
+            'moneda': monedas,
+            'fecha_tasa': fecha_tasa,
+            'compra_bs': compra,
+            'venta_bs': venta,
+            'promedio_bs': (compra + venta) / 2
+        }, index=indice)
 
     def listar_fechas_disponibles(self, anio=None, mes=None):
         """Lista todas las fechas disponibles, opcionalmente filtradas por año/mes"""
+        self._verificar_datos()
         fechas = pd.to_datetime(self.df['fecha'])
 
         if anio:
@@ -131,22 +414,14 @@ class ConsultaBCV:
 
     def listar_monedas(self):
         """Lista todas las monedas disponibles con su nombre de país"""
+        self._verificar_datos()
         monedas = self.df[['moneda', 'pais']].drop_duplicates().sort_values('moneda')
         return monedas
 
     def _sugerir_fechas_cercanas(self, fecha_iso, n=5):
         """Sugiere fechas cercanas a la solicitada"""
-        df = self.df.copy()
-        df['fecha_dt'] = pd.to_datetime(df['fecha'])
-        fecha_dt = pd.to_datetime(fecha_iso)
-
-        fechas_disponibles = df['fecha_dt'].unique()
-        fechas_cercanas = sorted(fechas_disponibles, key=lambda x: abs((x - fecha_dt).days))[:n]
-
         print(f"\n[*] Fechas disponibles mas cercanas:")
-        for f in fechas_cercanas:
-            fecha_f = pd.to_datetime(f)
-            dias_diff = (fecha_f - fecha_dt).days
+        for fecha_f, dias_diff in self.indice_fechas.cercanas(fecha_iso, n):
             if dias_diff > 0:
                 diff_str = f"(+{dias_diff} dias)"
             elif dias_diff < 0:
@@ -154,10 +429,13 @@ class ConsultaBCV:
             else:
                 diff_str = "(mismo dia)"
 
-            print(f"   - {fecha_f.strftime('%Y-%m-%d')} {diff_str}")
+            print(f"   - {fecha_f} {diff_str}")
 
-    def mostrar_tabla(self, df, titulo=None):
-        """Muestra un DataFrame formateado como tabla"""
+    def mostrar_tabla(self, df, titulo=None, max_filas=None):
+        """
+        Muestra un resultado como tabla, con los números a 2 decimales.
+        Con max_filas solo se formatean y muestran las primeras filas.
+        """
         if df is None or df.empty:
             return
 
@@ -166,14 +444,11 @@ class ConsultaBCV:
             print(f"{titulo:^80}")
             print('='*80)
 
-        # Formatear números con 2 decimales
-        df_display = df.copy()
-        for col in df_display.columns:
-            if df_display[col].dtype in ['float64', 'float32']:
-                df_display[col] = df_display[col].map(lambda x: f"{x:,.2f}")
-
-        print(df_display.to_string(index=False))
-        print(f"\nTotal de registros: {len(df)}\n")
+        print(tabla_texto(df, max_filas))
+        if max_filas is not None and len(df) > max_filas:
+            print(f"\nMostrando {max_filas} de {len(df)} registros\n")
+        else:
+            print(f"\nTotal de registros: {len(df)}\n")
 
 
 def menu_interactivo():
@@ -253,8 +528,51 @@ def consulta_rapida(fecha):
         consulta.mostrar_tabla(resultado, f"TIPOS DE CAMBIO - {fecha}")
 
 
+def consulta_moneda(argumentos):
+    """
+    Histórico de una moneda desde línea de comandos, escrito a medida que se
+    recorre (con paginación y salida en tabla, CSV o NDJSON)
+    """
+    parser = argparse.ArgumentParser(prog='consulta_bcv.py moneda', parents=[opciones_paginacion()],
+                                     description='Historico de una moneda')
+    parser.add_argument('codigo', help='Codigo de moneda (ej: USD, EUR)')
+    parser.add_argument('--hasta', default=None, help='Solo registros hasta esta fecha (inclusive)')
+    args = parser.parse_args(argumentos)
+
+    # En csv/ndjson la salida estándar lleva solo los datos
+    with contextlib.redirect_stdout(sys.stderr if args.formato != 'tabla' else sys.stdout):
+        for fecha in (args.desde, args.hasta):
+            if fecha and not normalizar_fecha(fecha):
+                print(f"[X] Formato de fecha invalido: {fecha}")
+                sys.exit(1)
+
+        consulta = ConsultaBCV()
+        if args.codigo.upper() not in consulta._tramos_moneda:
+            print(f"[X] Moneda no encontrada: {args.codigo}")
+            print(f"    Monedas disponibles: {', '.join(sorted(consulta.df['moneda'].unique()))}")
+            return
+
+    registros = paginar(consulta.iterar_moneda(args.codigo, args.desde, args.hasta), args.saltar, args.limite)
+    columnas = ['fecha', 'compra_bs', 'venta_bs', 'promedio_bs']
+
+    if args.formato != 'tabla':
+        escribir_registros(registros, columnas, args.formato)
+        return
+
+    print(f"\n{'='*70}")
+    print(f" HISTORICO {args.codigo.upper()} ".center(70, '='))
+    print('='*70)
+    print(f"\n{'Fecha':<15} {'Compra (Bs.)':>15} {'Venta (Bs.)':>15} {'Promedio':>15}")
+    print('-'*70)
+    mostrados = escribir_registros(registros, columnas)
+    print(f"\nRegistros mostrados: {mostrados}\n")
+
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 2 and sys.argv[1].lower() == 'moneda':
+        # Histórico de una moneda: python consulta_bcv.py moneda USD [--limite N] [--formato csv]
+        consulta_moneda(sys.argv[2:])
+    elif len(sys.argv) > 1:
         # Consulta rápida desde línea de comandos
         fecha = ' '.join(sys.argv[1:])
         consulta_rapida(fecha)
@@ -5,7 +5,12 @@ Permite buscar en los archivos JSON sin cargar CSV
 
 import json
 import sys
-from datetime import datetime
+from itertools import islice
+
+from almacen_bcv import AlmacenTasas
+from cruces_bcv import MotorCruces
+from fechas_bcv import IndiceFechas, SerieTasas, normalizar_fecha
+from formato_bcv import escribir_registros, opciones_paginacion, paginar
 
 
 class ConsultaJSON:
@@ -14,26 +19,53 @@ class ConsultaJSON:
         self.json_por_moneda = 'tipos_cambio_por_moneda.json'
         self.json_ultima = 'tipos_cambio_ultima.json'
         self.json_resumen = 'tipos_cambio_resumen.json'
+        # Si el almacén binario está vigente las consultas por fecha no leen JSON
+        self.almacen = AlmacenTasas.abrir_vigente()
+        self._series = {}
+        self._motor_cruces = None
+
+        # Sin almacén, el JSON por fecha y su índice se cargan una sola vez
+        self._por_fecha = None
+        self._indice_por_fecha = None
+        if self.almacen is None:
+            try:
+                self._datos_por_fecha()
+            except FileNotFoundError:
+                pass
+
+    def _datos_por_fecha(self):
+        """
+        Contenido de tipos_cambio_por_fecha.json, leído y con su índice de
+        fechas construido en la primera llamada.
+        Lanza FileNotFoundError si no existe.
+        """
+        if self._por_fecha is None:
+            with open(self.json_por_fecha, 'r', encoding='utf-8') as f:
+                self._por_fecha = json.load(f)
+            self._indice_por_fecha = IndiceFechas(self._por_fecha.keys())
+        return self._por_fecha
 
     def consultar_fecha(self, fecha):
         """Busca tasas de cambio por fecha (formato: YYYY-MM-DD o marzo 7 2025)"""
-        fecha_iso = self._normalizar_fecha(fecha)
+        fecha_iso = normalizar_fecha(fecha)
 
         if not fecha_iso:
             print(f"[X] Formato de fecha invalido: {fecha}")
             return None
 
         try:
-            with open(self.json_por_fecha, 'r', encoding='utf-8') as f:
-                datos = json.load(f)
+            if self.almacen is not None:
+                tasas = self.almacen.registros_fecha(fecha_iso)
+                indice = None if tasas else self.almacen.indice_fechas()
+            else:
+                tasas = self._datos_por_fecha().get(fecha_iso)
+                indice = None if tasas else self._indice_por_fecha
 
-            if fecha_iso not in datos:
+            if not tasas:
                 print(f"\n[!] No hay datos para la fecha: {fecha_iso}")
-                self._sugerir_fechas(fecha_iso, list(datos.keys()))
+                self._sugerir_fechas(fecha_iso, indice)
                 return None
 
-            tasas = datos[fecha_iso]
-
             print(f"\n{'='*80}")
             print(f" TIPOS DE CAMBIO - {fecha_iso} ".center(80, '='))
             print('='*80)
@@ -52,45 +84,253 @@ class ConsultaJSON:
             print("    Ejecuta 'python convertir_json.py' primero")
             return None
 
-    def consultar_moneda(self, codigo_moneda):
-        """Muestra historico de una moneda"""
-        try:
-            with open(self.json_por_moneda, 'r', encoding='utf-8') as f:
-                datos = json.load(f)
+    def tasa(self, fecha, moneda='USD'):
+        """
+        Tasa de una moneda en una fecha: {'pais', 'compra_bs', 'venta_bs', 'promedio_bs'}
+        Retorna None si la fecha no es valida o no hay dato
+        """
+        fecha_iso = normalizar_fecha(fecha)
+        if not fecha_iso:
+            return None
+
+        if self.almacen is not None:
+            return self.almacen.registro(fecha_iso, moneda)
 
-            moneda = codigo_moneda.upper()
+        return self._datos_por_fecha().get(fecha_iso, {}).get(moneda.upper())
 
-            if moneda not in datos:
+    def _serie(self, moneda):
+        """Serie de tasas de una moneda, desde el almacén o el JSON por moneda"""
+        moneda = moneda.upper()
+        if moneda not in self._series:
+            if self.almacen is not None:
+                historico = self.almacen.historico(moneda)
+                if historico is None:
+                    return None
+                self._series[moneda] = SerieTasas(*historico, self.almacen.paises[moneda])
+            else:
+                with open(self.json_por_moneda, 'r', encoding='utf-8') as f:
+                    info = json.load(f).get(moneda)
+                if info is None:
+                    return None
+                historico = info['historico']
+                self._series[moneda] = SerieTasas([h['fecha'] for h in historico],
+                                                  [h['compra_bs'] for h in historico],
+                                                  [h['venta_bs'] for h in historico], info['pais'])
+        return self._series[moneda]
+
+    def tasa_vigente(self, fecha, moneda='USD', politica='anterior'):
+        """
+        Tasa de una moneda aplicable a una fecha cualquiera.
+        Politicas: 'anterior' (ultima tasa publicada, la vigente en fines de
+        semana y feriados), 'siguiente', 'cercana' o 'estricta' (solo la fecha exacta).
+        Retorna {'fecha', 'pais', 'compra_bs', 'venta_bs', 'promedio_bs'}, donde
+        'fecha' es la fecha de publicacion usada, o None si no hay tasa aplicable
+        """
+        fecha_iso = normalizar_fecha(fecha)
+        serie = self._serie(moneda)
+        if not fecha_iso or serie is None:
+            return None
+        return serie.vigente(fecha_iso, politica)
+
+    def tasas_vigentes(self, fechas, moneda='USD', politica='anterior'):
+        """
+        Version vectorizada de tasa_vigente para un arreglo de fechas (en
+        cualquier formato aceptado por normalizar_fecha). Retorna un DataFrame
+        con fecha_consulta, fecha, compra_bs, venta_bs y promedio_bs (NaN donde
+        no hay tasa aplicable o la fecha no se reconoce)
+        """
+        serie = self._serie(moneda)
+        if serie is None:
+            return None
+        return serie.vigentes(fechas, politica)
+
+    def _historico(self, moneda):
+        """
+        Histórico de una moneda del más reciente al más antiguo como
+        (pais, fechas, registros), donde registros arma cada registro al
+        consumirlo. Retorna None si la moneda no existe.
+        """
+        if self.almacen is not None:
+            historico = self.almacen.historico(moneda)
+            if historico is None:
+                return None
+            fechas, compra, venta = (serie[::-1] for serie in historico)
+            registros = (
+                {'fecha': str(fecha), **self.almacen.formato_registro(moneda, float(c), float(v))}
+                for fecha, c, v in zip(fechas, compra, venta)
+            )
+            return self.almacen.paises[moneda], fechas, registros
+
+        with open(self.json_por_moneda, 'r', encoding='utf-8') as f:
+            info = json.load(f).get(moneda)
+        if info is None:
+            return None
+        return info['pais'], [h['fecha'] for h in info['historico']], iter(info['historico'])
+
+    def _monedas_disponibles(self):
+        if self.almacen is not None:
+            return sorted(self.almacen.monedas)
+        with open(self.json_por_moneda, 'r', encoding='utf-8') as f:
+            return sorted(json.load(f).keys())
+
+    def consultar_moneda(self, codigo_moneda, desde=None, limite=10, saltar=0, formato='tabla'):
+        """
+        Muestra historico de una moneda, del mas reciente al mas antiguo.
+        desde: solo fechas desde esta (inclusive); saltar y limite paginan
+        (limite=None: todos). Con formato 'csv' o 'ndjson' solo se escriben
+        los registros, a medida que se leen.
+        Retorna {'pais', 'total_registros', 'fecha_inicio', 'fecha_fin'} o None
+        """
+        moneda = codigo_moneda.upper()
+        desde_iso = normalizar_fecha(desde) if desde else None
+        if desde and not desde_iso:
+            print(f"[X] Formato de fecha invalido: {desde}")
+            return None
+
+        try:
+            historico = self._historico(moneda)
+            if historico is None:
                 print(f"[X] Moneda no encontrada: {moneda}")
-                print(f"    Monedas disponibles: {', '.join(sorted(datos.keys()))}")
+                print(f"    Monedas disponibles: {', '.join(self._monedas_disponibles())}")
                 return None
+        except FileNotFoundError:
+            print(f"[X] Archivo no encontrado: {self.json_por_moneda}")
+            return None
 
-            info = datos[moneda]
+        pais, fechas, registros = historico
+        info = {
+            'pais': pais,
+            'total_registros': len(fechas),
+            'fecha_inicio': str(fechas[-1]) if len(fechas) else None,
+            'fecha_fin': str(fechas[0]) if len(fechas) else None
+        }
+
+        # Del mas reciente al mas antiguo: las fechas desde `desde` son las primeras
+        total = sum(1 for fecha in fechas if fecha >= desde_iso) if desde_iso else len(fechas)
+        registros = paginar(islice(registros, total), saltar, limite)
+        columnas = ['fecha', 'compra_bs', 'venta_bs', 'promedio_bs']
+
+        if formato != 'tabla':
+            escribir_registros(registros, columnas, formato)
+            return info
 
-            print(f"\n{'='*80}")
-            print(f" HISTORICO {moneda} - {info['pais']} ".center(80, '='))
-            print('='*80)
-            print(f"\nPeriodo: {info['fecha_inicio']} a {info['fecha_fin']}")
-            print(f"Total registros: {info['total_registros']}")
+        print(f"\n{'='*80}")
+        print(f" HISTORICO {moneda} - {pais} ".center(80, '='))
+        print('='*80)
+        print(f"\nPeriodo: {info['fecha_inicio']} a {info['fecha_fin']}")
+        print(f"Total registros: {info['total_registros']}")
 
-            # Mostrar ultimas 10 fechas
-            print(f"\n{'Fecha':<15} {'Compra (Bs.)':>15} {'Venta (Bs.)':>15} {'Promedio':>15}")
-            print('-'*80)
+        print(f"\n{'Fecha':<15} {'Compra (Bs.)':>15} {'Venta (Bs.)':>15} {'Promedio':>15}")
+        print('-'*80)
 
-            for registro in info['historico'][:10]:
-                print(f"{registro['fecha']:<15} {registro['compra_bs']:>15.2f} "
-                      f"{registro['venta_bs']:>15.2f} {registro['promedio_bs']:>15.2f}")
+        mostrados = escribir_registros(registros, columnas)
 
-            if info['total_registros'] > 10:
-                print(f"\n... y {info['total_registros'] - 10} registros mas")
+        restantes = total - saltar - mostrados
+        if restantes > 0:
+            print(f"\n... y {restantes} registros mas")
 
-            print()
-            return info
+        print()
+        return info
 
+    def _motor(self):
+        """Motor de tasas cruzadas (se construye en la primera consulta)"""
+        if self._motor_cruces is None:
+            if self.almacen is not None:
+                self._motor_cruces = MotorCruces.desde_almacen(self.almacen)
+            else:
+                self._motor_cruces = MotorCruces.desde_por_fecha(self._datos_por_fecha())
+        return self._motor_cruces
+
+    def consultar_cruce(self, origen, destino, fecha=None):
+        """Tasa cruzada entre dos monedas (por defecto, en la ultima fecha)"""
+        try:
+            motor = self._motor()
         except FileNotFoundError:
-            print(f"[X] Archivo no encontrado: {self.json_por_moneda}")
+            print(f"[X] Archivo no encontrado: {self.json_por_fecha}")
+            print("    Ejecuta 'python convertir_json.py' primero")
+            return None
+
+        if fecha is None:
+            fecha_iso = motor.indice.fechas()[-1]
+        else:
+            fecha_iso = normalizar_fecha(fecha)
+            if not fecha_iso:
+                print(f"[X] Formato de fecha invalido: {fecha}")
+                return None
+
+        origen, destino = origen.upper(), destino.upper()
+        for moneda in (origen, destino):
+            if moneda not in motor.monedas:
+                print(f"[X] Moneda no encontrada: {moneda}")
+                print(f"    Monedas disponibles: {', '.join(sorted(motor.monedas))}")
+                return None
+
+        cruce = motor.cruce(fecha_iso, origen, destino)
+        if cruce is None:
+            print(f"\n[!] No hay tasas {origen}/{destino} vigentes para la fecha: {fecha_iso}")
             return None
 
+        print(f"\n{'='*70}")
+        print(f" {origen} -> {destino} - {fecha_iso} ".center(70, '='))
+        print('='*70)
+        if cruce['fecha'] != fecha_iso:
+            print(f"\n  Tasas publicadas el {cruce['fecha']} (vigentes en {fecha_iso})")
+        print(f"\n  Compra:     {cruce['compra']:,.8f} {destino} por {origen}")
+        print(f"  Venta:      {cruce['venta']:,.8f} {destino} por {origen}")
+        print(f"  Promedio:   {cruce['promedio']:,.8f} {destino} por {origen}")
+        print()
+
+        return cruce
+
+    def historico_cruce(self, origen, destino, n=10, saltar=0, desde=None, formato='tabla'):
+        """
+        Historico de la tasa cruzada entre dos monedas, del mas reciente al
+        mas antiguo (n registros a partir de `saltar`; n=None: todos).
+        Con formato 'csv' o 'ndjson' solo se escriben los registros.
+        """
+        desde_iso = normalizar_fecha(desde) if desde else None
+        if desde and not desde_iso:
+            print(f"[X] Formato de fecha invalido: {desde}")
+            return None
+
+        try:
+            historico = self._motor().historico(origen, destino)
+        except FileNotFoundError:
+            print(f"[X] Archivo no encontrado: {self.json_por_fecha}")
+            print("    Ejecuta 'python convertir_json.py' primero")
+            return None
+
+        if historico is None or historico.empty:
+            print(f"[X] No hay datos para el cruce {origen.upper()}/{destino.upper()}")
+            return None
+
+        seleccion = historico[historico['fecha'] >= desde_iso] if desde_iso else historico
+        registros = paginar((fila._asdict() for fila in seleccion.iloc[::-1].itertuples(index=False)),
+                            saltar, n)
+        columnas = ['fecha', 'compra', 'venta', 'promedio']
+
+        if formato != 'tabla':
+            escribir_registros(registros, columnas, formato)
+            return historico
+
+        print(f"\n{'='*80}")
+        print(f" HISTORICO {origen.upper()} -> {destino.upper()} ".center(80, '='))
+        print('='*80)
+        print(f"\nPeriodo: {historico['fecha'].iloc[0]} a {historico['fecha'].iloc[-1]}")
+        print(f"Total registros: {len(historico)}")
+
+        print(f"\n{'Fecha':<15} {'Compra':>18} {'Venta':>18} {'Promedio':>18}")
+        print('-'*80)
+
+        mostrados = escribir_registros(registros, columnas, ancho=18, decimales=8)
+
+        restantes = len(seleccion) - saltar - mostrados
+        if restantes > 0:
+            print(f"\n... y {restantes} registros mas")
+
+        print()
+        return historico
+
     def mostrar_ultima_fecha(self):
         """Muestra las tasas de la fecha mas reciente"""
         try:
@@ -158,50 +398,10 @@ class ConsultaJSON:
             print(f"[X] Archivo no encontrado: {self.json_resumen}")
             return None
 
-    def _normalizar_fecha(self, fecha_str):
-        """Convierte diferentes formatos de fecha a ISO (YYYY-MM-DD)"""
-        formatos = [
-            '%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d', '%d-%m-%Y'
-        ]
-
-        for fmt in formatos:
-            try:
-                fecha = datetime.strptime(fecha_str.strip(), fmt)
-                return fecha.strftime('%Y-%m-%d')
-            except:
-                continue
-
-        # Parseo de texto: "marzo 8 2025"
-        try:
-            meses = {
-                'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4,
-                'mayo': 5, 'junio': 6, 'julio': 7, 'agosto': 8,
-                'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12
-            }
-            partes = fecha_str.lower().split()
-            if len(partes) == 3:
-                mes_texto, dia, anio = partes[0], partes[1], partes[2]
-                if mes_texto in meses:
-                    mes = meses[mes_texto]
-                    fecha = datetime(int(anio), mes, int(dia))
-                    return fecha.strftime('%Y-%m-%d')
-        except:
-            pass
-
-        return None
-
-    def _sugerir_fechas(self, fecha_iso, fechas_disponibles, n=5):
-        """Sugiere fechas cercanas"""
-        from datetime import datetime, timedelta
-
-        fecha_dt = datetime.strptime(fecha_iso, '%Y-%m-%d')
-
-        fechas_dt = [datetime.strptime(f, '%Y-%m-%d') for f in fechas_disponibles]
-        fechas_cercanas = sorted(fechas_dt, key=lambda x: abs((x - fecha_dt).days))[:n]
-
+    def _sugerir_fechas(self, fecha_iso, indice, n=5):
+        """Sugiere fechas cercanas a partir de un IndiceFechas"""
         print(f"\n[*] Fechas disponibles mas cercanas:")
-        for f in fechas_cercanas:
-            dias_diff = (f - fecha_dt).days
+        for f, dias_diff in indice.cercanas(fecha_iso, n):
             if dias_diff > 0:
                 diff_str = f"(+{dias_diff} dias)"
             elif dias_diff < 0:
@@ -209,33 +409,53 @@ class ConsultaJSON:
             else:
                 diff_str = "(mismo dia)"
 
-            print(f"   - {f.strftime('%Y-%m-%d')} {diff_str}")
+            print(f"   - {f} {diff_str}")
 
 
 def main():
-    if len(sys.argv) < 2:
+    opciones, argumentos = opciones_paginacion().parse_known_args(sys.argv[1:])
+
+    if not argumentos:
         print("\nUso:")
         print("  python consulta_json.py fecha <fecha>        # Buscar por fecha")
         print("  python consulta_json.py moneda <codigo>      # Historico de moneda")
         print("  python consulta_json.py ultima               # Mostrar ultima fecha")
         print("  python consulta_json.py stats                # Mostrar estadisticas")
+        print("  python consulta_json.py cruce <de> <a> [fecha] # Tasa cruzada (ej. EUR USD)")
+        print("  python consulta_json.py cruce <de> <a> historico")
+        print("\nOpciones para historicos (moneda, cruce ... historico):")
+        print("  --limite N (--limit)     Registros a mostrar (default: 10 en tabla, todos en csv/ndjson)")
+        print("  --saltar N (--offset)    Registros a omitir desde el mas reciente")
+        print("  --desde FECHA (--since)  Solo registros desde esa fecha")
+        print("  --formato tabla|csv|ndjson")
         print("\nEjemplos:")
         print('  python consulta_json.py fecha "marzo 7 2025"')
         print('  python consulta_json.py moneda USD')
+        print('  python consulta_json.py moneda USD --formato csv > usd.csv')
         print('  python consulta_json.py ultima')
+        print('  python consulta_json.py cruce EUR USD "marzo 7 2025"')
         print()
         return
 
+    if opciones.desde and not normalizar_fecha(opciones.desde):
+        print(f"[X] Formato de fecha invalido: {opciones.desde}")
+        sys.exit(1)
+
+    # Por defecto la tabla muestra 10 registros; csv y ndjson escriben todos
+    limite = opciones.limite
+    if limite is None and opciones.formato == 'tabla':
+        limite = 10
+
     consulta = ConsultaJSON()
-    comando = sys.argv[1].lower()
+    comando = argumentos[0].lower()
 
-    if comando == 'fecha' and len(sys.argv) >= 3:
-        fecha = ' '.join(sys.argv[2:])
+    if comando == 'fecha' and len(argumentos) >= 2:
+        fecha = ' '.join(argumentos[1:])
         consulta.consultar_fecha(fecha)
 
-    elif comando == 'moneda' and len(sys.argv) >= 3:
-        moneda = sys.argv[2]
-        consulta.consultar_moneda(moneda)
+    elif comando == 'moneda' and len(argumentos) >= 2:
+        moneda = argumentos[1]
+        consulta.consultar_moneda(moneda, opciones.desde, limite, opciones.saltar, opciones.formato)
 
     elif comando == 'ultima':
         consulta.mostrar_ultima_fecha()
@@ -243,6 +463,14 @@ def main():
     elif comando == 'stats':
         consulta.mostrar_estadisticas()
 
+    elif comando == 'cruce' and len(argumentos) >= 3:
+        origen, destino = argumentos[1], argumentos[2]
+        if len(argumentos) == 4 and argumentos[3].lower() == 'historico':
+            consulta.historico_cruce(origen, destino, limite, opciones.saltar, opciones.desde, opciones.formato)
+        else:
+            fecha = ' '.join(argumentos[3:]) or None
+            consulta.consultar_cruce(origen, destino, fecha)
+
     else:
         print(f"[X] Comando invalido: {comando}")
 
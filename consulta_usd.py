@@ -3,16 +3,36 @@ Consulta rapida de USD
 Script especializado para consultar tasas del dolar
 """
 
+import contextlib
 import json
+import re
 import sys
-from datetime import datetime
+
+import numpy as np
+
+from almacen_bcv import AlmacenTasas
+from estadisticas_bcv import ARCHIVO_ESTADISTICAS, SERIES, EstadisticasTasas
+from fechas_bcv import IndiceFechas, SerieTasas, normalizar_fecha
+from formato_bcv import escribir_registros, opciones_paginacion, paginar
 
 
 class ConsultaUSD:
-    def __init__(self, archivo='tipos_cambio_usd.json'):
+    def __init__(self, archivo='tipos_cambio_usd.json', archivo_estadisticas=ARCHIVO_ESTADISTICAS):
+        self.almacen = AlmacenTasas.abrir_vigente()
+        self.archivo_estadisticas = archivo_estadisticas
+        self._estadisticas = None
+
         try:
-            with open(archivo, 'r', encoding='utf-8') as f:
-                self.datos = json.load(f)
+            if self.almacen is not None and 'USD' in self.almacen.monedas:
+                self.datos = self._datos_almacen()
+            else:
+                with open(archivo, 'r', encoding='utf-8') as f:
+                    self.datos = json.load(f)
+            self.indice_fechas = IndiceFechas(self.datos.keys())
+            self.serie = SerieTasas(self.datos.keys(),
+                                    [t['compra_bs'] for t in self.datos.values()],
+                                    [t['venta_bs'] for t in self.datos.values()],
+                                    next(iter(self.datos.values()), {}).get('pais', ''))
             print(f"[OK] Base de datos USD cargada: {len(self.datos)} fechas disponibles")
             print(f"     Periodo: {min(self.datos.keys())} a {max(self.datos.keys())}\n")
         except FileNotFoundError:
@@ -20,9 +40,52 @@ class ConsultaUSD:
             print("    Ejecuta 'python exportar_usd.py' primero")
             sys.exit(1)
 
+    def _datos_almacen(self):
+        """Histórico USD desde el almacén binario, igual a tipos_cambio_usd.json"""
+        fechas, compra, venta = self.almacen.historico('USD')
+        return {
+            fecha: self.almacen.formato_registro('USD', c, v)
+            for fecha, c, v in zip(fechas.tolist(), compra.tolist(), venta.tolist())
+        }
+
+    def tasa(self, fecha):
+        """
+        Tasa USD de una fecha: {'pais', 'compra_bs', 'venta_bs', 'promedio_bs'}
+        Retorna None si la fecha no es valida o no hay dato
+        """
+        fecha_iso = normalizar_fecha(fecha)
+        if not fecha_iso:
+            return None
+
+        if self.almacen is not None:
+            return self.almacen.registro(fecha_iso, 'USD')
+        return self.datos.get(fecha_iso)
+
+    def tasa_vigente(self, fecha, politica='anterior'):
+        """
+        Tasa USD aplicable a una fecha cualquiera.
+        Politicas: 'anterior' (ultima tasa publicada, la vigente en fines de
+        semana y feriados), 'siguiente', 'cercana' o 'estricta' (solo la fecha exacta).
+        Retorna {'fecha', 'pais', 'compra_bs', 'venta_bs', 'promedio_bs'}, donde
+        'fecha' es la fecha de publicacion usada, o None si no hay tasa aplicable
+        """
+        fecha_iso = normalizar_fecha(fecha)
+        if not fecha_iso:
+            return None
+        return self.serie.vigente(fecha_iso, politica)
+
+    def tasas_vigentes(self, fechas, politica='anterior'):
+        """
+        Version vectorizada de tasa_vigente para un arreglo de fechas (en
+        cualquier formato aceptado por normalizar_fecha). Retorna un DataFrame
+        con fecha_consulta, fecha, compra_bs, venta_bs y promedio_bs (NaN donde
+        no hay tasa aplicable o la fecha no se reconoce)
+        """
+        return self.serie.vigentes(fechas, politica)
+
     def consultar_fecha(self, fecha):
         """Consulta tasa USD por fecha"""
-        fecha_iso = self._normalizar_fecha(fecha)
+        fecha_iso = normalizar_fecha(fecha)
 
         if not fecha_iso:
             print(f"[X] Formato de fecha invalido: {fecha}")
@@ -48,8 +111,8 @@ class ConsultaUSD:
 
     def consultar_rango(self, fecha_desde, fecha_hasta):
         """Consulta rango de fechas"""
-        fecha_desde_iso = self._normalizar_fecha(fecha_desde)
-        fecha_hasta_iso = self._normalizar_fecha(fecha_hasta)
+        fecha_desde_iso = normalizar_fecha(fecha_desde)
+        fecha_hasta_iso = normalizar_fecha(fecha_hasta)
 
         if not fecha_desde_iso or not fecha_hasta_iso:
             print("[X] Formato de fecha invalido")
@@ -84,104 +147,151 @@ class ConsultaUSD:
 
         return fechas_rango
 
+    def iterar(self, fecha_desde=None, fecha_hasta=None):
+        """
+        Registros USD ({'fecha', 'pais', 'compra_bs', 'venta_bs', 'promedio_bs'})
+        del mas reciente al mas antiguo, opcionalmente dentro de un rango ISO
+        """
+        for fecha in reversed(self.indice_fechas.fechas()):
+            if fecha_hasta and fecha > fecha_hasta:
+                continue
+            if fecha_desde and fecha < fecha_desde:
+                break
+            yield {'fecha': fecha, **self.datos[fecha]}
+
     def mostrar_ultimas(self, n=10):
         """Muestra las últimas N fechas"""
-        fechas = sorted(self.datos.keys(), reverse=True)[:n]
-
         print(f"\n{'='*70}")
         print(f" ULTIMAS {n} TASAS USD ".center(70, '='))
         print('='*70)
         print(f"\n{'Fecha':<15} {'Compra (Bs.)':>15} {'Venta (Bs.)':>15} {'Promedio':>15}")
         print('-'*70)
 
-        for fecha in fechas:
-            tasa = self.datos[fecha]
-            print(f"{fecha:<15} {tasa['compra_bs']:>15.2f} {tasa['venta_bs']:>15.2f} {tasa['promedio_bs']:>15.2f}")
+        escribir_registros(paginar(self.iterar(), 0, n), ['fecha', 'compra_bs', 'venta_bs', 'promedio_bs'])
 
         print()
 
-    def mostrar_estadisticas(self):
-        """Muestra estadísticas generales"""
-        promedios = [tasa['promedio_bs'] for tasa in self.datos.values()]
-        compras = [tasa['compra_bs'] for tasa in self.datos.values()]
-        ventas = [tasa['venta_bs'] for tasa in self.datos.values()]
+    def mostrar_historico(self, desde=None, limite=None, saltar=0, formato='tabla'):
+        """
+        Historico USD del mas reciente al mas antiguo, escrito a medida que se
+        recorre: desde (fecha inclusive), saltar y limite paginan. Con formato
+        'csv' o 'ndjson' solo se escriben los registros.
+        Retorna el numero de registros escritos, o None si la fecha no es valida
+        """
+        desde_iso = normalizar_fecha(desde) if desde else None
+        if desde and not desde_iso:
+            print(f"[X] Formato de fecha invalido: {desde}")
+            return None
+
+        registros = paginar(self.iterar(desde_iso), saltar, limite)
+        columnas = ['fecha', 'compra_bs', 'venta_bs', 'promedio_bs']
+
+        if formato != 'tabla':
+            return escribir_registros(registros, columnas, formato)
+
+        print(f"\n{'='*70}")
+        print(f" HISTORICO USD ".center(70, '='))
+        print('='*70)
+        print(f"\n{'Fecha':<15} {'Compra (Bs.)':>15} {'Venta (Bs.)':>15} {'Promedio':>15}")
+        print('-'*70)
+        mostrados = escribir_registros(registros, columnas)
+        print(f"\nRegistros mostrados: {mostrados}\n")
+        return mostrados
+
+    def estadisticas(self):
+        """
+        Resúmenes mensuales combinables de USD (estadisticas_bcv): los de
+        tipos_cambio_estadisticas.json si su huella es la de los datos
+        cargados; si no, se calculan una sola vez a partir de los datos
+        """
+        if self._estadisticas is None:
+            guardadas = EstadisticasTasas.cargar(self.archivo_estadisticas)
+            fechas = self.indice_fechas.fechas()
+            tasas = [self.datos[fecha] for fecha in fechas]
+
+            if guardadas is not None and guardadas.corresponde(
+                    'USD', fechas, [t['compra_bs'] for t in tasas], [t['venta_bs'] for t in tasas]):
+                self._estadisticas = guardadas
+            else:
+                self._estadisticas = EstadisticasTasas()
+                for fecha, tasa in zip(fechas, tasas):
+                    self._estadisticas.agregar(fecha, 'USD', tasa['compra_bs'], tasa['venta_bs'], tasa.get('pais', ''))
+
+        return self._estadisticas
+
+    def mostrar_estadisticas(self, desde=None, hasta=None):
+        """
+        Muestra estadísticas generales, o de los meses entre desde y hasta
+        (fechas en cualquier formato aceptado o meses 'YYYY-MM'), combinando
+        los resúmenes mensuales. Una fecha que no cae en el borde de su mes
+        amplía el rango al mes completo, y se avisa
+        """
+        meses = []
+        ampliado = False
+        for fecha, es_desde in ((desde, True), (hasta, False)):
+            mes = fecha.strip() if fecha and re.fullmatch(r'\d{4}-\d{2}', fecha.strip()) else None
+            if fecha and mes is None:
+                fecha_iso = normalizar_fecha(fecha)
+                if not fecha_iso:
+                    print(f"[X] Formato de fecha invalido: {fecha}")
+                    return None
+                mes = fecha_iso[:7]
+                # Solo el primer día (desde) o el último (hasta) no amplían el rango
+                if es_desde:
+                    ampliado |= fecha_iso[8:] != '01'
+                else:
+                    ampliado |= str(np.datetime64(fecha_iso) + 1)[:7] == mes
+            meses.append(mes)
+
+        if ampliado:
+            print(f"[!] Las estadisticas son por meses completos: rango ampliado a "
+                  f"{meses[0] or 'inicio'} - {meses[1] or 'final'}")
+
+        estadisticas = self.estadisticas()
+        compra, venta, promedio = (estadisticas.resumen('USD', serie, *meses) for serie in SERIES)
+        if not promedio.registros:
+            print(f"[!] No hay datos entre {meses[0] or 'el inicio'} y {meses[1] or 'el final'}")
+            return None
 
         print(f"\n{'='*70}")
         print(" ESTADISTICAS USD ".center(70, '='))
         print('='*70)
 
         print(f"\nInformacion General:")
-        print(f"  Total de fechas:       {len(self.datos)}")
-        print(f"  Fecha inicial:         {min(self.datos.keys())}")
-        print(f"  Fecha final:           {max(self.datos.keys())}")
+        if desde or hasta:
+            print(f"  Meses:                 {meses[0] or 'inicio'} a {meses[1] or 'final'}")
+        print(f"  Total de fechas:       {promedio.registros}")
+        print(f"  Fecha inicial:         {promedio.primera_fecha}")
+        print(f"  Fecha final:           {promedio.ultima_fecha}")
 
         print(f"\nTasa de Compra (Bs.):")
-        print(f"  Minima:                {min(compras):,.2f}")
-        print(f"  Maxima:                {max(compras):,.2f}")
-        print(f"  Promedio:              {sum(compras)/len(compras):,.2f}")
+        print(f"  Minima:                {compra.minimo:,.2f}")
+        print(f"  Maxima:                {compra.maximo:,.2f}")
+        print(f"  Promedio:              {compra.promedio:,.2f}")
 
         print(f"\nTasa de Venta (Bs.):")
-        print(f"  Minima:                {min(ventas):,.2f}")
-        print(f"  Maxima:                {max(ventas):,.2f}")
-        print(f"  Promedio:              {sum(ventas)/len(ventas):,.2f}")
+        print(f"  Minima:                {venta.minimo:,.2f}")
+        print(f"  Maxima:                {venta.maximo:,.2f}")
+        print(f"  Promedio:              {venta.promedio:,.2f}")
 
         print(f"\nTasa Promedio (Bs.):")
-        print(f"  Minima:                {min(promedios):,.2f}")
-        print(f"  Maxima:                {max(promedios):,.2f}")
-        print(f"  General:               {sum(promedios)/len(promedios):,.2f}")
-
-        # Calcular variación
-        primera_fecha = min(self.datos.keys())
-        ultima_fecha = max(self.datos.keys())
-        primera_tasa = self.datos[primera_fecha]['promedio_bs']
-        ultima_tasa = self.datos[ultima_fecha]['promedio_bs']
-        variacion = ((ultima_tasa - primera_tasa) / primera_tasa) * 100
+        print(f"  Minima:                {promedio.minimo:,.2f}")
+        print(f"  Maxima:                {promedio.maximo:,.2f}")
+        print(f"  General:               {promedio.promedio:,.2f}")
+        print(f"  Desviacion estandar:   {promedio.desviacion:,.2f}")
 
         print(f"\nVariacion Total:")
-        print(f"  {primera_fecha}: Bs. {primera_tasa:,.2f}")
-        print(f"  {ultima_fecha}: Bs. {ultima_tasa:,.2f}")
-        print(f"  Cambio: {variacion:+.2f}%")
+        print(f"  {promedio.primera_fecha}: Bs. {promedio.primero:,.2f}")
+        print(f"  {promedio.ultima_fecha}: Bs. {promedio.ultimo:,.2f}")
+        print(f"  Cambio: {promedio.variacion:+.2f}%")
         print()
 
-    def _normalizar_fecha(self, fecha_str):
-        """Convierte diferentes formatos de fecha a ISO"""
-        formatos = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d', '%d-%m-%Y']
-
-        for fmt in formatos:
-            try:
-                fecha = datetime.strptime(fecha_str.strip(), fmt)
-                return fecha.strftime('%Y-%m-%d')
-            except:
-                continue
-
-        # Parseo de texto: "marzo 8 2025"
-        try:
-            meses = {
-                'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4,
-                'mayo': 5, 'junio': 6, 'julio': 7, 'agosto': 8,
-                'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12
-            }
-            partes = fecha_str.lower().split()
-            if len(partes) == 3:
-                mes_texto, dia, anio = partes[0], partes[1], partes[2]
-                if mes_texto in meses:
-                    mes = meses[mes_texto]
-                    fecha = datetime(int(anio), mes, int(dia))
-                    return fecha.strftime('%Y-%m-%d')
-        except:
-            pass
-
-        return None
+        return promedio
 
     def _sugerir_fechas(self, fecha_iso, n=5):
         """Sugiere fechas cercanas"""
-        fecha_dt = datetime.strptime(fecha_iso, '%Y-%m-%d')
-        fechas_dt = [(f, datetime.strptime(f, '%Y-%m-%d')) for f in self.datos.keys()]
-        fechas_cercanas = sorted(fechas_dt, key=lambda x: abs((x[1] - fecha_dt).days))[:n]
-
         print(f"\n[*] Fechas disponibles mas cercanas:")
-        for fecha_str, fecha_dt_c in fechas_cercanas:
-            dias_diff = (fecha_dt_c - fecha_dt).days
+        for fecha_str, dias_diff in self.indice_fechas.cercanas(fecha_iso, n):
             if dias_diff > 0:
                 diff_str = f"(+{dias_diff} dias)"
             elif dias_diff < 0:
@@ -192,38 +302,50 @@ class ConsultaUSD:
 
 
 def main():
-    if len(sys.argv) < 2:
+    opciones, argumentos = opciones_paginacion().parse_known_args(sys.argv[1:])
+
+    if not argumentos:
         print("\nUso:")
         print("  python consulta_usd.py <fecha>                  # Consultar fecha especifica")
         print("  python consulta_usd.py <desde> <hasta>          # Consultar rango")
         print("  python consulta_usd.py ultimas [N]              # Ultimas N fechas")
-        print("  python consulta_usd.py stats                    # Estadisticas")
+        print("  python consulta_usd.py historico [opciones]     # Historico completo, paginado")
+        print("  python consulta_usd.py stats [desde] [hasta]    # Estadisticas (por meses completos)")
+        print("\nOpciones de historico:")
+        print("  --limite N (--limit)  --saltar N (--offset)  --desde FECHA (--since)  --formato tabla|csv|ndjson")
         print("\nEjemplos:")
         print('  python consulta_usd.py "marzo 7 2025"')
         print('  python consulta_usd.py "enero 1 2025" "marzo 31 2025"')
         print('  python consulta_usd.py ultimas 20')
+        print('  python consulta_usd.py historico --desde "marzo 1 2025" --formato ndjson')
         print('  python consulta_usd.py stats')
+        print('  python consulta_usd.py stats 2025-01 2025-03')
         print()
         return
 
-    consulta = ConsultaUSD()
+    # En csv/ndjson la salida estándar lleva solo los datos
+    with contextlib.redirect_stdout(sys.stderr if opciones.formato != 'tabla' else sys.stdout):
+        consulta = ConsultaUSD()
 
-    if sys.argv[1].lower() == 'stats':
-        consulta.mostrar_estadisticas()
+    if argumentos[0].lower() == 'stats':
+        consulta.mostrar_estadisticas(*argumentos[1:3])
 
-    elif sys.argv[1].lower() == 'ultimas':
-        n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    elif argumentos[0].lower() == 'ultimas':
+        n = int(argumentos[1]) if len(argumentos) > 1 else 10
         consulta.mostrar_ultimas(n)
 
-    elif len(sys.argv) == 3:
+    elif argumentos[0].lower() == 'historico':
+        consulta.mostrar_historico(opciones.desde, opciones.limite, opciones.saltar, opciones.formato)
+
+    elif len(argumentos) == 2:
         # Rango de fechas
-        fecha_desde = sys.argv[1]
-        fecha_hasta = sys.argv[2]
+        fecha_desde = argumentos[0]
+        fecha_hasta = argumentos[1]
         consulta.consultar_rango(fecha_desde, fecha_hasta)
 
     else:
         # Fecha única
-        fecha = ' '.join(sys.argv[1:])
+        fecha = ' '.join(argumentos)
         consulta.consultar_fecha(fecha)
 
 
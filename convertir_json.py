@@ -4,152 +4,246 @@ Genera multiples estructuras JSON optimizadas para diferentes casos de uso
 """
 
 import pandas as pd
+import argparse
+import hashlib
 import json
-from collections import defaultdict
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from datos_bcv import cargar_consolidado
+from estadisticas_bcv import ARCHIVO_ESTADISTICAS, EstadisticasTasas
+from exportar_usd import (exportar_solo_usd_desde_csv, exportar_solo_usd_desde_json, exportar_usd_compacto,
+                          usd_desde_por_fecha, usd_detallado)
+
+
+# (clave, archivo por defecto, mensaje de avance) de cada artefacto, en orden
+ARTEFACTOS = (
+    ('simple', 'tipos_cambio_simple.json', 'Generando JSON simple...'),
+    ('por_fecha', 'tipos_cambio_por_fecha.json', 'Generando JSON indexado por fecha...'),
+    ('por_moneda', 'tipos_cambio_por_moneda.json', 'Generando JSON indexado por moneda...'),
+    ('compacto', 'tipos_cambio_compacto.json', 'Generando JSON compacto...'),
+    ('resumen', 'tipos_cambio_resumen.json', 'Generando JSON con resumen y estadisticas...'),
+    ('ultima', 'tipos_cambio_ultima.json', 'Generando JSON con ultima fecha disponible...'),
+    ('ndjson', 'tipos_cambio_registros.ndjson', 'Generando NDJSON (un registro por linea)...'),
+    ('estadisticas', ARCHIVO_ESTADISTICAS, 'Generando resumenes estadisticos por moneda y mes...')
+)
+
+# Exportaciones USD (exportar_usd.py), que el modo incremental también mantiene
+ARCHIVOS_USD = ('tipos_cambio_usd.json', 'tipos_cambio_usd_detallado.json', 'tipos_cambio_usd_compacto.json')
+
+# Registro de la última generación (filas, huella y archivos) para el modo incremental
+ARCHIVO_MANIFIESTO_JSON = 'manifiesto_json.json'
+VERSION_MANIFIESTO_JSON = 1
+
+# Todo lo que escribe el modo incremental en el directorio de salida
+ARCHIVOS_SALIDA = tuple(nombre for _, nombre, _ in ARTEFACTOS) + ARCHIVOS_USD + (ARCHIVO_MANIFIESTO_JSON,)
+
+# Filas que se convierten a registros a la vez al escribir por bloques
+TAMANO_BLOQUE = 500
+
+
+def _elementos_json(valor, nivel=0):
+    """
+    Texto de json.dumps(indent=2) de una lista u objeto no vacío sin los
+    delimitadores '[\n' / '\n]', con sus elementos sangrados para el nivel
+    de anidamiento indicado. Las cadenas JSON no contienen saltos de línea.
+    """
+    texto = json.dumps(valor, ensure_ascii=False, indent=2)[2:-2]
+    if nivel:
+        sangria = '  ' * nivel
+        texto = sangria + texto.replace('\n', '\n' + sangria)
+    return texto
+
+
+def _extender_archivo(archivo, cierre, texto):
+    """
+    Agrega texto al final de un archivo existente, antes de su cierre (por
+    ejemplo '\n]' o '\n}'), sin reescribir el resto. Retorna False sin
+    modificar nada si el archivo no termina con ese cierre.
+    """
+    cierre = cierre.encode('utf-8')
+    with open(archivo, 'r+b') as f:
+        f.seek(-len(cierre), os.SEEK_END)
+        if f.read() != cierre:
+            return False
+        f.seek(-len(cierre), os.SEEK_END)
+        f.write(texto.encode('utf-8') + cierre)
+    return True
+
+
+def agregar_json(archivo, nuevos, compacto=False):
+    """
+    Agrega los elementos de `nuevos` (lista u objeto) al final de la lista u
+    objeto JSON de primer nivel del archivo, con el mismo texto que tendría
+    el archivo generado completo (indent=2 o compacto). Retorna False si el
+    archivo no tiene la forma esperada (por ejemplo, una lista vacía).
+    """
+    if not nuevos:
+        return True
+
+    cierre = ']' if isinstance(nuevos, list) else '}'
+    if compacto:
+        return _extender_archivo(archivo, cierre,
+                                 ',' + json.dumps(nuevos, ensure_ascii=False, separators=(',', ':'))[1:-1])
+    return _extender_archivo(archivo, '\n' + cierre, ',\n' + _elementos_json(nuevos))
+
+
+def _ruta(directorio, nombre):
+    return os.path.join(directorio, nombre) if directorio != '.' else nombre
+
+
+def escribir_lista_json(f, bloques, nivel=0, compacto=False):
+    """
+    Escribe una lista JSON bloque a bloque (cada bloque, una lista de
+    registros), con el mismo texto que json.dump de la lista completa:
+    indent=2 con la lista en el nivel de anidamiento indicado, o compacto
+    """
+    primero = True
+
+    if compacto:
+        f.write('[')
+        for bloque in bloques:
+            if bloque:
+                if not primero:
+                    f.write(',')
+                f.write(json.dumps(bloque, ensure_ascii=False, separators=(',', ':'))[1:-1])
+                primero = False
+        f.write(']')
+        return
+
+    for bloque in bloques:
+        if bloque:
+            f.write('[\n' if primero else ',\n')
+            f.write(_elementos_json(bloque, nivel))
+            primero = False
+    f.write('[]' if primero else '\n' + '  ' * nivel + ']')
+
+
+def escribir_ndjson(f, bloques):
+    """Escribe un registro JSON por línea, bloque a bloque"""
+    for bloque in bloques:
+        f.write(''.join(json.dumps(registro, ensure_ascii=False) + '\n' for registro in bloque))
 
 
 class ConvertidorJSON:
-    def __init__(self, archivo_csv='tipos_cambio_bcv_consolidado.csv'):
+    def __init__(self, archivo_csv='tipos_cambio_bcv_consolidado.csv', tamano_bloque=TAMANO_BLOQUE):
         print(f"[*] Cargando CSV: {archivo_csv}")
-        self.df = pd.read_csv(archivo_csv, encoding='utf-8-sig')
+        self.df = cargar_consolidado(archivo_csv)
+        self.tamano_bloque = tamano_bloque
+        # Posiciones en bytes que registran los escritores (para el manifiesto)
+        self.posiciones = {}
         print(f"[OK] {len(self.df)} registros cargados\n")
 
-    def generar_json_simple(self, archivo_salida='tipos_cambio_simple.json'):
+    def bloques_registros(self):
         """
-        JSON simple: Array de objetos (igual estructura que CSV)
+        Registros del dataset (como to_dict('records')) en bloques de
+        tamano_bloque filas: solo un bloque se convierte a diccionarios a la vez
         """
-        print(f"[1] Generando JSON simple...")
-
-        datos = self.df.to_dict('records')
-
-        with open(archivo_salida, 'w', encoding='utf-8') as f:
-            json.dump(datos, f, ensure_ascii=False, indent=2)
+        for inicio in range(0, len(self.df), self.tamano_bloque):
+            yield self.df.iloc[inicio:inicio + self.tamano_bloque].to_dict('records')
 
-        print(f"    -> {archivo_salida} ({len(datos)} registros)")
-        return archivo_salida
+    def _columnas(self, *nombres, desde=0):
+        """Columnas del dataset (desde la fila indicada) como listas de Python"""
+        return [self.df[nombre].iloc[desde:].tolist() for nombre in nombres]
 
-    def generar_json_por_fecha(self, archivo_salida='tipos_cambio_por_fecha.json'):
+    def datos_por_fecha(self, desde=0):
         """
-        JSON organizado por fecha:
-        {
-          "2025-03-07": {
-            "USD": {"pais": "E.U.A.", "compra_bs": 64.58, "venta_bs": 64.75},
-            "EUR": {...}
-          }
-        }
+        {fecha: {moneda: {pais, compra_bs, venta_bs, promedio_bs}}} en una sola
+        pasada sobre las filas: las fechas quedan en orden de aparición y las
+        monedas en el orden de las filas de cada fecha.
+        desde: primera fila a considerar (en el modo incremental, solo las nuevas)
         """
-        print(f"[2] Generando JSON indexado por fecha...")
-
         datos_por_fecha = {}
 
-        for fecha in self.df['fecha'].unique():
-            datos_fecha = self.df[self.df['fecha'] == fecha]
-
-            monedas = {}
-            for _, row in datos_fecha.iterrows():
-                monedas[row['moneda']] = {
-                    'pais': row['pais'],
-                    'compra_bs': round(row['compra_bs'], 8),
-                    'venta_bs': round(row['venta_bs'], 8),
-                    'promedio_bs': round((row['compra_bs'] + row['venta_bs']) / 2, 8)
-                }
-
-            datos_por_fecha[fecha] = monedas
-
-        with open(archivo_salida, 'w', encoding='utf-8') as f:
-            json.dump(datos_por_fecha, f, ensure_ascii=False, indent=2)
+        for fecha, moneda, pais, compra, venta in zip(
+                *self._columnas('fecha', 'moneda', 'pais', 'compra_bs', 'venta_bs', desde=desde)):
+            monedas = datos_por_fecha.get(fecha)
+            if monedas is None:
+                monedas = datos_por_fecha[fecha] = {}
+            monedas[moneda] = {
+                'pais': pais,
+                'compra_bs': round(compra, 8),
+                'venta_bs': round(venta, 8),
+                'promedio_bs': round((compra + venta) / 2, 8)
+            }
 
-        print(f"    -> {archivo_salida} ({len(datos_por_fecha)} fechas)")
-        return archivo_salida
+        return datos_por_fecha
 
-    def generar_json_por_moneda(self, archivo_salida='tipos_cambio_por_moneda.json'):
+    def datos_por_moneda(self, desde=0):
         """
-        JSON organizado por moneda:
-        {
-          "USD": {
-            "pais": "E.U.A.",
-            "historico": [
-              {"fecha": "2025-03-07", "compra_bs": 64.58, "venta_bs": 64.75},
-              ...
-            ]
-          }
-        }
+        {moneda: {pais, total_registros, fecha_inicio, fecha_fin, historico}}
+        agrupando las filas en una sola pasada; el histórico va de la fecha más
+        reciente a la más antigua y el país es el de la fecha más reciente.
+        desde: primera fila a considerar (en el modo incremental, solo las nuevas)
         """
-        print(f"[3] Generando JSON indexado por moneda...")
+        filas_por_moneda = {}
+        for fila in zip(*self._columnas('moneda', 'fecha', 'pais', 'compra_bs', 'venta_bs', 'fuente', desde=desde)):
+            filas = filas_por_moneda.get(fila[0])
+            if filas is None:
+                filas = filas_por_moneda[fila[0]] = []
+            filas.append(fila)
 
         datos_por_moneda = {}
-
-        for moneda in self.df['moneda'].unique():
-            datos_moneda = self.df[self.df['moneda'] == moneda].sort_values('fecha', ascending=False)
-
-            pais = datos_moneda.iloc[0]['pais']
-
-            historico = []
-            for _, row in datos_moneda.iterrows():
-                historico.append({
-                    'fecha': row['fecha'],
-                    'compra_bs': round(row['compra_bs'], 8),
-                    'venta_bs': round(row['venta_bs'], 8),
-                    'promedio_bs': round((row['compra_bs'] + row['venta_bs']) / 2, 8),
-                    'fuente': row['fuente']
-                })
+        for moneda, filas in filas_por_moneda.items():
+            filas.sort(key=lambda fila: fila[1], reverse=True)
 
             datos_por_moneda[moneda] = {
-                'pais': pais,
-                'total_registros': len(historico),
-                'fecha_inicio': datos_moneda['fecha'].min(),
-                'fecha_fin': datos_moneda['fecha'].max(),
-                'historico': historico
+                'pais': filas[0][2],
+                'total_registros': len(filas),
+                'fecha_inicio': filas[-1][1],
+                'fecha_fin': filas[0][1],
+                'historico': [
+                    {
+                        'fecha': fecha,
+                        'compra_bs': round(compra, 8),
+                        'venta_bs': round(venta, 8),
+                        'promedio_bs': round((compra + venta) / 2, 8),
+                        'fuente': fuente
+                    }
+                    for _, fecha, _, compra, venta, fuente in filas
+                ]
             }
 
-        with open(archivo_salida, 'w', encoding='utf-8') as f:
-            json.dump(datos_por_moneda, f, ensure_ascii=False, indent=2)
+        return datos_por_moneda
 
-        print(f"    -> {archivo_salida} ({len(datos_por_moneda)} monedas)")
-        return archivo_salida
+    def estadisticas(self):
+        """Resúmenes estadísticos combinables por moneda y mes (estadisticas_bcv)"""
+        return EstadisticasTasas.desde_dataframe(self.df)
 
-    def generar_json_compacto(self, archivo_salida='tipos_cambio_compacto.json'):
+    def estadisticas_por_moneda(self, estadisticas=None):
         """
-        JSON compacto (sin indentación) para transmisión/almacenamiento eficiente
+        Mínimo, máximo y promedio de compra y venta por moneda, combinando
+        los resúmenes mensuales
         """
-        print(f"[4] Generando JSON compacto...")
-
-        datos = self.df.to_dict('records')
-
-        with open(archivo_salida, 'w', encoding='utf-8') as f:
-            json.dump(datos, f, ensure_ascii=False, separators=(',', ':'))
+        return (estadisticas or self.estadisticas()).por_moneda()
 
-        print(f"    -> {archivo_salida} (compacto)")
-        return archivo_salida
-
-    def generar_json_resumen(self, archivo_salida='tipos_cambio_resumen.json'):
+    def preparar(self):
         """
-        JSON con metadata y estadísticas:
-        {
-          "metadata": {...},
-          "estadisticas": {...},
-          "datos": [...]
-        }
+        Estructuras intermedias compartidas por los artefactos, calculadas una
+        sola vez: agrupación por fecha, por moneda y estadísticas. Los
+        registros no se guardan: los artefactos de registros se escriben por
+        bloques directamente desde el DataFrame.
         """
-        print(f"[5] Generando JSON con resumen y estadisticas...")
-
-        # Calcular estadísticas
-        stats_por_moneda = {}
-        for moneda in self.df['moneda'].unique():
-            datos_moneda = self.df[self.df['moneda'] == moneda]
-
-            stats_por_moneda[moneda] = {
-                'pais': datos_moneda.iloc[0]['pais'],
-                'registros': len(datos_moneda),
-                'compra_min': round(datos_moneda['compra_bs'].min(), 2),
-                'compra_max': round(datos_moneda['compra_bs'].max(), 2),
-                'compra_promedio': round(datos_moneda['compra_bs'].mean(), 2),
-                'venta_min': round(datos_moneda['venta_bs'].min(), 2),
-                'venta_max': round(datos_moneda['venta_bs'].max(), 2),
-                'venta_promedio': round(datos_moneda['venta_bs'].mean(), 2)
-            }
+        return {
+            'por_fecha': self.datos_por_fecha(),
+            'por_moneda': self.datos_por_moneda(),
+            'estadisticas': self.estadisticas()
+        }
 
-        resumen = {
+    def _intermedio(self, plan, clave):
+        """Estructura del plan si ya fue calculada; si no, se calcula ahora"""
+        if plan is not None and clave in plan:
+            return plan[clave]
+        return {
+            'por_fecha': self.datos_por_fecha,
+            'por_moneda': self.datos_por_moneda,
+            'estadisticas': self.estadisticas
+        }[clave]()
+
+    def _metadata_resumen(self, plan=None):
+        """Encabezado de tipos_cambio_resumen.json (todo salvo 'datos')"""
+        return {
             'metadata': {
                 'version': '1.0',
                 'generado': pd.Timestamp.now().isoformat(),
@@ -161,22 +255,10 @@ class ConvertidorJSON:
                 'fuentes': self.df['fuente'].unique().tolist()
             },
             'monedas_disponibles': sorted(self.df['moneda'].unique().tolist()),
-            'estadisticas': stats_por_moneda,
-            'datos': self.df.to_dict('records')
+            'estadisticas': self._intermedio(plan, 'estadisticas').por_moneda()
         }
 
-        with open(archivo_salida, 'w', encoding='utf-8') as f:
-            json.dump(resumen, f, ensure_ascii=False, indent=2)
-
-        print(f"    -> {archivo_salida} (con metadata)")
-        return archivo_salida
-
-    def generar_json_ultima_fecha(self, archivo_salida='tipos_cambio_ultima.json'):
-        """
-        JSON solo con los datos de la fecha más reciente (útil para APIs)
-        """
-        print(f"[6] Generando JSON con ultima fecha disponible...")
-
+    def _datos_ultima_fecha(self):
         ultima_fecha = self.df['fecha'].max()
         datos_ultimos = self.df[self.df['fecha'] == ultima_fecha]
 
@@ -187,51 +269,526 @@ class ConvertidorJSON:
             'tasas': {}
         }
 
-        for _, row in datos_ultimos.iterrows():
-            resultado['tasas'][row['moneda']] = {
-                'pais': row['pais'],
-                'compra_bs': round(row['compra_bs'], 2),
-                'venta_bs': round(row['venta_bs'], 2),
-                'promedio_bs': round((row['compra_bs'] + row['venta_bs']) / 2, 2)
+        for moneda, pais, compra, venta in zip(
+                *(datos_ultimos[c].tolist() for c in ('moneda', 'pais', 'compra_bs', 'venta_bs'))):
+            resultado['tasas'][moneda] = {
+                'pais': pais,
+                'compra_bs': round(compra, 2),
+                'venta_bs': round(venta, 2),
+                'promedio_bs': round((compra + venta) / 2, 2)
+            }
+        return resultado
+
+    def _escribir_resumen(self, f, encabezado, datos_previos=None, registros=None):
+        """
+        Escribe tipos_cambio_resumen.json: el encabezado y luego 'datos' por
+        bloques. En una actualización, datos_previos es el texto de los
+        registros del archivo anterior y registros, los que se agregan.
+        Registra la posición en bytes del cuerpo de 'datos'.
+        """
+        # Encabezado sin el '\n}' final
+        f.write(json.dumps(encabezado, ensure_ascii=False, indent=2)[:-2])
+        f.write(',\n  "datos": ')
+        inicio = f.tell()
+
+        if datos_previos is None:
+            escribir_lista_json(f, self.bloques_registros(), nivel=1)
+        else:
+            f.write('[\n' + datos_previos)
+            if registros:
+                f.write(',\n' + _elementos_json(registros, 1))
+            f.write('\n  ]')
+
+        # Cuerpo entre '[\n' y '\n  ]'
+        self.posiciones['resumen'] = {'datos': [inicio + 2, f.tell() - 4]}
+        f.write('\n}')
+
+    def _escribir_por_moneda(self, f, datos, anterior=None, previas=None):
+        """
+        Escribe tipos_cambio_por_moneda.json moneda por moneda, con el mismo
+        texto que json.dump(indent=2), y registra por moneda las posiciones en
+        bytes de su entrada y del cuerpo de su histórico.
+
+        En una actualización, datos tiene solo las filas nuevas, anterior es el
+        contenido (bytes) del archivo anterior y previas sus posiciones: las
+        monedas sin filas nuevas se copian tal cual y a las demás se les
+        antepone el histórico nuevo al cuerpo del anterior.
+        """
+        previas = previas or {}
+        posiciones = {}
+
+        f.write('{')
+        for numero, moneda in enumerate(list(previas) + [m for m in datos if m not in previas]):
+            f.write('\n  ' if numero == 0 else ',\n  ')
+            f.write(json.dumps(moneda, ensure_ascii=False) + ': ')
+            inicio = f.tell()
+            previa, nueva = previas.get(moneda), datos.get(moneda)
+
+            if nueva is None:
+                a, b = previa['entrada']
+                f.write(anterior[a:b].decode('utf-8'))
+                historico = [p + inicio - a for p in previa['historico']]
+                encabezado = {'total_registros': previa['registros'], 'fecha_inicio': previa['fecha_inicio']}
+            else:
+                encabezado = {c: v for c, v in nueva.items() if c != 'historico'}
+                if previa is not None:
+                    encabezado['total_registros'] += previa['registros']
+                    encabezado['fecha_inicio'] = previa['fecha_inicio']
+
+                # Encabezado (sangrado al nivel 1) sin el '\n  }' final; luego el histórico
+                texto = json.dumps(encabezado, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+                f.write(texto[:-4] + ',\n    "historico": [\n')
+                historico = [f.tell()]
+                f.write(_elementos_json(nueva['historico'], 2))
+                if previa is not None:
+                    a, b = previa['historico']
+                    f.write(',\n' + anterior[a:b].decode('utf-8'))
+                historico.append(f.tell())
+                f.write('\n    ]\n  }')
+
+            posiciones[moneda] = {
+                'registros': encabezado['total_registros'],
+                'fecha_inicio': encabezado['fecha_inicio'],
+                'entrada': [inicio, f.tell()],
+                'historico': historico
             }
+        f.write('\n}' if posiciones else '}')
+
+        self.posiciones['por_moneda'] = {'monedas': posiciones}
 
+    def escritor(self, clave, plan=None):
+        """
+        Escritor de un artefacto: (funcion(f) que lo escribe en un archivo
+        abierto, detalle para el reporte).
+        clave: 'simple', 'por_fecha', 'por_moneda', 'compacto', 'resumen', 'ultima', 'ndjson' o 'estadisticas'
+        """
+        if clave == 'simple':
+            return (lambda f: escribir_lista_json(f, self.bloques_registros()),
+                    f"{len(self.df)} registros")
+
+        if clave == 'compacto':
+            return (lambda f: escribir_lista_json(f, self.bloques_registros(), compacto=True),
+                    "compacto")
+
+        if clave == 'ndjson':
+            return (lambda f: escribir_ndjson(f, self.bloques_registros()),
+                    f"{len(self.df)} lineas")
+
+        if clave == 'resumen':
+            encabezado = self._metadata_resumen(plan)
+            return (lambda f: self._escribir_resumen(f, encabezado)), "con metadata"
+
+        if clave == 'por_moneda':
+            datos = self._intermedio(plan, 'por_moneda')
+            return (lambda f: self._escribir_por_moneda(f, datos)), f"{len(datos)} monedas"
+
+        if clave == 'estadisticas':
+            estadisticas = self._intermedio(plan, 'estadisticas')
+            meses = sum(len(entrada['meses']) for entrada in estadisticas.monedas.values())
+            return estadisticas.escribir, f"{len(estadisticas.monedas)} monedas, {meses} resumenes mensuales"
+
+        if clave == 'por_fecha':
+            datos, detalle = self._intermedio(plan, 'por_fecha'), 'fechas'
+        elif clave == 'ultima':
+            datos = self._datos_ultima_fecha()
+            return (lambda f: json.dump(datos, f, ensure_ascii=False, indent=2),
+                    f"fecha: {datos['fecha']}")
+        else:
+            raise ValueError(f"Artefacto no valido: {clave}")
+
+        return (lambda f: json.dump(datos, f, ensure_ascii=False, indent=2),
+                f"{len(datos)} {detalle}")
+
+    @staticmethod
+    def escribir_archivo(escribir, archivo_salida):
+        """Abre el archivo y ejecuta el escritor; retorna los segundos empleados"""
+        inicio = time.perf_counter()
         with open(archivo_salida, 'w', encoding='utf-8') as f:
-            json.dump(resultado, f, ensure_ascii=False, indent=2)
+            escribir(f)
+        return time.perf_counter() - inicio
+
+    def _generar(self, clave, archivo_salida, plan=None):
+        numero, mensaje = next((i, m) for i, (c, _, m) in enumerate(ARTEFACTOS, 1) if c == clave)
+        print(f"[{numero}] {mensaje}")
 
-        print(f"    -> {archivo_salida} (fecha: {ultima_fecha})")
+        escribir, detalle = self.escritor(clave, plan)
+        self.escribir_archivo(escribir, archivo_salida)
+
+        print(f"    -> {archivo_salida} ({detalle})")
         return archivo_salida
 
-    def generar_todos(self):
-        """Genera todos los formatos JSON"""
+    def generar_json_simple(self, archivo_salida='tipos_cambio_simple.json', plan=None):
+        """
+        JSON simple: Array de objetos (igual estructura que CSV)
+        """
+        return self._generar('simple', archivo_salida, plan)
+
+    def generar_json_por_fecha(self, archivo_salida='tipos_cambio_por_fecha.json', plan=None):
+        """
+        JSON organizado por fecha:
+        {
+          "2025-03-07": {
+            "USD": {"pais": "E.U.A.", "compra_bs": 64.58, "venta_bs": 64.75},
+            "EUR": {...}
+          }
+        }
+        """
+        return self._generar('por_fecha', archivo_salida, plan)
+
+    def generar_json_por_moneda(self, archivo_salida='tipos_cambio_por_moneda.json', plan=None):
+        """
+        JSON organizado por moneda:
+        {
+          "USD": {
+            "pais": "E.U.A.",
+            "historico": [
+              {"fecha": "2025-03-07", "compra_bs": 64.58, "venta_bs": 64.75},
+              ...
+            ]
+          }
+        }
+        """
+        return self._generar('por_moneda', archivo_salida, plan)
+
+    def generar_json_compacto(self, archivo_salida='tipos_cambio_compacto.json', plan=None):
+        """
+        JSON compacto (sin indentación) para transmisión/almacenamiento eficiente
+        """
+        return self._generar('compacto', archivo_salida, plan)
+
+    def generar_json_resumen(self, archivo_salida='tipos_cambio_resumen.json', plan=None):
+        """
+        JSON con metadata y estadísticas:
+        {
+          "metadata": {...},
+          "estadisticas": {...},
+          "datos": [...]
+        }
+        """
+        return self._generar('resumen', archivo_salida, plan)
+
+    def generar_json_ultima_fecha(self, archivo_salida='tipos_cambio_ultima.json', plan=None):
+        """
+        JSON solo con los datos de la fecha más reciente (útil para APIs)
+        """
+        return self._generar('ultima', archivo_salida, plan)
+
+    def generar_ndjson(self, archivo_salida='tipos_cambio_registros.ndjson', plan=None):
+        """
+        NDJSON: un registro JSON por línea, en el orden del CSV. Se puede leer
+        línea a línea (tail, carga por partes, respuestas HTTP por bloques)
+        sin interpretar el archivo completo
+        """
+        return self._generar('ndjson', archivo_salida, plan)
+
+    def generar_estadisticas(self, archivo_salida=ARCHIVO_ESTADISTICAS, plan=None):
+        """
+        Resúmenes combinables por moneda y mes (conteo, suma, suma de
+        cuadrados, mínimo, máximo, primer y último valor) de compra, venta y
+        promedio; ver estadisticas_bcv
+        """
+        return self._generar('estadisticas', archivo_salida, plan)
+
+    def generar_todos(self, directorio='.', trabajadores=None):
+        """
+        Genera todos los formatos JSON
+
+        Las estructuras compartidas (registros, agrupaciones y estadísticas)
+        se calculan una sola vez; luego los archivos se serializan y escriben
+        en paralelo en un pool de hilos.
+
+        Parámetros:
+        - directorio: carpeta donde se escriben los archivos
+        - trabajadores: hilos del pool (default: uno por archivo)
+        """
         print("="*70)
         print(" CONVERSION CSV -> JSON ".center(70, "="))
         print("="*70 + "\n")
 
+        inicio = time.perf_counter()
+        plan = self.preparar()
+        segundos_plan = time.perf_counter() - inicio
+
+        escritores = [(_ruta(directorio, nombre), mensaje, *self.escritor(clave, plan))
+                      for clave, nombre, mensaje in ARTEFACTOS]
+
         archivos = []
+        tiempos = {}
+        with ThreadPoolExecutor(max_workers=trabajadores or len(escritores)) as pool:
+            futuros = [pool.submit(self.escribir_archivo, escribir, archivo)
+                       for archivo, _, escribir, _ in escritores]
+
+            # El avance se informa en el orden de siempre, a medida que terminan
+            for numero, ((archivo, mensaje, _, detalle), futuro) in enumerate(zip(escritores, futuros), 1):
+                tiempos[archivo] = futuro.result()
+                print(f"[{numero}] {mensaje}")
+                print(f"    -> {archivo} ({detalle})")
+                archivos.append(archivo)
 
-        archivos.append(self.generar_json_simple())
-        archivos.append(self.generar_json_por_fecha())
-        archivos.append(self.generar_json_por_moneda())
-        archivos.append(self.generar_json_compacto())
-        archivos.append(self.generar_json_resumen())
-        archivos.append(self.generar_json_ultima_fecha())
+        self.guardar_manifiesto(directorio, [nombre for _, nombre, _ in ARTEFACTOS])
+        segundos_total = time.perf_counter() - inicio
 
         print("\n" + "="*70)
-        print(f"[OK] Conversion completa: {len(archivos)} archivos JSON generados")
+        print(f"[OK] Conversion completa: {len(archivos)} archivos JSON/NDJSON generados")
         print("="*70)
 
         # Mostrar tamaños
         print("\n[*] Tamanos de archivos:")
-        import os
         for archivo in archivos:
             size_kb = os.path.getsize(archivo) / 1024
-            print(f"    {archivo:40} {size_kb:>8.1f} KB")
+            print(f"    {archivo:40} {size_kb:>8.1f} KB {tiempos[archivo]:>8.3f} s")
+        print(f"    {'(estructuras compartidas)':40} {'':>11} {segundos_plan:>8.3f} s")
+        print(f"    {'(total)':40} {'':>11} {segundos_total:>8.3f} s")
 
         return archivos
 
+    def _huellas(self):
+        """Hash de cada fila del dataset (todas las columnas)"""
+        return pd.util.hash_pandas_object(self.df, index=False).to_numpy()
+
+    @staticmethod
+    def _huella(huellas):
+        """Huella de un tramo de filas consecutivas"""
+        return hashlib.sha256(huellas.tobytes()).hexdigest()
+
+    def cargar_manifiesto(self, directorio='.'):
+        """
+        Manifiesto de la última generación en el directorio.
+        Retorna None si no existe o tiene una versión distinta.
+        """
+        try:
+            with open(_ruta(directorio, ARCHIVO_MANIFIESTO_JSON), 'r', encoding='utf-8') as f:
+                manifiesto = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if manifiesto.get('version') != VERSION_MANIFIESTO_JSON:
+            return None
+        return manifiesto
+
+    def guardar_manifiesto(self, directorio, nombres, huellas=None):
+        """
+        Registra la generación actual: filas y huella del dataset y, por
+        archivo, tamaño, fecha de modificación y posiciones. Solo se
+        registran los archivos indicados, que deben corresponder al dataset
+        actual; los demás quedan fuera y el modo incremental los regenera.
+        """
+        claves = {nombre: clave for clave, nombre, _ in ARTEFACTOS}
+        archivos = {}
+        for nombre in nombres:
+            estado = os.stat(_ruta(directorio, nombre))
+            archivos[nombre] = {
+                'tamano': estado.st_size,
+                'mtime_ns': estado.st_mtime_ns,
+                **self.posiciones.get(claves.get(nombre), {})
+            }
+
+        manifiesto = {
+            'version': VERSION_MANIFIESTO_JSON,
+            'registros': len(self.df),
+            'fecha_fin': self.df['fecha'].max() if len(self.df) else None,
+            'huella': self._huella(self._huellas() if huellas is None else huellas),
+            'archivos': archivos
+        }
+        with open(_ruta(directorio, ARCHIVO_MANIFIESTO_JSON), 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+
+    def filas_previas(self, manifiesto, huellas=None):
+        """
+        Filas del dataset que ya estaban en la generación registrada, o None
+        si los archivos no se pueden actualizar agregando filas: sin
+        manifiesto, filas ya generadas que cambiaron o se eliminaron, o filas
+        nuevas que no son posteriores a la última fecha generada
+        """
+        if manifiesto is None:
+            return None
+
+        previas = manifiesto['registros']
+        if not 0 < previas <= len(self.df):
+            return None
+        if huellas is None:
+            huellas = self._huellas()
+        if self._huella(huellas[:previas]) != manifiesto['huella']:
+            return None
+        if previas < len(self.df) and self.df['fecha'].iloc[previas:].min() <= manifiesto['fecha_fin']:
+            return None
+        return previas
+
+    @staticmethod
+    def _vigente(manifiesto, directorio, nombre):
+        """True si el archivo es el que quedó registrado (mismo tamaño y fecha de modificación)"""
+        registro = manifiesto['archivos'].get(nombre)
+        try:
+            estado = os.stat(_ruta(directorio, nombre))
+        except FileNotFoundError:
+            return False
+        return (registro is not None and registro['tamano'] == estado.st_size
+                and registro['mtime_ns'] == estado.st_mtime_ns)
+
+    def _reescribir(self, archivo, escribir):
+        """
+        Escribe la nueva versión de un archivo a partir de su contenido
+        anterior (escribir(f, bytes anteriores)) y la pone en su lugar
+        """
+        with open(archivo, 'rb') as f:
+            anterior = f.read()
+        temporal = archivo + '.tmp'
+        self.escribir_archivo(lambda f: escribir(f, anterior), temporal)
+        os.replace(temporal, archivo)
+
+    def _parchar(self, clave, archivo, registro, nuevas):
+        """
+        Agrega al archivo de un artefacto las filas nuevas (estructuras de
+        `nuevas`). Retorna False si el artefacto no se puede parchar.
+        """
+        if clave in ('simple', 'compacto'):
+            return agregar_json(archivo, nuevas['registros'], compacto=clave == 'compacto')
+
+        if clave == 'ndjson':
+            return _extender_archivo(archivo, '', ''.join(
+                json.dumps(registro, ensure_ascii=False) + '\n' for registro in nuevas['registros']))
+
+        if clave == 'por_fecha':
+            return agregar_json(archivo, nuevas['por_fecha'])
+
+        if clave == 'por_moneda' and 'monedas' in registro:
+            self._reescribir(archivo, lambda f, anterior: self._escribir_por_moneda(
+                f, nuevas['por_moneda'], anterior, registro['monedas']))
+            return True
+
+        if clave == 'resumen' and 'datos' in registro:
+            inicio, fin = registro['datos']
+            encabezado = self._metadata_resumen({'estadisticas': nuevas['estadisticas']})
+            self._reescribir(archivo, lambda f, anterior: self._escribir_resumen(
+                f, encabezado, anterior[inicio:fin].decode('utf-8'), nuevas['registros']))
+            return True
+
+        if clave == 'estadisticas':
+            # Los resúmenes ya incluyen las filas nuevas; el archivo es compacto y se reescribe
+            self.escribir_archivo(nuevas['estadisticas'].escribir, archivo)
+            return True
+
+        # 'ultima' se regenera siempre (es pequeño)
+        return False
+
+    def actualizar(self, directorio='.', usd=True):
+        """
+        Modo incremental: actualiza los archivos de una generación anterior
+        agregando solo las filas nuevas, sin volver a serializar el histórico:
+        - simple, compacto, NDJSON y por fecha: se agrega al final del archivo
+        - por moneda: el histórico nuevo se antepone al de cada moneda; el
+          resto se copia tal cual del archivo anterior
+        - resumen: metadata y estadísticas nuevas; los registros anteriores
+          se copian y los nuevos se agregan al final
+        - última fecha: se regenera
+        - resúmenes estadísticos: las filas nuevas actualizan en O(1) los
+          resúmenes de su mes (el resumen toma de ellos sus estadísticas)
+        - exportaciones USD (usd=True): se agregan las fechas nuevas
+
+        Con el manifiesto se verifica que las filas ya generadas no cambiaron
+        y que las nuevas son posteriores a la última fecha generada; si no,
+        se regenera todo. Un archivo que no coincide con el registrado se
+        regenera completo. El resultado es idéntico al de una generación
+        completa (salvo la marca 'generado' del resumen).
+
+        Retorna los archivos escritos.
+        """
+        inicio = time.perf_counter()
+        huellas = self._huellas()
+        manifiesto = self.cargar_manifiesto(directorio)
+        previas = self.filas_previas(manifiesto, huellas)
+        nombres = [nombre for _, nombre, _ in ARTEFACTOS] + (list(ARCHIVOS_USD) if usd else [])
+
+        if previas is None:
+            print("[*] Sin una generacion previa compatible: se regeneran todos los archivos\n")
+            escritos = self.generar_todos(directorio)
+            if usd:
+                print()
+                exportar_solo_usd_desde_json(directorio)
+                exportar_solo_usd_desde_csv(directorio, self.df)
+                exportar_usd_compacto(directorio)
+                escritos += [_ruta(directorio, nombre) for nombre in ARCHIVOS_USD]
+            self.guardar_manifiesto(directorio, nombres, huellas)
+            return escritos
+
+        filas_nuevas = len(self.df) - previas
+        print(f">> Actualizacion incremental: {filas_nuevas} filas nuevas "
+              f"(generacion anterior: {previas} filas hasta {manifiesto['fecha_fin']})\n")
+
+        # Resúmenes estadísticos de la generación anterior más las filas nuevas
+        estadisticas = None
+        if self._vigente(manifiesto, directorio, ARCHIVO_ESTADISTICAS):
+            estadisticas = EstadisticasTasas.cargar(_ruta(directorio, ARCHIVO_ESTADISTICAS))
+        if estadisticas is None:
+            estadisticas = self.estadisticas()
+        else:
+            estadisticas.agregar_filas(self.df.iloc[previas:])
+            estadisticas.firmar(self.df)
+
+        nuevas = {
+            'registros': self.df.iloc[previas:].to_dict('records'),
+            'por_fecha': self.datos_por_fecha(previas),
+            'por_moneda': self.datos_por_moneda(previas),
+            'estadisticas': estadisticas
+        }
+
+        escritos = []
+        for clave, nombre, _ in ARTEFACTOS:
+            archivo = _ruta(directorio, nombre)
+            if self._vigente(manifiesto, directorio, nombre):
+                registro = manifiesto['archivos'][nombre]
+                if not filas_nuevas:
+                    # Sin cambios: se conservan sus posiciones registradas
+                    self.posiciones[clave] = {c: v for c, v in registro.items() if c not in ('tamano', 'mtime_ns')}
+                    continue
+                if self._parchar(clave, archivo, registro, nuevas):
+                    print(f"[*] {archivo}: {filas_nuevas} filas agregadas")
+                    escritos.append(archivo)
+                    continue
+            self._generar(clave, archivo, {'estadisticas': estadisticas})
+            escritos.append(archivo)
+
+        if usd:
+            usd_nuevo = usd_desde_por_fecha(nuevas['por_fecha'])
+            exportaciones = (
+                ('tipos_cambio_usd.json', usd_nuevo, False,
+                 lambda: exportar_solo_usd_desde_json(directorio)),
+                ('tipos_cambio_usd_detallado.json', usd_detallado(self.df.iloc[previas:]), False,
+                 lambda: exportar_solo_usd_desde_csv(directorio, self.df)),
+                ('tipos_cambio_usd_compacto.json', usd_nuevo, True,
+                 lambda: exportar_usd_compacto(directorio))
+            )
+            for nombre, agregados, compacto, completo in exportaciones:
+                archivo = _ruta(directorio, nombre)
+                if self._vigente(manifiesto, directorio, nombre):
+                    if not agregados:
+                        continue
+                    if agregar_json(archivo, agregados, compacto):
+                        print(f"[*] {archivo}: {len(agregados)} fechas agregadas")
+                        escritos.append(archivo)
+                        continue
+                completo()
+                escritos.append(archivo)
+
+        self.guardar_manifiesto(directorio, nombres, huellas)
+
+        print(f"\n[OK] Actualizacion incremental completa: {len(escritos)} archivos actualizados "
+              f"en {time.perf_counter() - inicio:.2f} s")
+        return escritos
+
 
 def main():
+    parser = argparse.ArgumentParser(description='Convierte el CSV consolidado a los formatos JSON')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Agrega solo las fechas nuevas a los archivos existentes (incluidas las '
+                             'exportaciones USD); regenera lo que no se pueda actualizar')
+    args = parser.parse_args()
+
     conversor = ConvertidorJSON()
+    if args.incremental:
+        conversor.actualizar()
+        return
+
     conversor.generar_todos()
 
     print("\n[*] Ejemplos de uso de cada archivo:")
@@ -241,6 +798,8 @@ def main():
     print("    4. tipos_cambio_compacto.json        -> Version compacta (menor tamano)")
     print("    5. tipos_cambio_resumen.json         -> Con metadata y estadisticas")
     print("    6. tipos_cambio_ultima.json          -> Solo ultima fecha (API)")
+    print("    7. tipos_cambio_registros.ndjson     -> Un registro por linea (tail, carga por partes)")
+    print("    8. tipos_cambio_estadisticas.json    -> Resumenes por moneda y mes (estadisticas de cualquier rango)")
     print()
 
 
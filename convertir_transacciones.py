@@ -0,0 +1,183 @@
+"""
+Conversion de transacciones a bolivares
+Lee un CSV de transacciones (fecha, moneda, monto) por bloques, aplica la
+tasa BCV vigente de cada fecha y escribe el resultado de forma incremental,
+con memoria acotada aunque la entrada pese varios GB
+"""
+
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from datos_bcv import ARCHIVO_CSV, cargar_consolidado, dias_a_fechas
+from fechas_bcv import POLITICAS, fechas_a_dias_validas, resolver_lote, series_por_moneda
+
+
+TIPOS_TASA = ('compra', 'venta', 'promedio')
+
+# Conversor de cada proceso del pool (se recibe una sola vez al iniciar)
+_conversor = None
+
+
+class ConversorTransacciones:
+    def __init__(self, archivo_csv=ARCHIVO_CSV, tasa='promedio', politica='anterior',
+                 columna_fecha='fecha', columna_moneda='moneda', columna_monto='monto'):
+        if tasa not in TIPOS_TASA:
+            raise ValueError(f"Tasa no valida: {tasa} (opciones: {', '.join(TIPOS_TASA)})")
+        if politica not in POLITICAS:
+            raise ValueError(f"Politica no valida: {politica} (opciones: {', '.join(POLITICAS)})")
+
+        self.series = series_por_moneda(cargar_consolidado(archivo_csv))
+        self.tasa = tasa
+        self.politica = politica
+        self.columna_fecha = columna_fecha
+        self.columna_moneda = columna_moneda
+        self.columna_monto = columna_monto
+
+    def convertir_bloque(self, bloque):
+        """
+        Agrega al bloque fecha_tasa (publicacion usada), tasa_bs y monto_bs.
+        Las fechas se aceptan en cualquier formato de normalizar_fecha; las
+        filas con fecha no reconocida o sin tasa aplicable quedan vacias.
+        """
+        dias, validas = fechas_a_dias_validas(bloque[self.columna_fecha])
+        dias_tasa, compra, venta = resolver_lote(
+            self.series.get, dias, bloque[self.columna_moneda].to_numpy(dtype=object), self.politica, validas)
+
+        if self.tasa == 'compra':
+            tasa = compra
+        elif self.tasa == 'venta':
+            tasa = venta
+        else:
+            tasa = (compra + venta) / 2
+
+        fecha_tasa = np.full(len(bloque), None, dtype=object)
+        resueltas = dias_tasa >= 0
+        fecha_tasa[resueltas] = dias_a_fechas(dias_tasa[resueltas])
+
+        resultado = bloque.copy()
+        resultado['fecha_tasa'] = fecha_tasa
+        resultado['tasa_bs'] = tasa
+        resultado['monto_bs'] = pd.to_numeric(bloque[self.columna_monto], errors='coerce').to_numpy() * tasa
+        return resultado
+
+    def bloque_csv(self, bloque, encabezado=False):
+        """Convierte un bloque y lo devuelve ya serializado como texto CSV"""
+        resultado = self.convertir_bloque(bloque)
+        return resultado.to_csv(index=False, header=encabezado), len(resultado), int(resultado['tasa_bs'].isna().sum())
+
+    def convertir(self, archivo_entrada, archivo_salida, tamano_bloque=100_000, procesos=1):
+        """
+        Convierte el archivo completo. Con procesos > 1 los bloques se reparten
+        en un pool (incluida la serialización a CSV, que es la etapa más
+        costosa); a lo sumo 2 bloques por proceso quedan en vuelo y se
+        escriben en el orden de la entrada.
+        Retorna (filas, filas sin tasa). Si a la entrada le falta alguna de
+        las columnas configuradas lanza ValueError sin crear la salida.
+        """
+        encabezado = pd.read_csv(archivo_entrada, nrows=0, encoding='utf-8-sig').columns
+        for columna in (self.columna_fecha, self.columna_moneda, self.columna_monto):
+            if columna not in encabezado:
+                raise ValueError(f"Falta la columna '{columna}' en {archivo_entrada} "
+                                 f"(columnas: {', '.join(encabezado)})")
+
+        inicio = time.perf_counter()
+        ultimo_reporte = inicio
+        filas = sin_tasa = 0
+
+        # Las columnas se leen como texto: pasan a la salida tal como vienen
+        # y solo el monto se convierte a número
+        lector = pd.read_csv(archivo_entrada, chunksize=tamano_bloque, encoding='utf-8-sig',
+                             dtype=str, keep_default_na=False)
+
+        with open(archivo_salida, 'w', encoding='utf-8-sig', newline='') as salida:
+            def escribir(convertido):
+                nonlocal filas, sin_tasa, ultimo_reporte
+                texto, filas_bloque, sin_tasa_bloque = convertido
+                salida.write(texto)
+                filas += filas_bloque
+                sin_tasa += sin_tasa_bloque
+
+                ahora = time.perf_counter()
+                if ahora - ultimo_reporte >= 2:
+                    ultimo_reporte = ahora
+                    print(f"[*] {filas:,} filas ({filas / (ahora - inicio):,.0f} filas/s)")
+
+            if procesos > 1:
+                with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso,
+                                         initargs=(self,)) as pool:
+                    pendientes = deque()
+                    for numero, bloque in enumerate(lector):
+                        pendientes.append(pool.submit(_bloque_csv, bloque, numero == 0))
+                        if len(pendientes) >= 2 * procesos:
+                            escribir(pendientes.popleft().result())
+                    while pendientes:
+                        escribir(pendientes.popleft().result())
+            else:
+                for numero, bloque in enumerate(lector):
+                    escribir(self.bloque_csv(bloque, numero == 0))
+
+        segundos = time.perf_counter() - inicio
+        print(f"\n[OK] {filas:,} filas convertidas en {segundos:.2f} s "
+              f"({filas / segundos if segundos else 0:,.0f} filas/s)")
+        if sin_tasa:
+            print(f"[!] {sin_tasa:,} filas sin tasa aplicable (fecha invalida, fuera de rango o moneda desconocida)")
+        print(f"    Archivo: {archivo_salida}")
+
+        return filas, sin_tasa
+
+
+def _iniciar_proceso(conversor):
+    global _conversor
+    _conversor = conversor
+
+
+def _bloque_csv(bloque, encabezado):
+    return _conversor.bloque_csv(bloque, encabezado)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Convierte un CSV de transacciones (fecha, moneda, monto) a bolivares con las tasas BCV')
+    parser.add_argument('entrada', help='CSV de transacciones')
+    parser.add_argument('salida', help='CSV de salida (columnas originales + fecha_tasa, tasa_bs, monto_bs)')
+    parser.add_argument('--tasa', choices=TIPOS_TASA, default='promedio',
+                        help='Tasa a aplicar (default: promedio)')
+    parser.add_argument('--politica', choices=POLITICAS, default='anterior',
+                        help='Como resolver fechas sin publicacion (default: anterior, la tasa vigente)')
+    parser.add_argument('--columna-fecha', default='fecha', help='Columna con la fecha (default: fecha)')
+    parser.add_argument('--columna-moneda', default='moneda', help='Columna con la moneda (default: moneda)')
+    parser.add_argument('--columna-monto', default='monto', help='Columna con el monto (default: monto)')
+    parser.add_argument('--bloque', type=int, default=100_000,
+                        help='Filas por bloque (default: 100000)')
+    parser.add_argument('--procesos', type=int, default=1,
+                        help='Procesos en paralelo (default: 1)')
+    parser.add_argument('--datos', default=ARCHIVO_CSV,
+                        help=f'CSV consolidado de tasas (default: {ARCHIVO_CSV})')
+    args = parser.parse_args()
+
+    try:
+        conversor = ConversorTransacciones(args.datos, args.tasa, args.politica,
+                                           args.columna_fecha, args.columna_moneda, args.columna_monto)
+    except FileNotFoundError:
+        print(f"[X] No se encontro el archivo: {args.datos}")
+        print("    Ejecuta primero 'extractor_bcv.py' para generar los datos")
+        sys.exit(1)
+
+    try:
+        conversor.convertir(args.entrada, args.salida, args.bloque, args.procesos)
+    except FileNotFoundError:
+        print(f"[X] No se encontro el archivo: {args.entrada}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"[X] {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
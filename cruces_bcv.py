@@ -0,0 +1,138 @@
+"""
+Tasas cruzadas entre monedas
+Todas las tasas del BCV estan expresadas en bolivares; a partir de ellas se
+calcula la matriz moneda x moneda de cada fecha (EUR->USD, COP->USD, ...)
+con NumPy, de forma consistente con compra y venta:
+
+- compra A/B: el banco compra A y entrega B  ->  compra_A / venta_B
+- venta A/B:  el banco vende A y recibe B    ->  venta_A / compra_B
+- promedio A/B: promedio_A / promedio_B
+
+El bolivar se incluye como moneda 'VES' (tasa 1) para cruzar en ambos sentidos.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from datos_bcv import dias_a_fechas, fechas_a_dias
+from fechas_bcv import IndiceFechas, fecha_de
+
+
+MONEDA_BASE = 'VES'
+
+
+class MotorCruces:
+    def __init__(self, dias, monedas, tasas, max_fechas_cache=512):
+        """
+        dias: días publicados (desde 1970-01-01), ordenados
+        monedas: códigos de moneda
+        tasas: arreglo [día, moneda, (compra, venta)] en bolívares, NaN sin dato
+        """
+        self.indice = IndiceFechas.desde_dias(dias)
+        self.monedas = [*monedas, MONEDA_BASE]
+        self._posicion = {moneda: i for i, moneda in enumerate(self.monedas)}
+
+        base = np.ones((len(self.indice), 1))
+        tasas = np.asarray(tasas, dtype=np.float64)
+        self.compra = np.hstack([tasas[:, :, 0], base])
+        self.venta = np.hstack([tasas[:, :, 1], base])
+
+        # Matrices por fecha, calculadas una sola vez
+        self._matriz_dia = lru_cache(maxsize=max_fechas_cache)(self._calcular_matriz)
+
+    @classmethod
+    def desde_dataframe(cls, df, **opciones):
+        """Crea el motor a partir del dataset consolidado (o cualquier DataFrame con sus columnas)"""
+        dias = fechas_a_dias(df['fecha'].to_numpy(dtype=object))
+        filas, dias_unicos = pd.factorize(dias, sort=True)
+        columnas, monedas = pd.factorize(df['moneda'].astype(str).str.upper(), sort=True)
+
+        tasas = np.full((len(dias_unicos), len(monedas), 2), np.nan)
+        tasas[filas, columnas, 0] = df['compra_bs'].to_numpy(dtype=np.float64)
+        tasas[filas, columnas, 1] = df['venta_bs'].to_numpy(dtype=np.float64)
+
+        return cls(np.asarray(dias_unicos), list(monedas), tasas, **opciones)
+
+    @classmethod
+    def desde_almacen(cls, almacen, **opciones):
+        """Crea el motor a partir del almacén binario de tasas (AlmacenTasas)"""
+        dias = np.asarray(almacen.dias_publicados)
+        return cls(dias, almacen.monedas, almacen.tasas[dias - almacen.primer_dia], **opciones)
+
+    @classmethod
+    def desde_por_fecha(cls, datos, **opciones):
+        """Crea el motor a partir del contenido de tipos_cambio_por_fecha.json"""
+        filas = [
+            {'fecha': fecha, 'moneda': moneda, 'compra_bs': info['compra_bs'], 'venta_bs': info['venta_bs']}
+            for fecha, monedas in datos.items()
+            for moneda, info in monedas.items()
+        ]
+        return cls.desde_dataframe(pd.DataFrame(filas, columns=['fecha', 'moneda', 'compra_bs', 'venta_bs']),
+                                   **opciones)
+
+    def _calcular_matriz(self, posicion):
+        compra, venta = self.compra[posicion], self.venta[posicion]
+        promedio = (compra + venta) / 2
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                'compra': compra[:, None] / venta[None, :],
+                'venta': venta[:, None] / compra[None, :],
+                'promedio': promedio[:, None] / promedio[None, :]
+            }
+
+    def matriz(self, fecha_iso, politica='anterior'):
+        """
+        Matriz completa de una fecha: (fecha usada, monedas, {'compra', 'venta',
+        'promedio'}), donde matriz[i, j] son unidades de la moneda j por una
+        unidad de la moneda i. Retorna None si no hay fecha aplicable.
+        """
+        posicion = self.indice.posicion(fecha_iso, politica)
+        if posicion is None:
+            return None
+        return fecha_de(self.indice.dias[posicion]), self.monedas, self._matriz_dia(posicion)
+
+    def cruce(self, fecha_iso, origen, destino, politica='anterior'):
+        """
+        Tasa cruzada de un par en una fecha:
+        {'fecha', 'origen', 'destino', 'compra', 'venta', 'promedio'} o None
+        """
+        i = self._posicion.get(origen.upper())
+        j = self._posicion.get(destino.upper())
+        resultado = self.matriz(fecha_iso, politica)
+        if i is None or j is None or resultado is None:
+            return None
+
+        fecha, _, matrices = resultado
+        if np.isnan(matrices['promedio'][i, j]):
+            return None
+
+        return {
+            'fecha': fecha,
+            'origen': self.monedas[i],
+            'destino': self.monedas[j],
+            **{tipo: float(valores[i, j]) for tipo, valores in matrices.items()}
+        }
+
+    def historico(self, origen, destino):
+        """
+        Histórico completo de un par, calculado en bloque sobre todas las
+        fechas: DataFrame con fecha, compra, venta y promedio (None si algún
+        código no existe). Las fechas sin dato para alguna de las monedas se omiten.
+        """
+        i = self._posicion.get(origen.upper())
+        j = self._posicion.get(destino.upper())
+        if i is None or j is None:
+            return None
+
+        promedio_i = (self.compra[:, i] + self.venta[:, i]) / 2
+        promedio_j = (self.compra[:, j] + self.venta[:, j]) / 2
+        resultado = pd.DataFrame({
+            'fecha': dias_a_fechas(self.indice.dias),
+            'compra': self.compra[:, i] / self.venta[:, j],
+            'venta': self.venta[:, i] / self.compra[:, j],
+            'promedio': promedio_i / promedio_j
+        })
+        return resultado.dropna().reset_index(drop=True)
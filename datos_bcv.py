@@ -0,0 +1,132 @@
+"""
+Almacenamiento columnar del dataset consolidado
+Guarda los datos en un archivo NumPy (.npz) tipado junto al CSV y carga el
+dataset prefiriendo ese archivo cuando corresponde a la misma version del CSV
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+ARCHIVO_CSV = 'tipos_cambio_bcv_consolidado.csv'
+
+COLUMNAS = ['fecha', 'moneda', 'pais', 'compra_bs', 'venta_bs', 'fuente', 'origen_fecha']
+COLUMNAS_CATEGORICAS = ('moneda', 'pais', 'fuente', 'origen_fecha')
+COLUMNAS_NUMERICAS = ('compra_bs', 'venta_bs')
+
+# Las fechas se guardan como días desde 1970-01-01 (int32)
+EPOCA = np.datetime64('1970-01-01', 'D')
+
+
+def ruta_columnar(archivo_csv=ARCHIVO_CSV):
+    """Ruta del archivo columnar que acompaña a un CSV"""
+    return str(Path(archivo_csv).with_suffix('.npz'))
+
+
+def firma_csv(archivo_csv):
+    """
+    Tamaño y fecha de modificación (ns) del CSV, para saber si el .npz
+    corresponde a él. Si no coincide se lee el CSV, así que una firma
+    distinta (por ejemplo tras clonar el repositorio) nunca da datos viejos.
+    """
+    estado = os.stat(archivo_csv)
+    return np.array([estado.st_size, estado.st_mtime_ns], dtype=np.int64)
+
+
+def fechas_a_dias(fechas):
+    """Convierte fechas 'YYYY-MM-DD' a días desde 1970-01-01 (int32)"""
+    # Las fechas se repiten mucho: se convierte una sola vez cada fecha distinta
+    codigos, unicas = pd.factorize(np.asarray(fechas, dtype=object))
+    return (np.asarray(unicas, dtype='datetime64[D]') - EPOCA).astype(np.int32)[codigos]
+
+
+def dias_a_fechas(dias):
+    """Convierte días desde 1970-01-01 a un arreglo de textos 'YYYY-MM-DD'"""
+    unicos, posiciones = np.unique(dias, return_inverse=True)
+    textos = np.datetime_as_string(unicos.astype('datetime64[D]')).astype(object)
+    return textos[posiciones.reshape(-1)]
+
+
+def guardar_columnar(df, archivo_csv=ARCHIVO_CSV, archivo_salida=None):
+    """
+    Guarda el dataset consolidado en formato columnar:
+    - fecha: int32 con días desde 1970-01-01
+    - moneda, pais, fuente, origen_fecha: códigos enteros + categorías
+    - compra_bs, venta_bs: float64
+    Incluye la firma del CSV correspondiente para validar su vigencia.
+    """
+    archivo_salida = archivo_salida or ruta_columnar(archivo_csv)
+
+    columnas = {'fecha': fechas_a_dias(df['fecha'].to_numpy(dtype=str))}
+
+    for columna in COLUMNAS_CATEGORICAS:
+        categorico = pd.Categorical(df[columna])
+        columnas[f'{columna}_codigos'] = categorico.codes
+        columnas[f'{columna}_categorias'] = np.asarray(categorico.categories, dtype=str)
+
+    for columna in COLUMNAS_NUMERICAS:
+        columnas[columna] = df[columna].to_numpy(dtype=np.float64)
+
+    columnas['csv_firma'] = firma_csv(archivo_csv) if os.path.exists(archivo_csv) else np.zeros(2, np.int64)
+
+    # np.savez agrega la extensión si falta; se escribe sobre un manejador abierto
+    with open(archivo_salida, 'wb') as f:
+        np.savez(f, **columnas)
+
+    return archivo_salida
+
+
+def cargar_columnar(archivo, categorias=False, firma_esperada=None):
+    """
+    Carga el archivo columnar como DataFrame con las mismas columnas y
+    valores que el CSV. Con categorias=True las columnas de texto se
+    devuelven como pd.Categorical (más rápido y con menos memoria).
+    Retorna None si se indica una firma y no coincide con la del archivo.
+    """
+    with np.load(archivo, allow_pickle=False) as datos:
+        if firma_esperada is not None and not np.array_equal(datos['csv_firma'], firma_esperada):
+            return None
+
+        columnas = {'fecha': dias_a_fechas(datos['fecha'])}
+
+        for columna in COLUMNAS_CATEGORICAS:
+            codigos = datos[f'{columna}_codigos']
+            valores = datos[f'{columna}_categorias'].astype(object)
+
+            if categorias:
+                columnas[columna] = pd.Categorical.from_codes(codigos, valores)
+            else:
+                texto = valores.take(codigos) if len(valores) else np.full(len(codigos), np.nan, dtype=object)
+                texto[codigos < 0] = np.nan
+                columnas[columna] = texto
+
+        for columna in COLUMNAS_NUMERICAS:
+            columnas[columna] = datos[columna]
+
+    return pd.DataFrame({columna: columnas[columna] for columna in COLUMNAS})
+
+
+def cargar_consolidado(archivo_csv=ARCHIVO_CSV, categorias=False):
+    """
+    Carga el dataset consolidado. Usa el archivo columnar si existe y fue
+    generado a partir del CSV actual; si no, lee el CSV.
+    Lanza FileNotFoundError si no existe ninguno de los dos.
+    """
+    columnar = ruta_columnar(archivo_csv)
+
+    if os.path.exists(columnar):
+        try:
+            firma = firma_csv(archivo_csv) if os.path.exists(archivo_csv) else None
+            df = cargar_columnar(columnar, categorias, firma)
+            if df is not None:
+                return df
+        except (OSError, KeyError, ValueError):
+            pass
+
+    df = pd.read_csv(archivo_csv, encoding='utf-8-sig', float_precision='round_trip')
+    if categorias:
+        df = df.astype({columna: 'category' for columna in COLUMNAS_CATEGORICAS})
+    return df
@@ -35,17 +35,17 @@ def main():
     # Mostrar comparacion USD
     print("\n[COMPARACION] Evolucion del USD en marzo 2025")
     print("-" * 80)
-    usd_marzo = consulta.consultar_moneda('USD', 'marzo 1 2025', 'marzo 31 2025')
+    usd_marzo = consulta.datos_moneda('USD', 'marzo 1 2025', 'marzo 31 2025')
     if usd_marzo is not None:
         # Mostrar solo primeros 10 registros
         print("\nPrimeros 10 registros de marzo 2025:")
-        consulta.mostrar_tabla(usd_marzo.head(10), "HISTORICO USD - MARZO 2025")
+        consulta.mostrar_tabla(usd_marzo, "HISTORICO USD - MARZO 2025", max_filas=10)
 
         # Estadisticas
         print("\n[ESTADISTICAS USD - MARZO 2025]")
-        print(f"  Compra minima: Bs. {usd_marzo['Compra (Bs.)'].astype(str).str.replace(',', '').astype(float).min():,.2f}")
-        print(f"  Compra maxima: Bs. {usd_marzo['Compra (Bs.)'].astype(str).str.replace(',', '').astype(float).max():,.2f}")
-        print(f"  Promedio:      Bs. {usd_marzo['Promedio (Bs.)'].astype(str).str.replace(',', '').astype(float).mean():,.2f}")
+        print(f"  Compra minima: Bs. {usd_marzo['compra_bs'].min():,.2f}")
+        print(f"  Compra maxima: Bs. {usd_marzo['compra_bs'].max():,.2f}")
+        print(f"  Promedio:      Bs. {usd_marzo['promedio_bs'].mean():,.2f}")
 
     print("\n" + "="*80)
     print(" FIN DE LA DEMOSTRACION ".center(80, "="))
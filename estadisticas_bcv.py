@@ -0,0 +1,338 @@
+"""
+Resumenes estadisticos combinables por moneda y mes
+Cada resumen guarda conteo, suma, suma de cuadrados, minimo, maximo y el
+primer/ultimo valor (con su fecha) de una serie de tasas. Dos resumenes se
+combinan en O(1): las estadisticas de cualquier rango de meses salen de
+combinar unos pocos parciales, y un dia nuevo solo actualiza el resumen de
+su mes, sin recorrer el historico. Junto a los resumenes se guarda la huella
+de la serie de cada moneda, para reconocer si corresponden a los datos que
+se tienen a mano.
+"""
+
+import hashlib
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from datos_bcv import fechas_a_dias
+
+
+ARCHIVO_ESTADISTICAS = 'tipos_cambio_estadisticas.json'
+VERSION_ESTADISTICAS = 2
+
+# Series resumidas de cada moneda; promedio_bs es (compra + venta) / 2
+SERIES = ('compra_bs', 'venta_bs', 'promedio_bs')
+
+
+class ResumenSerie:
+    """Resumen combinable de una serie de valores con fecha"""
+
+    __slots__ = ('registros', 'suma', 'suma_cuadrados', 'minimo', 'maximo',
+                 'primera_fecha', 'primero', 'ultima_fecha', 'ultimo')
+
+    def __init__(self):
+        self.registros = 0
+        self.suma = 0.0
+        self.suma_cuadrados = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self.primera_fecha = self.primero = None
+        self.ultima_fecha = self.ultimo = None
+
+    def agregar(self, fecha, valor):
+        """Incorpora un valor en O(1)"""
+        self.registros += 1
+        self.suma += valor
+        self.suma_cuadrados += valor * valor
+        if valor < self.minimo:
+            self.minimo = valor
+        if valor > self.maximo:
+            self.maximo = valor
+        # Ante fechas repetidas: el primero que llegó y el último que llegó
+        if self.primera_fecha is None or fecha < self.primera_fecha:
+            self.primera_fecha, self.primero = fecha, valor
+        if self.ultima_fecha is None or fecha >= self.ultima_fecha:
+            self.ultima_fecha, self.ultimo = fecha, valor
+
+    def combinar(self, otro):
+        """Nuevo resumen con los valores de ambos (los de `otro`, posteriores)"""
+        resumen = ResumenSerie()
+        resumen.registros = self.registros + otro.registros
+        resumen.suma = self.suma + otro.suma
+        resumen.suma_cuadrados = self.suma_cuadrados + otro.suma_cuadrados
+        resumen.minimo = min(self.minimo, otro.minimo)
+        resumen.maximo = max(self.maximo, otro.maximo)
+
+        if otro.primera_fecha is not None and (self.primera_fecha is None or otro.primera_fecha < self.primera_fecha):
+            resumen.primera_fecha, resumen.primero = otro.primera_fecha, otro.primero
+        else:
+            resumen.primera_fecha, resumen.primero = self.primera_fecha, self.primero
+        if otro.ultima_fecha is not None and (self.ultima_fecha is None or otro.ultima_fecha >= self.ultima_fecha):
+            resumen.ultima_fecha, resumen.ultimo = otro.ultima_fecha, otro.ultimo
+        else:
+            resumen.ultima_fecha, resumen.ultimo = self.ultima_fecha, self.ultimo
+        return resumen
+
+    @property
+    def promedio(self):
+        return self.suma / self.registros if self.registros else None
+
+    @property
+    def desviacion(self):
+        """Desviación estándar poblacional"""
+        if not self.registros:
+            return None
+        media = self.suma / self.registros
+        return math.sqrt(max(self.suma_cuadrados / self.registros - media * media, 0.0))
+
+    @property
+    def variacion(self):
+        """Cambio porcentual del primer al último valor"""
+        if not self.registros or not self.primero:
+            return None
+        return (self.ultimo - self.primero) / self.primero * 100
+
+    def a_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        resumen = cls()
+        for campo in cls.__slots__:
+            setattr(resumen, campo, datos[campo])
+        return resumen
+
+
+def huella_serie(fechas, compra, venta):
+    """
+    Huella (sha256) de la serie de una moneda en orden de fecha, con las
+    tasas redondeadas a 8 decimales como en los JSON
+    """
+    huella = hashlib.sha256()
+    huella.update(fechas_a_dias(list(fechas)).tobytes())
+    for valores in (compra, venta):
+        huella.update(np.array([round(float(valor), 8) for valor in valores], dtype=np.float64).tobytes())
+    return huella.hexdigest()
+
+
+def _mes(fecha):
+    """Mes 'YYYY-MM' de una fecha 'YYYY-MM-DD' (o de un mes)"""
+    return fecha[:7]
+
+
+class EstadisticasTasas:
+    def __init__(self):
+        # {moneda: {'pais': pais, 'meses': {'YYYY-MM': {serie: ResumenSerie}}}}
+        self.monedas = {}
+        # {moneda: huella_serie de los datos resumidos}
+        self.huellas = {}
+
+    @classmethod
+    def desde_dataframe(cls, df):
+        """
+        Resúmenes del dataset consolidado. Equivale a agregar las filas una a
+        una en su orden: cada suma se acumula en el mismo orden (cumsum), de
+        modo que el resultado coincide exactamente con el de resúmenes
+        actualizados día a día.
+        """
+        estadisticas = cls()
+        if df.empty:
+            return estadisticas
+
+        codigos, monedas = pd.factorize(df['moneda'])
+        dias = fechas_a_dias(df['fecha'].to_numpy(dtype=object))
+        meses = dias.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+        # El país de cada moneda es el de su primera fila
+        _, primeras = np.unique(codigos, return_index=True)
+        paises = df['pais'].to_numpy(dtype=object)
+        for codigo, moneda in enumerate(monedas.tolist()):
+            estadisticas.monedas[moneda] = {'pais': paises[primeras[codigo]], 'meses': {}}
+
+        # Filas agrupadas por (moneda, mes), conservando su orden dentro de cada grupo
+        orden = np.lexsort((meses, codigos))
+        codigos, dias, meses = codigos[orden], dias[orden], meses[orden]
+        fechas = df['fecha'].to_numpy(dtype=object)[orden]
+        compra = df['compra_bs'].to_numpy(dtype=np.float64)[orden]
+        venta = df['venta_bs'].to_numpy(dtype=np.float64)[orden]
+        valores = {'compra_bs': compra, 'venta_bs': venta, 'promedio_bs': (compra + venta) / 2}
+
+        nuevo_grupo = np.ones(len(orden), dtype=bool)
+        nuevo_grupo[1:] = (codigos[1:] != codigos[:-1]) | (meses[1:] != meses[:-1])
+        inicios = np.flatnonzero(nuevo_grupo)
+        grupo = np.cumsum(nuevo_grupo) - 1
+        posicion = np.arange(len(orden)) - inicios[grupo]
+        grupos = np.arange(len(inicios))
+
+        # Primera aparición de la fecha mínima y última aparición de la máxima de cada grupo
+        candidatos = np.flatnonzero(dias == np.minimum.reduceat(dias, inicios)[grupo])
+        primeros = candidatos[np.searchsorted(grupo[candidatos], grupos)]
+        candidatos = np.flatnonzero(dias == np.maximum.reduceat(dias, inicios)[grupo])
+        ultimos = candidatos[np.searchsorted(grupo[candidatos], grupos, side='right') - 1]
+
+        def suma_secuencial(columna):
+            # Cada grupo es una fila (completada con ceros) y cumsum suma en
+            # orden a lo largo de ella, como lo hace agregar valor a valor
+            matriz = np.zeros((len(inicios), int(posicion.max()) + 1))
+            matriz[grupo, posicion] = columna
+            return np.cumsum(matriz, axis=1)[:, -1]
+
+        campos = {}
+        for serie, columna in valores.items():
+            campos[serie] = list(zip(
+                np.diff(np.append(inicios, len(orden))).tolist(),
+                suma_secuencial(columna).tolist(),
+                suma_secuencial(columna * columna).tolist(),
+                np.minimum.reduceat(columna, inicios).tolist(),
+                np.maximum.reduceat(columna, inicios).tolist(),
+                fechas[primeros].tolist(), columna[primeros].tolist(),
+                fechas[ultimos].tolist(), columna[ultimos].tolist()
+            ))
+
+        for numero, inicio in enumerate(inicios.tolist()):
+            resumenes = {}
+            for serie in SERIES:
+                resumen = resumenes[serie] = ResumenSerie()
+                (resumen.registros, resumen.suma, resumen.suma_cuadrados, resumen.minimo, resumen.maximo,
+                 resumen.primera_fecha, resumen.primero, resumen.ultima_fecha, resumen.ultimo) = campos[serie][numero]
+            estadisticas.monedas[monedas[codigos[inicio]]]['meses'][_mes(fechas[inicio])] = resumenes
+
+        estadisticas.firmar(df)
+        return estadisticas
+
+    def firmar(self, df):
+        """
+        Registra la huella de la serie de cada moneda del DataFrame; tras
+        agregar filas hay que volver a firmar con el dataset completo
+        """
+        ordenado = df.sort_values('fecha', kind='stable')
+        self.huellas = {
+            moneda: huella_serie(grupo['fecha'].tolist(), grupo['compra_bs'].tolist(), grupo['venta_bs'].tolist())
+            for moneda, grupo in ordenado.groupby('moneda', sort=False)
+        }
+
+    def corresponde(self, moneda, fechas, compra, venta):
+        """Indica si los resúmenes de la moneda son los de esta serie (fechas en orden)"""
+        huella = self.huellas.get(moneda)
+        return huella is not None and huella == huella_serie(fechas, compra, venta)
+
+    def agregar(self, fecha, moneda, compra, venta, pais=''):
+        """Incorpora una tasa (fecha ISO) en O(1): solo cambia el resumen de su mes"""
+        entrada = self.monedas.get(moneda)
+        if entrada is None:
+            entrada = self.monedas[moneda] = {'pais': pais, 'meses': {}}
+
+        mes = _mes(fecha)
+        resumenes = entrada['meses'].get(mes)
+        if resumenes is None:
+            resumenes = entrada['meses'][mes] = {serie: ResumenSerie() for serie in SERIES}
+
+        compra, venta = float(compra), float(venta)
+        resumenes['compra_bs'].agregar(fecha, compra)
+        resumenes['venta_bs'].agregar(fecha, venta)
+        resumenes['promedio_bs'].agregar(fecha, (compra + venta) / 2)
+
+    def agregar_filas(self, df):
+        """Incorpora las filas de un DataFrame con las columnas del consolidado, en su orden"""
+        for fila in zip(*(df[c].tolist() for c in ('fecha', 'moneda', 'compra_bs', 'venta_bs', 'pais'))):
+            self.agregar(*fila)
+
+    def resumen(self, moneda, serie='promedio_bs', desde=None, hasta=None):
+        """
+        Resumen de una serie de la moneda combinando sus parciales mensuales
+        entre desde y hasta (meses 'YYYY-MM' o fechas ISO, de las que se toma
+        el mes; inclusive). Retorna None si la moneda no existe.
+        """
+        entrada = self.monedas.get(moneda)
+        if entrada is None:
+            return None
+
+        total = ResumenSerie()
+        for mes in sorted(entrada['meses']):
+            if desde and mes < _mes(desde):
+                continue
+            if hasta and mes > _mes(hasta):
+                break
+            total = total.combinar(entrada['meses'][mes][serie])
+        return total
+
+    def meses(self, moneda):
+        """Meses con datos de la moneda, en orden"""
+        entrada = self.monedas.get(moneda)
+        return sorted(entrada['meses']) if entrada else []
+
+    def por_moneda(self):
+        """
+        Estadísticas de todo el histórico por moneda, con la forma de
+        'estadisticas' en tipos_cambio_resumen.json
+        """
+        stats_por_moneda = {}
+        for moneda, entrada in self.monedas.items():
+            compra = self.resumen(moneda, 'compra_bs')
+            venta = self.resumen(moneda, 'venta_bs')
+            # Redondeo de NumPy, el mismo que se usó siempre para estas cifras
+            stats_por_moneda[moneda] = {
+                'pais': entrada['pais'],
+                'registros': compra.registros,
+                'compra_min': float(np.round(compra.minimo, 2)),
+                'compra_max': float(np.round(compra.maximo, 2)),
+                'compra_promedio': float(np.round(compra.promedio, 2)),
+                'venta_min': float(np.round(venta.minimo, 2)),
+                'venta_max': float(np.round(venta.maximo, 2)),
+                'venta_promedio': float(np.round(venta.promedio, 2))
+            }
+        return stats_por_moneda
+
+    def a_dict(self):
+        return {
+            'version': VERSION_ESTADISTICAS,
+            'series': list(SERIES),
+            'huellas': self.huellas,
+            'monedas': {
+                moneda: {
+                    'pais': entrada['pais'],
+                    'meses': {
+                        mes: {serie: resumen.a_dict() for serie, resumen in resumenes.items()}
+                        for mes, resumenes in entrada['meses'].items()
+                    }
+                }
+                for moneda, entrada in self.monedas.items()
+            }
+        }
+
+    def escribir(self, f):
+        """Escribe los resúmenes como JSON compacto"""
+        json.dump(self.a_dict(), f, ensure_ascii=False, separators=(',', ':'))
+
+    def guardar(self, archivo=ARCHIVO_ESTADISTICAS):
+        with open(archivo, 'w', encoding='utf-8') as f:
+            self.escribir(f)
+
+    @classmethod
+    def cargar(cls, archivo=ARCHIVO_ESTADISTICAS):
+        """
+        Resúmenes guardados en un archivo.
+        Retorna None si no existe, está dañado o tiene una versión distinta.
+        """
+        try:
+            with open(archivo, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if datos.get('version') != VERSION_ESTADISTICAS:
+            return None
+
+        estadisticas = cls()
+        estadisticas.huellas = datos['huellas']
+        for moneda, entrada in datos['monedas'].items():
+            estadisticas.monedas[moneda] = {
+                'pais': entrada['pais'],
+                'meses': {
+                    mes: {serie: ResumenSerie.desde_dict(resumen) for serie, resumen in resumenes.items()}
+                    for mes, resumenes in entrada['meses'].items()
+                }
+            }
+        return estadisticas
@@ -4,84 +4,91 @@ Genera un JSON limpio con solo datos de USD
 """
 
 import json
-import pandas as pd
+import os
 
+from datos_bcv import cargar_consolidado
 
-def exportar_solo_usd_desde_json():
+
+def usd_desde_por_fecha(datos_por_fecha):
+    """{fecha: datos USD} a partir de la estructura de tipos_cambio_por_fecha.json"""
+    return {fecha: monedas['USD'] for fecha, monedas in datos_por_fecha.items() if 'USD' in monedas}
+
+
+def usd_detallado(df):
+    """{fecha: datos USD con 'fuente'} a partir de filas del consolidado"""
+    usd_por_fecha = {}
+
+    for _, row in df[df['moneda'] == 'USD'].iterrows():
+        usd_por_fecha[row['fecha']] = {
+            'pais': row['pais'],
+            'compra_bs': round(row['compra_bs'], 8),
+            'venta_bs': round(row['venta_bs'], 8),
+            'promedio_bs': round((row['compra_bs'] + row['venta_bs']) / 2, 8),
+            'fuente': row['fuente']
+        }
+
+    return usd_por_fecha
+
+
+def exportar_solo_usd_desde_json(directorio='.'):
     """Extrae USD del JSON por fecha"""
     print("[*] Cargando tipos_cambio_por_fecha.json...")
 
-    with open('tipos_cambio_por_fecha.json', 'r', encoding='utf-8') as f:
+    with open(os.path.join(directorio, 'tipos_cambio_por_fecha.json'), 'r', encoding='utf-8') as f:
         datos_completos = json.load(f)
 
     # Extraer solo USD de cada fecha
-    usd_por_fecha = {}
-
-    for fecha, monedas in datos_completos.items():
-        if 'USD' in monedas:
-            usd_por_fecha[fecha] = monedas['USD']
+    usd_por_fecha = usd_desde_por_fecha(datos_completos)
 
     # Guardar archivo
-    with open('tipos_cambio_usd.json', 'w', encoding='utf-8') as f:
+    with open(os.path.join(directorio, 'tipos_cambio_usd.json'), 'w', encoding='utf-8') as f:
         json.dump(usd_por_fecha, f, ensure_ascii=False, indent=2)
 
     print(f"[OK] Exportado: {len(usd_por_fecha)} fechas con datos de USD")
     print(f"    Archivo: tipos_cambio_usd.json")
 
     # Calcular tamaño
-    import os
-    size_kb = os.path.getsize('tipos_cambio_usd.json') / 1024
+    size_kb = os.path.getsize(os.path.join(directorio, 'tipos_cambio_usd.json')) / 1024
     print(f"    Tamaño: {size_kb:.1f} KB")
 
     return usd_por_fecha
 
 
-def exportar_solo_usd_desde_csv():
-    """Extrae USD del CSV original (alternativa)"""
+def exportar_solo_usd_desde_csv(directorio='.', df=None):
+    """Extrae USD del CSV original (alternativa); df: consolidado ya cargado"""
     print("\n[*] Cargando CSV y filtrando USD...")
 
-    df = pd.read_csv('tipos_cambio_bcv_consolidado.csv', encoding='utf-8-sig')
-    usd_df = df[df['moneda'] == 'USD'].copy()
+    if df is None:
+        df = cargar_consolidado(os.path.join(directorio, 'tipos_cambio_bcv_consolidado.csv'))
 
     # Crear estructura indexada por fecha
-    usd_por_fecha = {}
-
-    for _, row in usd_df.iterrows():
-        usd_por_fecha[row['fecha']] = {
-            'pais': row['pais'],
-            'compra_bs': round(row['compra_bs'], 8),
-            'venta_bs': round(row['venta_bs'], 8),
-            'promedio_bs': round((row['compra_bs'] + row['venta_bs']) / 2, 8),
-            'fuente': row['fuente']
-        }
+    usd_por_fecha = usd_detallado(df)
 
     # Guardar archivo con mas detalle
-    with open('tipos_cambio_usd_detallado.json', 'w', encoding='utf-8') as f:
+    with open(os.path.join(directorio, 'tipos_cambio_usd_detallado.json'), 'w', encoding='utf-8') as f:
         json.dump(usd_por_fecha, f, ensure_ascii=False, indent=2)
 
     print(f"[OK] Exportado: {len(usd_por_fecha)} fechas con USD detallado")
     print(f"    Archivo: tipos_cambio_usd_detallado.json")
 
     # Calcular tamaño
-    import os
-    size_kb = os.path.getsize('tipos_cambio_usd_detallado.json') / 1024
+    size_kb = os.path.getsize(os.path.join(directorio, 'tipos_cambio_usd_detallado.json')) / 1024
     print(f"    Tamaño: {size_kb:.1f} KB")
 
     return usd_por_fecha
 
 
-def exportar_usd_compacto():
+def exportar_usd_compacto(directorio='.'):
     """Versión compacta sin indentación"""
     print("\n[*] Generando version compacta...")
 
-    with open('tipos_cambio_usd.json', 'r', encoding='utf-8') as f:
+    with open(os.path.join(directorio, 'tipos_cambio_usd.json'), 'r', encoding='utf-8') as f:
         datos = json.load(f)
 
-    with open('tipos_cambio_usd_compacto.json', 'w', encoding='utf-8') as f:
+    with open(os.path.join(directorio, 'tipos_cambio_usd_compacto.json'), 'w', encoding='utf-8') as f:
         json.dump(datos, f, ensure_ascii=False, separators=(',', ':'))
 
-    import os
-    size_kb = os.path.getsize('tipos_cambio_usd_compacto.json') / 1024
+    size_kb = os.path.getsize(os.path.join(directorio, 'tipos_cambio_usd_compacto.json')) / 1024
     print(f"[OK] Version compacta guardada")
     print(f"    Archivo: tipos_cambio_usd_compacto.json")
     print(f"    Tamaño: {size_kb:.1f} KB")
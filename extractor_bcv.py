@@ -4,16 +4,51 @@ Consolida datos de archivos Excel trimestrales en un dataset unificado
 """
 
 import pandas as pd
+import argparse
+import hashlib
+import json
+import math
 import os
 import re
-from datetime import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
 from pathlib import Path
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+from xlrd import XL_CELL_BOOLEAN, XL_CELL_DATE, XL_CELL_ERROR, XL_CELL_NUMBER, open_workbook, xldate
+
+from almacen_bcv import construir_almacen, ruta_almacen
+from datos_bcv import cargar_consolidado, guardar_columnar, ruta_columnar
+from fechas_bcv import normalizar_fecha
+from perfil_bcv import MODOS_PERFIL, PerfilExtraccion
+
+
+# Filas del encabezado que se leen completas (fechas y títulos de columnas)
+FILAS_ENCABEZADO = 15
+
+# Columnas usadas de la sección de datos: B=Moneda, C=País, F=Compra Bs, G=Venta Bs
+COLUMNAS_DATOS = (1, 2, 5, 6)
+
+# Patrón de fecha en las celdas del encabezado: DD/MM/YYYY
+PATRON_FECHA_CELDA = re.compile(r'(\d{2})/(\d{2})/(\d{4})')
+
+# Manifiesto de archivos y hojas ya procesados (modo incremental)
+ARCHIVO_MANIFIESTO = 'manifiesto_extraccion.json'
+VERSION_MANIFIESTO = 2
 
 
 class ExtractorBCV:
-    def __init__(self, directorio_data='Data_xls'):
+    def __init__(self, directorio_data='Data_xls', modo_perfil=None):
         self.directorio = directorio_data
+        # Tiempos por etapa; modo_perfil: None, 'cprofile' o 'tracemalloc'
+        self.perfil = PerfilExtraccion(modo_perfil)
         self.datos_consolidados = []
+        # Archivos que no se pudieron leer: {nombre: mensaje de error}
+        self.errores = {}
+        self.manifiesto = {'version': VERSION_MANIFIESTO, 'archivos': {}}
+        # Disposición aprendida de la primera hoja de cada archivo
+        self.plantillas = {}
 
     def extraer_fecha_hoja(self, nombre_hoja):
         """
@@ -35,108 +70,286 @@ class ExtractorBCV:
         Extrae la fecha de las celdas del encabezado (formato DD/MM/YYYY)
         Busca en las primeras filas por 'Fecha Valor:' o 'Fecha Operacion:'
         """
+        encontrada = self._buscar_fecha_celda(df, texto_buscar)
+        return encontrada[0] if encontrada else None
+
+    def _buscar_fecha_celda(self, df, texto_buscar):
+        """
+        Busca la primera celda de las primeras 10 filas que contiene el texto
+        y una fecha. Retorna (fecha, fila, columna) o None.
+        """
         try:
-            # Buscar en las primeras 10 filas
-            for idx in range(min(10, len(df))):
-                for col in df.columns:
-                    valor = str(df.iloc[idx, col])
-                    if texto_buscar in valor:
-                        # Extraer fecha con regex: DD/MM/YYYY
-                        match = re.search(r'(\d{2})/(\d{2})/(\d{4})', valor)
-                        if match:
-                            dia, mes, anio = match.groups()
-                            return f"{anio}-{mes}-{dia}"
+            valores = df.to_numpy()[:10]
+            for idx, fila in enumerate(valores):
+                for col, celda in enumerate(fila):
+                    fecha = _fecha_en_texto(str(celda), texto_buscar)
+                    if fecha:
+                        return fecha, idx, col
         except:
             pass
         return None
 
-    def procesar_hoja(self, archivo, nombre_hoja):
+    def _buscar_fila_encabezado(self, df):
+        """
+        Busca la fila con los títulos 'Compra (BID)' y 'Venta (ASK)' en las
+        primeras 15 filas. Retorna su índice o None.
+        """
+        for idx in range(min(15, len(df))):
+            if _es_fila_encabezado(df.iloc[idx].values):
+                return idx
+        return None
+
+    def _aplicar_plantilla(self, df, plantilla):
+        """
+        Valida una hoja contra la disposición aprendida (celda de Fecha Valor y
+        fila de títulos). Retorna (fecha, inicio_datos) o None si no coincide.
+        """
+        fila_fecha, col_fecha = plantilla['celda_fecha']
+        fila_encabezado = plantilla['fila_encabezado']
+
+        if len(df) <= max(fila_fecha, fila_encabezado) or df.shape[1] <= col_fecha:
+            return None
+
+        fecha = _fecha_en_texto(str(df.iat[fila_fecha, col_fecha]), 'Fecha Valor:')
+        if not fecha or not _es_fila_encabezado(df.iloc[fila_encabezado].values):
+            return None
+
+        return fecha, fila_encabezado + 1
+
+    def leer_hoja(self, libro, nombre_hoja):
+        """
+        Lee una hoja desde un libro ya abierto (pd.ExcelFile) sin volver a
+        parsear el archivo. Solo se materializan las filas del encabezado y
+        las columnas B/C/F/G de la sección de datos; el resto queda vacío.
+        El resultado tiene las mismas posiciones y tipos que pd.read_excel.
+        """
+        hoja = libro.book.sheet_by_name(nombre_hoja)
+        modo_fecha = libro.book.datemode
+        columnas = [c for c in COLUMNAS_DATOS if c < hoja.ncols]
+
+        filas = []
+        for idx in range(hoja.nrows):
+            if idx < FILAS_ENCABEZADO:
+                fila = [_valor_celda(celda.value, celda.ctype, modo_fecha)
+                        for celda in hoja.row(idx)]
+            else:
+                fila = [''] * hoja.ncols
+                for col in columnas:
+                    celda = hoja.cell(idx, col)
+                    fila[col] = _valor_celda(celda.value, celda.ctype, modo_fecha)
+            filas.append(fila)
+
+        try:
+            return TextParser(filas, header=None, skip_blank_lines=False).read()
+        except EmptyDataError:
+            return pd.DataFrame()
+
+    def abrir_libro(self, ruta_archivo):
+        """Abre un archivo Excel (pd.ExcelFile) registrando la etapa"""
+        with self.perfil.etapa('apertura_libro', os.path.basename(ruta_archivo)) as evento:
+            libro = pd.ExcelFile(ruta_archivo)
+            evento['bytes'] = os.path.getsize(ruta_archivo)
+        return libro
+
+    def procesar_hoja(self, archivo, nombre_hoja, libro=None):
         """
         Procesa una hoja individual del archivo Excel
+
+        Parámetros:
+        - libro: pd.ExcelFile ya abierto; si no se indica se abre el archivo
+          y se cierra al terminar
         """
+        if libro is None:
+            try:
+                with self.abrir_libro(archivo) as libro:
+                    return self.procesar_hoja(archivo, nombre_hoja, libro)
+            except Exception as e:
+                print(f"  [X] Error procesando {nombre_hoja}: {e}")
+                return []
+
         try:
-            # Leer la hoja completa sin procesar
-            df = pd.read_excel(archivo, sheet_name=nombre_hoja, header=None)
+            fuente = os.path.basename(archivo)
 
-            # 1. Obtener fecha (priorizar Fecha Valor)
-            fecha = None
-            origen_fecha = None
+            with self.perfil.etapa('lectura_hoja', fuente, nombre_hoja) as evento:
+                df = self.leer_hoja(libro, nombre_hoja)
+                evento['filas'] = len(df)
 
-            # Intentar obtener de Fecha Valor
-            fecha = self.extraer_fecha_celda(df, 'Fecha Valor:')
-            if fecha:
-                origen_fecha = 'fecha_valor'
-            else:
-                # Intentar Fecha Operación
-                fecha = self.extraer_fecha_celda(df, 'Fecha Operacion:')
-                if fecha:
-                    origen_fecha = 'fecha_operacion'
+            with self.perfil.etapa('deteccion_encabezado', fuente, nombre_hoja):
+                # Ruta rápida: hojas con la misma disposición que la primera del archivo
+                plantilla = self.plantillas.get(fuente)
+                disposicion = self._aplicar_plantilla(df, plantilla) if plantilla else None
+
+                if disposicion:
+                    fecha, inicio_datos = disposicion
+                    origen_fecha = 'fecha_valor'
                 else:
-                    # Usar nombre de hoja como último recurso
-                    fecha = self.extraer_fecha_hoja(nombre_hoja)
-                    if fecha:
-                        origen_fecha = 'sheet_name'
+                    fecha, origen_fecha, inicio_datos = self._detectar_disposicion(df, nombre_hoja, fuente)
 
             if not fecha:
                 print(f"  [!] No se pudo extraer fecha de {nombre_hoja}")
                 return []
 
-            # 2. Encontrar la fila donde empiezan los datos
-            # Buscar la fila que contiene "Moneda/País" o "Bs./M.E."
-            inicio_datos = None
-            for idx in range(min(15, len(df))):
-                fila_str = ' '.join([str(x) for x in df.iloc[idx].values if pd.notna(x)])
-                if 'Compra (BID)' in fila_str and 'Venta (ASK)' in fila_str:
-                    inicio_datos = idx + 1  # Los datos empiezan en la siguiente fila
-                    break
-
             if inicio_datos is None:
                 print(f"  [!] No se encontro estructura de datos en {nombre_hoja}")
                 return []
 
             # 3. Leer los datos desde la fila identificada
             # Estructura: Col B=Moneda, Col C=País, Col F=Compra Bs, Col G=Venta Bs
-            registros = []
+            with self.perfil.etapa('parseo_filas', fuente, nombre_hoja) as evento:
+                registros = self.extraer_registros(df, inicio_datos, fecha, fuente, origen_fecha)
+                evento['filas'] = len(registros)
 
-            for idx in range(inicio_datos, len(df)):
-                fila = df.iloc[idx]
+            return registros
 
-                # Verificar que hay datos en las columnas esperadas
-                moneda = fila.iloc[1] if len(fila) > 1 else None
-                pais = fila.iloc[2] if len(fila) > 2 else None
-                compra_bs = fila.iloc[5] if len(fila) > 5 else None
-                venta_bs = fila.iloc[6] if len(fila) > 6 else None
+        except Exception as e:
+            print(f"  [X] Error procesando {nombre_hoja}: {e}")
+            return []
 
-                # Validar que tenemos datos válidos
-                if pd.isna(moneda) or pd.isna(compra_bs) or pd.isna(venta_bs):
-                    continue
+    def _detectar_disposicion(self, df, nombre_hoja, fuente):
+        """
+        Búsqueda completa de la fecha y de la fila de inicio de datos.
+        Si la fecha viene de 'Fecha Valor:' y se encuentran los títulos, la
+        disposición se guarda como plantilla para las siguientes hojas.
+        Retorna (fecha, origen_fecha, inicio_datos).
+        """
+        # 1. Obtener fecha (priorizar Fecha Valor)
+        fecha = None
+        origen_fecha = None
+        celda_fecha = None
+
+        # Intentar obtener de Fecha Valor
+        encontrada = self._buscar_fecha_celda(df, 'Fecha Valor:')
+        if encontrada:
+            fecha, fila, col = encontrada
+            origen_fecha = 'fecha_valor'
+            celda_fecha = (fila, col)
+        else:
+            # Intentar Fecha Operación
+            fecha = self.extraer_fecha_celda(df, 'Fecha Operacion:')
+            if fecha:
+                origen_fecha = 'fecha_operacion'
+            else:
+                # Usar nombre de hoja como último recurso
+                fecha = self.extraer_fecha_hoja(nombre_hoja)
+                if fecha:
+                    origen_fecha = 'sheet_name'
 
-                # Verificar que compra y venta son números
-                try:
-                    compra_bs = float(compra_bs)
-                    venta_bs = float(venta_bs)
-                except:
-                    continue
+        if not fecha:
+            return None, None, None
 
-                # Crear registro
-                registro = {
-                    'fecha': fecha,
-                    'moneda': str(moneda).strip(),
-                    'pais': str(pais).strip() if pd.notna(pais) else '',
-                    'compra_bs': compra_bs,
-                    'venta_bs': venta_bs,
-                    'fuente': os.path.basename(archivo),
-                    'origen_fecha': origen_fecha
-                }
+        # 2. Encontrar la fila donde empiezan los datos
+        # Buscar la fila que contiene "Compra (BID)" y "Venta (ASK)"
+        fila_encabezado = self._buscar_fila_encabezado(df)
+        if fila_encabezado is None:
+            return fecha, origen_fecha, None
 
-                registros.append(registro)
+        if celda_fecha:
+            self.plantillas[fuente] = {
+                'celda_fecha': celda_fecha,
+                'fila_encabezado': fila_encabezado
+            }
 
-            return registros
+        # Los datos empiezan en la fila siguiente a los títulos
+        return fecha, origen_fecha, fila_encabezado + 1
 
-        except Exception as e:
-            print(f"  [X] Error procesando {nombre_hoja}: {e}")
+    def extraer_registros(self, df, inicio_datos, fecha, fuente, origen_fecha):
+        """
+        Extrae los registros de la sección de datos de una hoja.
+        Las columnas B/C/F/G se toman una sola vez y se validan en bloque:
+        se descartan filas sin moneda o con compra/venta vacías o no numéricas.
+        """
+        if df.shape[1] <= max(COLUMNAS_DATOS):
             return []
 
+        datos = df.to_numpy(dtype=object)[inicio_datos:, list(COLUMNAS_DATOS)]
+        moneda, pais, compra_bs, venta_bs = datos.T
+
+        compra_num = pd.to_numeric(compra_bs, errors='coerce').astype(float)
+        venta_num = pd.to_numeric(venta_bs, errors='coerce').astype(float)
+
+        validos = ~pd.isna(moneda) & ~pd.isna(compra_num) & ~pd.isna(venta_num)
+        if not validos.any():
+            return []
+
+        monedas = [str(m).strip() for m in moneda[validos]]
+        paises = [str(p).strip() if pd.notna(p) else '' for p in pais[validos]]
+
+        return [
+            {
+                'fecha': fecha,
+                'moneda': m,
+                'pais': p,
+                'compra_bs': c,
+                'venta_bs': v,
+                'fuente': fuente,
+                'origen_fecha': origen_fecha
+            }
+            for m, p, c, v in zip(monedas, paises,
+                                  compra_num[validos].tolist(),
+                                  venta_num[validos].tolist())
+        ]
+
+    def iterar_lotes_archivo(self, ruta_archivo, ordenado=False):
+        """
+        Genera (nombre_hoja, registros) por cada hoja de un archivo Excel.
+        El libro se cierra al terminar, así que solo hay uno abierto a la vez.
+
+        Parámetros:
+        - ordenado: recorrer las hojas por la fecha de su nombre (DDMMYYYY)
+        """
+        with self.abrir_libro(ruta_archivo) as xls:
+            print(f"   Hojas encontradas: {len(xls.sheet_names)}")
+
+            self._registrar_archivo(ruta_archivo)
+
+            hojas = xls.sheet_names
+            if ordenado:
+                hojas = sorted(hojas, key=lambda h: self.extraer_fecha_hoja(h) or '')
+
+            for nombre_hoja in hojas:
+                registros = self.procesar_hoja(ruta_archivo, nombre_hoja, xls)
+                self._registrar_hoja(ruta_archivo, nombre_hoja,
+                                     _huella_hoja(xls, nombre_hoja), registros)
+
+                if registros:
+                    print(f"   [OK] {nombre_hoja}: {len(registros)} monedas extraidas")
+
+                yield nombre_hoja, registros
+
+    def iterar_lotes(self, ordenado=False):
+        """
+        Genera los registros de todos los archivos .xls como lotes por hoja:
+        (fuente, nombre_hoja, registros). Los registros no se acumulan, por
+        lo que la memoria no depende del tamaño del histórico.
+
+        Parámetros:
+        - ordenado: entregar los lotes en orden cronológico (archivos por la
+          fecha de su primera hoja y hojas por la fecha de su nombre), para
+          que un consumidor pueda escribir la salida ordenada sin acumularla
+        """
+        rutas = sorted(str(a) for a in Path(self.directorio).glob('*.xls'))
+        if ordenado:
+            rutas = sorted(rutas, key=self._primera_fecha_archivo)
+
+        for ruta in rutas:
+            print(f"\n[*] Procesando: {os.path.basename(ruta)}")
+            try:
+                for nombre_hoja, registros in self.iterar_lotes_archivo(ruta, ordenado):
+                    if registros:
+                        yield os.path.basename(ruta), nombre_hoja, registros
+            except Exception as e:
+                print(f"   [X] Error: {e}")
+                self.errores[os.path.basename(ruta)] = str(e)
+
+    def _primera_fecha_archivo(self, ruta_archivo):
+        """Fecha más antigua según los nombres de hoja, sin cargar las hojas"""
+        libro = open_workbook(ruta_archivo, on_demand=True)
+        try:
+            fechas = [self.extraer_fecha_hoja(h) for h in libro.sheet_names()]
+        finally:
+            libro.release_resources()
+        return min((f for f in fechas if f), default='')
+
     def procesar_archivo(self, ruta_archivo):
         """
         Procesa todas las hojas de un archivo Excel trimestral
@@ -144,25 +357,282 @@ class ExtractorBCV:
         print(f"\n[*] Procesando: {os.path.basename(ruta_archivo)}")
 
         try:
-            xls = pd.ExcelFile(ruta_archivo)
-            print(f"   Hojas encontradas: {len(xls.sheet_names)}")
+            for _, registros in self.iterar_lotes_archivo(ruta_archivo):
+                self.datos_consolidados.extend(registros)
+
+        except Exception as e:
+            print(f"   [X] Error: {e}")
+            self.errores[os.path.basename(ruta_archivo)] = str(e)
 
+    def _repartir_tareas(self, rutas, procesos):
+        """
+        Divide los archivos en tareas (archivo, grupo de hojas) para el pool.
+        Si hay menos archivos que procesos, las hojas de cada archivo se
+        reparten en varios grupos contiguos para ocupar todos los núcleos.
+        Solo se leen los nombres de las hojas (sin cargarlas); un archivo que
+        no se puede abrir queda como una tarea sin hojas y el trabajador
+        informa el error, igual que en modo secuencial.
+        """
+        grupos_por_archivo = max(1, -(-procesos // len(rutas)))
+        tareas = []
+
+        for ruta in rutas:
+            try:
+                libro = open_workbook(ruta, on_demand=True)
+            except Exception:
+                tareas.append((ruta, []))
+                continue
+            try:
+                hojas = libro.sheet_names()
+            finally:
+                libro.release_resources()
+
+            tamano = max(1, -(-len(hojas) // grupos_por_archivo))
+            for i in range(0, len(hojas), tamano):
+                tareas.append((ruta, hojas[i:i + tamano]))
+
+        return tareas
+
+    def procesar_en_paralelo(self, rutas, procesos):
+        """
+        Procesa los archivos repartiendo hojas entre varios procesos.
+        Los registros se agregan en el mismo orden (archivo, hoja) que la
+        extracción secuencial, por lo que el resultado final es idéntico.
+        Si alguna tarea de un archivo falla, el archivo se informa y se
+        omite completo, como en procesar_archivo.
+        """
+        print(f"[*] Modo paralelo: {procesos} procesos")
+
+        tareas = self._repartir_tareas(rutas, procesos)
+        tiempos_por_proceso = {}
+
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            futuros = [
+                pool.submit(_procesar_tarea, self.directorio, ruta, hojas)
+                for ruta, hojas in tareas
+            ]
+
+            # Las tareas de un mismo archivo son contiguas
+            for ruta, grupo in groupby(zip(tareas, futuros), key=lambda t: t[0][0]):
+                resultados = [(hojas, futuro.result()) for (_, hojas), futuro in grupo]
+                print(f"\n[*] Procesando: {os.path.basename(ruta)}")
+
+                for hojas, resultado in resultados:
+                    self.perfil.agregar_eventos(resultado['eventos'])
+
+                    tiempo = tiempos_por_proceso.setdefault(resultado['pid'], [0, 0, 0.0])
+                    tiempo[0] += 1
+                    tiempo[1] += len(hojas)
+                    tiempo[2] += resultado['segundos']
+
+                error = next((r['error'] for _, r in resultados if r['error']), None)
+                if error:
+                    print(f"   [X] Error: {error}")
+                    self.errores[os.path.basename(ruta)] = error
+                    continue
+
+                self._registrar_archivo(ruta)
+                for hojas, resultado in resultados:
+                    for nombre_hoja, registros, huella in zip(
+                            hojas, resultado['registros'], resultado['huellas']):
+                        self.datos_consolidados.extend(registros)
+                        self._registrar_hoja(ruta, nombre_hoja, huella, registros)
+                        if registros:
+                            print(f"   [OK] {nombre_hoja}: {len(registros)} monedas extraidas")
+
+        print("\n[*] Tiempo por proceso:")
+        for pid, (n_tareas, n_hojas, segundos) in sorted(tiempos_por_proceso.items()):
+            print(f"   PID {pid}: {n_tareas} tareas, {n_hojas} hojas, {segundos:.2f} s")
+
+    def _registrar_archivo(self, ruta_archivo):
+        """Registra la huella de un archivo en el manifiesto"""
+        self.manifiesto['archivos'][os.path.basename(ruta_archivo)] = {
+            **_huella_archivo(ruta_archivo),
+            'hojas': {}
+        }
+
+    def _registrar_hoja(self, ruta_archivo, nombre_hoja, huella, registros):
+        """Registra una hoja procesada (huella, fecha y registros) en el manifiesto"""
+        self.manifiesto['archivos'][os.path.basename(ruta_archivo)]['hojas'][nombre_hoja] = \
+            _entrada_hoja(huella, registros)
+
+    def cargar_manifiesto(self, archivo_manifiesto=ARCHIVO_MANIFIESTO):
+        """
+        Carga el manifiesto de una extracción anterior.
+        Retorna False si no existe o tiene una versión distinta.
+        """
+        try:
+            with open(archivo_manifiesto, 'r', encoding='utf-8') as f:
+                manifiesto = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+
+        if manifiesto.get('version') != VERSION_MANIFIESTO:
+            return False
+
+        self.manifiesto = manifiesto
+        return True
+
+    def guardar_manifiesto(self, archivo_manifiesto=ARCHIVO_MANIFIESTO):
+        """Guarda el manifiesto de archivos y hojas procesados"""
+        with open(archivo_manifiesto, 'w', encoding='utf-8') as f:
+            json.dump(self.manifiesto, f, ensure_ascii=False, indent=2)
+
+    def procesar_incremental(self, archivo_csv, archivo_manifiesto=ARCHIVO_MANIFIESTO, omitir=()):
+        """
+        Procesa solo los archivos y hojas nuevos o modificados desde la última
+        extracción y los combina con los datos consolidados existentes.
+
+        Un archivo se considera sin cambios si coinciden su tamaño y fecha de
+        modificación (o su hash SHA-256). Dentro de un archivo modificado solo
+        se procesan las hojas nuevas o cuyo contenido (hash de las celdas)
+        cambió. Un archivo que no se puede leer se informa y se omite: sus
+        registros anteriores se conservan y su entrada del manifiesto no se
+        actualiza, así que se vuelve a intentar en la siguiente ejecución.
+        Los errores quedan en self.errores; los archivos indicados en omitir
+        no se revisan (se tratan como sin cambios).
+
+        Retorna (df, hubo_cambios). Si no hay manifiesto o CSV previo, hace
+        una extracción completa.
+        """
+        if not self.cargar_manifiesto(archivo_manifiesto) or not os.path.exists(archivo_csv):
+            print("[*] Sin extraccion previa, se procesan todos los archivos")
+            self.manifiesto = {'version': VERSION_MANIFIESTO, 'archivos': {}}
+            return self.procesar_todos_archivos(), True
+
+        print(">> Extraccion incremental de datos del BCV\n")
+
+        df_actual = cargar_consolidado(archivo_csv)
+        archivos_previos = self.manifiesto['archivos']
+        rutas = sorted(str(a) for a in Path(self.directorio).glob('*.xls'))
+
+        # (fuente, fecha) de las hojas cuyos registros deben reemplazarse
+        eliminar = set()
+        hubo_cambios = False
+
+        # Archivos que ya no están en el directorio
+        nombres = {os.path.basename(r) for r in rutas}
+        for nombre in list(archivos_previos):
+            if nombre not in nombres:
+                print(f"[*] Archivo eliminado: {nombre}")
+                for hoja in archivos_previos.pop(nombre)['hojas'].values():
+                    eliminar.add((nombre, hoja['fecha']))
+                hubo_cambios = True
+
+        for ruta in rutas:
+            nombre = os.path.basename(ruta)
+            if nombre in omitir:
+                continue
+
+            previo = archivos_previos.get(nombre)
+            estado = os.stat(ruta)
+
+            if previo and previo['tamano'] == estado.st_size and previo['mtime'] == estado.st_mtime:
+                continue
+
+            huella = _huella_archivo(ruta)
+            if previo and previo['sha256'] == huella['sha256']:
+                previo.update(huella)
+                continue
+
+            print(f"\n[*] Procesando cambios: {nombre}")
+            try:
+                entrada, registros, reemplazar = self._procesar_cambios_archivo(ruta, previo, huella)
+            except Exception as e:
+                print(f"   [X] Error: {e}")
+                self.errores[nombre] = str(e)
+                continue
+
+            archivos_previos[nombre] = entrada
+            self.datos_consolidados.extend(registros)
+            eliminar |= reemplazar
+            hubo_cambios = hubo_cambios or previo is None or entrada['hojas'] != previo['hojas']
+
+        if not hubo_cambios:
+            print("[OK] Sin cambios desde la ultima extraccion")
+            return df_actual, False
+
+        if eliminar:
+            claves = pd.MultiIndex.from_frame(df_actual[['fuente', 'fecha']])
+            df_actual = df_actual[~claves.isin(list(eliminar))]
+
+        df = pd.concat([df_actual, pd.DataFrame(self.datos_consolidados)], ignore_index=True)
+        df = df.sort_values(['fecha', 'moneda'])
+
+        print(f"\n[OK] Extraccion incremental: {len(self.datos_consolidados)} registros nuevos, "
+              f"{len(df)} consolidados")
+
+        return df, True
+
+    def _procesar_cambios_archivo(self, ruta_archivo, previo, huella_archivo):
+        """
+        Procesa las hojas nuevas o modificadas de un archivo sin modificar el
+        manifiesto ni los datos acumulados, para que un error a mitad del
+        archivo no deje cambios parciales.
+        Retorna (entrada del manifiesto, registros nuevos, claves (fuente,
+        fecha) de registros consolidados a reemplazar).
+        """
+        nombre = os.path.basename(ruta_archivo)
+        hojas_previas = dict(previo['hojas']) if previo else {}
+        entrada = {**huella_archivo, 'hojas': {}}
+        registros_nuevos = []
+        eliminar = set()
+
+        with self.abrir_libro(ruta_archivo) as xls:
             for nombre_hoja in xls.sheet_names:
-                registros = self.procesar_hoja(ruta_archivo, nombre_hoja)
-                self.datos_consolidados.extend(registros)
+                huella = _huella_hoja(xls, nombre_hoja)
+                previa = hojas_previas.pop(nombre_hoja, None)
+
+                if previa and previa['huella'] == huella:
+                    entrada['hojas'][nombre_hoja] = previa
+                    continue
 
+                if previa:
+                    eliminar.add((nombre, previa['fecha']))
+
+                registros = self.procesar_hoja(ruta_archivo, nombre_hoja, xls)
+                registros_nuevos.extend(registros)
+                entrada['hojas'][nombre_hoja] = _entrada_hoja(huella, registros)
+
+                # Reemplazar registros de la misma fecha que ya estén consolidados
                 if registros:
+                    eliminar.add((nombre, registros[0]['fecha']))
                     print(f"   [OK] {nombre_hoja}: {len(registros)} monedas extraidas")
 
-        except Exception as e:
-            print(f"   [X] Error: {e}")
+        # Hojas que ya no están en el archivo
+        for hoja in hojas_previas.values():
+            eliminar.add((nombre, hoja['fecha']))
+
+        return entrada, registros_nuevos, eliminar
 
-    def procesar_todos_archivos(self):
+    def procesar_todos_archivos(self, procesos=1, reporte=None):
         """
         Procesa todos los archivos .xls del directorio
+
+        Parámetros:
+        - procesos: número de procesos trabajadores (1 = secuencial)
+        - reporte: ruta del reporte JSON de tiempos por etapa (opcional)
         """
         print(">> Iniciando extraccion de datos del BCV\n")
 
+        # Si la medición ya está en curso (main) la detiene quien la inició
+        propia = not self.perfil.activo
+        if propia:
+            self.perfil.iniciar()
+        try:
+            df = self._extraer_todos(procesos)
+        finally:
+            if propia:
+                self.perfil.detener()
+
+        if reporte:
+            self.perfil.guardar(reporte)
+            print(f"   Reporte de tiempos: {reporte}")
+
+        return df
+
+    def _extraer_todos(self, procesos):
+        """Extracción completa y consolidación (ver procesar_todos_archivos)"""
         # Buscar archivos .xls
         archivos = list(Path(self.directorio).glob('*.xls'))
 
@@ -172,24 +642,60 @@ class ExtractorBCV:
 
         print(f"[*] Archivos encontrados: {len(archivos)}")
 
-        for archivo in sorted(archivos):
-            self.procesar_archivo(str(archivo))
+        if procesos and procesos > 1:
+            self.procesar_en_paralelo([str(a) for a in sorted(archivos)], procesos)
+        else:
+            for archivo in sorted(archivos):
+                self.procesar_archivo(str(archivo))
 
         # Convertir a DataFrame
+        df = None
         if self.datos_consolidados:
-            df = pd.DataFrame(self.datos_consolidados)
+            with self.perfil.etapa('consolidacion') as evento:
+                df = pd.DataFrame(self.datos_consolidados)
+                evento['filas'] = len(df)
+                evento['bytes'] = int(df.memory_usage(deep=True).sum())
 
             # Ordenar por fecha y moneda
-            df = df.sort_values(['fecha', 'moneda'])
+            with self.perfil.etapa('ordenamiento') as evento:
+                df = df.sort_values(['fecha', 'moneda'])
+                evento['filas'] = len(df)
 
             print(f"\n[OK] Extraccion completa: {len(df)} registros consolidados")
             print(f"   Fechas: {df['fecha'].min()} a {df['fecha'].max()}")
             print(f"   Monedas unicas: {df['moneda'].nunique()}")
-
-            return df
         else:
             print("\n[X] No se extrajeron datos")
-            return None
+
+        return df
+
+    def guardar_csv(self, df, archivo_salida):
+        """
+        Guarda el DataFrame consolidado en CSV y, junto a él, la versión
+        columnar (.npz) que prefieren los cargadores y el almacén binario
+        de tasas (.tasas) que usan las consultas puntuales
+        """
+        with self.perfil.etapa('escritura_csv') as evento:
+            df.to_csv(archivo_salida, index=False, encoding='utf-8-sig')
+            evento['filas'] = len(df)
+            evento['bytes'] = os.path.getsize(archivo_salida)
+
+        self.guardar_artefactos(df, archivo_salida)
+
+    def guardar_artefactos(self, df, archivo_csv):
+        """
+        Escribe el .npz y el .tasas que acompañan al CSV, firmados con el CSV
+        ya escrito para que los cargadores los reconozcan como vigentes
+        """
+        with self.perfil.etapa('escritura_columnar') as evento:
+            archivo_columnar = guardar_columnar(df, archivo_csv)
+            evento['filas'] = len(df)
+            evento['bytes'] = os.path.getsize(archivo_columnar)
+
+        with self.perfil.etapa('escritura_almacen') as evento:
+            archivo_almacen = construir_almacen(df, archivo_csv)
+            evento['filas'] = len(df)
+            evento['bytes'] = os.path.getsize(archivo_almacen)
 
     def consultar_fecha(self, df, fecha_busqueda):
         """
@@ -199,7 +705,7 @@ class ExtractorBCV:
         - fecha_busqueda: string en formato 'YYYY-MM-DD', 'DD/MM/YYYY' o 'mes dia año'
         """
         # Normalizar formato de fecha
-        fecha_iso = self._normalizar_fecha(fecha_busqueda)
+        fecha_iso = normalizar_fecha(fecha_busqueda)
 
         if not fecha_iso:
             print(f"[X] Formato de fecha no valido: {fecha_busqueda}")
@@ -230,61 +736,210 @@ class ExtractorBCV:
 
         return resultado_display
 
-    def _normalizar_fecha(self, fecha_str):
-        """
-        Convierte diferentes formatos de fecha a ISO (YYYY-MM-DD)
-        """
-        formatos = [
-            '%Y-%m-%d',           # 2025-03-08
-            '%d/%m/%Y',           # 08/03/2025
-            '%m/%d/%Y',           # 03/08/2025
-            '%Y/%m/%d',           # 2025/03/08
-            '%d-%m-%Y',           # 08-03-2025
-        ]
-
-        # Intentar parseo directo
-        for fmt in formatos:
-            try:
-                fecha = datetime.strptime(fecha_str.strip(), fmt)
-                return fecha.strftime('%Y-%m-%d')
-            except:
-                continue
-
-        # Intentar parseo de texto en español: "marzo 8 2025"
+def _valor_celda(valor, tipo, modo_fecha):
+    """
+    Convierte una celda xlrd al mismo valor que produce pd.read_excel
+    """
+    if tipo == XL_CELL_DATE:
         try:
-            meses = {
-                'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4,
-                'mayo': 5, 'junio': 6, 'julio': 7, 'agosto': 8,
-                'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12
-            }
-
-            partes = fecha_str.lower().split()
-            if len(partes) == 3:
-                mes_texto, dia, anio = partes[0], partes[1], partes[2]
-                if mes_texto in meses:
-                    mes = meses[mes_texto]
-                    fecha = datetime(int(anio), mes, int(dia))
-                    return fecha.strftime('%Y-%m-%d')
-        except:
-            pass
+            return xldate.xldate_as_datetime(valor, modo_fecha)
+        except OverflowError:
+            return valor
+    if tipo == XL_CELL_ERROR:
+        return float('nan')
+    if tipo == XL_CELL_BOOLEAN:
+        return bool(valor)
+    if tipo == XL_CELL_NUMBER and math.isfinite(valor) and int(valor) == valor:
+        return int(valor)
+    return valor
+
+
+def _fecha_en_texto(texto, texto_buscar):
+    """Extrae la fecha DD/MM/YYYY (como YYYY-MM-DD) si el texto contiene la etiqueta"""
+    if texto_buscar not in texto:
+        return None
 
+    match = PATRON_FECHA_CELDA.search(texto)
+    if not match:
         return None
 
+    dia, mes, anio = match.groups()
+    return f"{anio}-{mes}-{dia}"
+
+
+def _es_fila_encabezado(valores):
+    """Indica si una fila contiene los títulos 'Compra (BID)' y 'Venta (ASK)'"""
+    fila_str = ' '.join([str(x) for x in valores if pd.notna(x)])
+    return 'Compra (BID)' in fila_str and 'Venta (ASK)' in fila_str
+
+
+def _huella_archivo(ruta_archivo):
+    """Tamaño, fecha de modificación y hash SHA-256 de un archivo"""
+    estado = os.stat(ruta_archivo)
+    with open(ruta_archivo, 'rb') as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+
+    return {'tamano': estado.st_size, 'mtime': estado.st_mtime, 'sha256': sha256}
+
+
+def _huella_hoja(libro, nombre_hoja):
+    """
+    Hash SHA-256 de los tipos y valores de las celdas de una hoja de un libro
+    ya abierto: cambia también si se corrige una tasa sin cambiar la forma
+    """
+    hoja = libro.book.sheet_by_name(nombre_hoja)
+    huella = hashlib.sha256(f'{hoja.nrows}x{hoja.ncols}'.encode())
+    for idx in range(hoja.nrows):
+        huella.update(repr((hoja.row_types(idx).tolist(), hoja.row_values(idx))).encode('utf-8'))
+    return huella.hexdigest()
+
+
+def _entrada_hoja(huella, registros):
+    """Entrada del manifiesto de una hoja procesada"""
+    return {
+        'huella': huella,
+        'fecha': registros[0]['fecha'] if registros else None,
+        'registros': len(registros)
+    }
+
+
+def escribir_csv_por_lotes(lotes, archivo_salida, perfil=None):
+    """
+    Escribe en CSV los lotes de iterar_lotes() a medida que se producen.
+    Los lotes consecutivos de una misma fecha (hojas repetidas) se escriben
+    juntos y ordenados por moneda, conservando su orden de llegada ante
+    empates, como el ordenamiento estable de la extracción completa. Si los
+    lotes llegan en orden de fecha (iterar_lotes(ordenado=True)) el archivo
+    queda igual al consolidado; la única diferencia posible es el orden de
+    dos hojas de la misma fecha en archivos distintos, que aquí siguen la
+    primera fecha de cada archivo y allá el nombre del archivo (se avisa).
+    perfil (opcional) registra cada escritura como etapa 'escritura_csv'.
+    Retorna el número de registros escritos.
+    """
+    perfil = perfil or PerfilExtraccion()
+    total = 0
+    ultima_fecha = None
+
+    with open(archivo_salida, 'w', encoding='utf-8-sig', newline='') as f:
+        for fecha_lote, grupo in groupby(lotes, key=lambda lote: lote[2][0]['fecha']):
+            grupo = list(grupo)
+            df_lote = pd.DataFrame([r for _, _, registros in grupo for r in registros])
+            df_lote = df_lote.sort_values(['fecha', 'moneda'])
+
+            if ultima_fecha is not None and fecha_lote < ultima_fecha:
+                print(f"  [!] Lote fuera de orden: {grupo[0][1]} ({fecha_lote} < {ultima_fecha})")
+            if len({fuente for fuente, _, _ in grupo}) > 1:
+                hojas = ', '.join(f"{fuente}:{nombre_hoja}" for fuente, nombre_hoja, _ in grupo)
+                print(f"  [!] Fecha {fecha_lote} repetida en varios archivos ({hojas}); "
+                      f"se escriben en ese orden")
+            ultima_fecha = max(ultima_fecha or fecha_lote, df_lote['fecha'].iloc[-1])
+
+            with perfil.etapa('escritura_csv', grupo[0][0], grupo[0][1]) as evento:
+                df_lote.to_csv(f, index=False, header=(total == 0))
+                evento['filas'] = len(df_lote)
+            total += len(df_lote)
+
+    return total
+
+
+def _procesar_tarea(directorio, ruta_archivo, hojas):
+    """
+    Procesa un grupo de hojas de un archivo dentro de un proceso trabajador.
+    Devuelve los registros por hoja (en el orden recibido) y el tiempo usado.
+    Los errores del archivo se devuelven como texto en 'error' en lugar de
+    propagarse, para que el proceso principal los informe y continúe.
+    """
+    inicio = time.perf_counter()
+    extractor = ExtractorBCV(directorio)
+    registros, huellas, error = [], [], None
+
+    try:
+        with extractor.abrir_libro(ruta_archivo) as libro:
+            registros = [extractor.procesar_hoja(ruta_archivo, nombre_hoja, libro) for nombre_hoja in hojas]
+            huellas = [_huella_hoja(libro, nombre_hoja) for nombre_hoja in hojas]
+    except Exception as e:
+        error = str(e)
+
+    return {
+        'pid': os.getpid(),
+        'registros': registros,
+        'huellas': huellas,
+        'error': error,
+        'eventos': extractor.perfil.eventos,
+        'segundos': time.perf_counter() - inicio
+    }
+
+
+def extraer_en_flujo(extractor, archivo_salida):
+    """
+    Extracción en flujo: escribe el CSV hoja por hoja y después arma el
+    .npz y el .tasas desde el CSV recién escrito (columnas tipadas, mucho
+    menores que los registros) para que no queden los anteriores.
+    Retorna el número de registros escritos.
+    """
+    print(">> Extraccion en flujo de datos del BCV")
+    total = escribir_csv_por_lotes(extractor.iterar_lotes(ordenado=True), archivo_salida, extractor.perfil)
+
+    if total:
+        extractor.guardar_artefactos(cargar_consolidado(archivo_salida), archivo_salida)
+    else:
+        for anterior in (ruta_columnar(archivo_salida), ruta_almacen(archivo_salida)):
+            if os.path.exists(anterior):
+                os.remove(anterior)
+
+    extractor.guardar_manifiesto()
+    print(f"\n[*] {total} registros guardados en: {archivo_salida}")
+    return total
+
 
 def main():
-    # Crear extractor
-    extractor = ExtractorBCV('Data_xls')
+    parser = argparse.ArgumentParser(description='Extractor de tipos de cambio del BCV')
+    parser.add_argument('--procesos', type=int, default=1,
+                        help='Procesos trabajadores para la extraccion (default: 1)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Procesar solo archivos/hojas nuevos o modificados')
+    parser.add_argument('--flujo', action='store_true',
+                        help='Escribir el CSV hoja por hoja sin acumular los datos en memoria')
+    parser.add_argument('--reporte', metavar='ARCHIVO_JSON',
+                        help='Guardar un reporte JSON con tiempos, filas y bytes por etapa')
+    parser.add_argument('--perfilar', choices=MODOS_PERFIL,
+                        help='Incluir perfil de cProfile o tracemalloc en el reporte')
+    args = parser.parse_args()
 
-    # Procesar todos los archivos
-    df = extractor.procesar_todos_archivos()
+    archivo_salida = 'tipos_cambio_bcv_consolidado.csv'
 
-    if df is None:
-        return
+    # Crear extractor
+    extractor = ExtractorBCV('Data_xls', modo_perfil=args.perfilar)
+
+    # La medición cubre todo el modo elegido, incluida la escritura de archivos
+    extractor.perfil.iniciar()
+    try:
+        if args.flujo:
+            df = None
+            extraer_en_flujo(extractor, archivo_salida)
+        else:
+            # Procesar todos los archivos (o solo los cambios)
+            if args.incremental:
+                df, hubo_cambios = extractor.procesar_incremental(archivo_salida)
+            else:
+                df = extractor.procesar_todos_archivos(procesos=args.procesos)
+                hubo_cambios = True
+
+            # Guardar a CSV
+            if df is not None and hubo_cambios:
+                extractor.guardar_csv(df, archivo_salida)
+                extractor.guardar_manifiesto()
+                print(f"\n[*] Datos guardados en: {archivo_salida}")
+    finally:
+        extractor.perfil.detener()
+
+    if args.reporte:
+        extractor.perfil.guardar(args.reporte)
+        extractor.perfil.mostrar_resumen()
+        print(f"\n[*] Reporte de tiempos guardado en: {args.reporte}")
 
-    # Guardar a CSV
-    archivo_salida = 'tipos_cambio_bcv_consolidado.csv'
-    df.to_csv(archivo_salida, index=False, encoding='utf-8-sig')
-    print(f"\n[*] Datos guardados en: {archivo_salida}")
+    if df is None:
+        return None, extractor
 
     # Ejemplos de consulta
     print("\n" + "="*70)
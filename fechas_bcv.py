@@ -0,0 +1,365 @@
+"""
+Fechas: interpretacion e indice de fechas disponibles
+- normalizar_fecha / normalizar_fechas: convierten los formatos aceptados
+  por los scripts ('2025-03-08', '08/03/2025', 'marzo 8 2025', ...) a ISO
+- IndiceFechas: arreglo ordenado de dias (desde 1970-01-01) con busqueda
+  binaria para resolver la fecha publicada anterior, la siguiente o las N
+  mas cercanas, sin recorrer ni ordenar todas las fechas
+- SerieTasas: tasa vigente de una moneda en cualquier fecha (fines de
+  semana y feriados)
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from datos_bcv import dias_a_fechas, fechas_a_dias
+
+
+# Ordinal de 1970-01-01 para convertir date.toordinal() a días de época
+ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+
+# Cómo se resuelve una fecha sin publicación:
+# - anterior: última tasa publicada hasta esa fecha (la vigente)
+# - siguiente: primera tasa publicada desde esa fecha
+# - cercana: la más cercana; ante empate, la anterior
+# - estricta: solo la fecha exacta
+POLITICAS = ('anterior', 'siguiente', 'cercana', 'estricta')
+
+
+def dia_de(fecha_iso):
+    """Días desde 1970-01-01 de una fecha 'YYYY-MM-DD'"""
+    return date.fromisoformat(fecha_iso).toordinal() - ORDINAL_EPOCA
+
+
+def fecha_de(dia):
+    """Fecha 'YYYY-MM-DD' de un número de días desde 1970-01-01"""
+    return date.fromordinal(int(dia) + ORDINAL_EPOCA).isoformat()
+
+
+MESES = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4,
+    'mayo': 5, 'junio': 6, 'julio': 7, 'agosto': 8,
+    'septiembre': 9, 'setiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12,
+    # Abreviaturas
+    'ene': 1, 'feb': 2, 'mar': 3, 'abr': 4, 'may': 5, 'jun': 6, 'jul': 7,
+    'ago': 8, 'sep': 9, 'sept': 9, 'set': 9, 'oct': 10, 'nov': 11, 'dic': 12,
+}
+
+# Cada formato se reconoce por su forma; el orden de los campos indica cómo
+# leer los grupos (a: año, m: mes, d: día)
+PATRONES_FECHA = [
+    (re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})(?:[t ]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?'), 'amd'),  # 2025-03-08
+    (re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})'), 'dma'),   # 08/03/2025 (o 03/25/2025 si el día no es válido)
+    (re.compile(r'(\d{4})/(\d{1,2})/(\d{1,2})'), 'amd'),   # 2025/03/08
+    (re.compile(r'(\d{1,2})-(\d{1,2})-(\d{4})'), 'dma'),   # 08-03-2025
+]
+PATRON_MES_DIA = re.compile(r'([a-z]+)\.?\s+(\d{1,2}),?\s+(?:de\s+)?(\d{4})')             # marzo 8 2025
+PATRON_DIA_MES = re.compile(r'(\d{1,2})\s+(?:de\s+)?([a-z]+)\.?,?\s+(?:de\s+|del\s+)?(\d{4})')  # 8 de marzo de 2025
+
+
+def _iso(anio, mes, dia):
+    try:
+        return date(anio, mes, dia).isoformat()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _normalizar_texto(texto):
+    texto = texto.strip().lower()
+
+    for patron, orden in PATRONES_FECHA:
+        coincidencia = patron.fullmatch(texto)
+        if coincidencia:
+            a, b, c = (int(g) for g in coincidencia.groups())
+            if orden == 'amd':
+                return _iso(a, b, c)
+            # DD/MM/YYYY; si no es válida se intenta MM/DD/YYYY
+            return _iso(c, b, a) or (_iso(c, a, b) if '/' in texto else None)
+
+    coincidencia = PATRON_MES_DIA.fullmatch(texto)
+    if coincidencia:
+        mes, dia, anio = coincidencia.groups()
+    else:
+        coincidencia = PATRON_DIA_MES.fullmatch(texto)
+        if not coincidencia:
+            return None
+        dia, mes, anio = coincidencia.groups()
+
+    if mes not in MESES:
+        return None
+    return _iso(int(anio), MESES[mes], int(dia))
+
+
+def normalizar_fecha(valor):
+    """
+    Convierte una fecha a ISO (YYYY-MM-DD). Acepta:
+    - 2025-03-08 (también con hora), 2025/03/08
+    - 08/03/2025, 03/25/2025 (si el día/mes no es válido), 08-03-2025
+    - marzo 8 2025, mar. 8, 2025, 8 de marzo de 2025 (meses en español,
+      completos o abreviados)
+    - objetos date/datetime
+    Retorna None si no se reconoce. Los textos ya vistos se resuelven desde cache.
+    """
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if not isinstance(valor, str):
+        return None
+    return _normalizar_texto(valor)
+
+
+def normalizar_fechas(valores):
+    """
+    Versión vectorizada de normalizar_fecha para una columna completa:
+    cada valor distinto se interpreta una sola vez. Retorna un arreglo
+    (object) con la fecha ISO o None por cada valor.
+    """
+    codigos, distintos = pd.factorize(np.asarray(valores, dtype=object))
+    convertidos = np.array([normalizar_fecha(v) for v in distintos] + [None], dtype=object)
+    # Los valores nulos tienen código -1, que toma el None final
+    return convertidos[codigos]
+
+
+def fechas_a_dias_validas(valores):
+    """
+    Interpreta una columna de fechas en cualquier formato aceptado.
+    Retorna (días desde 1970-01-01, máscara de fechas válidas); los días de
+    las fechas no reconocidas quedan en 0.
+    """
+    fechas = normalizar_fechas(valores)
+    validas = pd.notna(fechas)
+    dias = np.zeros(len(fechas), dtype=np.int32)
+    dias[validas] = fechas_a_dias(fechas[validas])
+    return dias, validas
+
+
+class IndiceFechas:
+    def __init__(self, fechas):
+        """fechas: iterable de textos 'YYYY-MM-DD' (en cualquier orden, con repetidos)"""
+        self.dias = np.unique(fechas_a_dias(list(fechas)))
+        self._dias = self.dias.tolist()
+
+    @classmethod
+    def desde_dias(cls, dias):
+        """Crea el índice a partir de días desde 1970-01-01"""
+        indice = cls.__new__(cls)
+        indice.dias = np.unique(np.asarray(dias, dtype=np.int32))
+        indice._dias = indice.dias.tolist()
+        return indice
+
+    def __len__(self):
+        return len(self._dias)
+
+    def __contains__(self, fecha_iso):
+        dia = dia_de(fecha_iso)
+        i = bisect_left(self._dias, dia)
+        return i < len(self._dias) and self._dias[i] == dia
+
+    def anterior(self, fecha_iso, incluir=True):
+        """Última fecha disponible anterior (o igual, con incluir=True), o None"""
+        dia = dia_de(fecha_iso)
+        i = bisect_right(self._dias, dia) if incluir else bisect_left(self._dias, dia)
+        return fecha_de(self._dias[i - 1]) if i > 0 else None
+
+    def siguiente(self, fecha_iso, incluir=True):
+        """Primera fecha disponible posterior (o igual, con incluir=True), o None"""
+        dia = dia_de(fecha_iso)
+        i = bisect_left(self._dias, dia) if incluir else bisect_right(self._dias, dia)
+        return fecha_de(self._dias[i]) if i < len(self._dias) else None
+
+    def cercanas(self, fecha_iso, n=5):
+        """
+        Las n fechas disponibles más cercanas como [(fecha_iso, diferencia_dias)],
+        ordenadas por distancia; ante empate va primero la fecha anterior
+        """
+        dia = dia_de(fecha_iso)
+        derecha = bisect_left(self._dias, dia)
+        izquierda = derecha - 1
+
+        resultado = []
+        while len(resultado) < n and (izquierda >= 0 or derecha < len(self._dias)):
+            if derecha >= len(self._dias) or (
+                    izquierda >= 0 and dia - self._dias[izquierda] <= self._dias[derecha] - dia):
+                elegido = self._dias[izquierda]
+                izquierda -= 1
+            else:
+                elegido = self._dias[derecha]
+                derecha += 1
+            resultado.append((fecha_de(elegido), elegido - dia))
+
+        return resultado
+
+    def posicion(self, fecha_iso, politica='anterior'):
+        """Posición en self.dias de la fecha que aplica según la política, o None"""
+        dia = dia_de(fecha_iso)
+        total = len(self._dias)
+
+        if politica == 'anterior':
+            i = bisect_right(self._dias, dia) - 1
+            return i if i >= 0 else None
+
+        i = bisect_left(self._dias, dia)
+        if politica == 'siguiente':
+            return i if i < total else None
+        if politica == 'estricta':
+            return i if i < total and self._dias[i] == dia else None
+        if politica == 'cercana':
+            if i < total and (i == 0 or self._dias[i] - dia < dia - self._dias[i - 1]):
+                return i
+            return i - 1 if i > 0 else None
+
+        raise ValueError(f"Politica no valida: {politica} (opciones: {', '.join(POLITICAS)})")
+
+    def posiciones(self, fechas, politica='anterior'):
+        """
+        Versión vectorizada de posicion para un arreglo de fechas en cualquier
+        formato aceptado por normalizar_fecha. Retorna un arreglo de
+        posiciones con -1 donde no hay fecha aplicable o la fecha no se reconoce.
+        """
+        dias, validas = fechas_a_dias_validas(fechas)
+        return np.where(validas, self.posiciones_dias(dias, politica), -1)
+
+    def posiciones_dias(self, dias, politica='anterior'):
+        """Igual que posiciones, para días desde 1970-01-01 ya convertidos"""
+        total = len(self.dias)
+
+        if politica == 'anterior':
+            return np.searchsorted(self.dias, dias, side='right') - 1
+
+        i = np.searchsorted(self.dias, dias, side='left')
+        hay_siguiente = i < total
+        siguiente = self.dias[np.minimum(i, total - 1)] if total else dias
+
+        if politica == 'siguiente':
+            return np.where(hay_siguiente, i, -1)
+        if politica == 'estricta':
+            return np.where(hay_siguiente & (siguiente == dias), i, -1)
+        if politica == 'cercana':
+            anterior = self.dias[np.maximum(i - 1, 0)] if total else dias
+            usar_siguiente = hay_siguiente & ((i == 0) | (siguiente - dias < dias - anterior))
+            return np.where(usar_siguiente, i, i - 1)
+
+        raise ValueError(f"Politica no valida: {politica} (opciones: {', '.join(POLITICAS)})")
+
+    def fechas(self):
+        """Fechas disponibles ('YYYY-MM-DD') en orden cronológico"""
+        return [fecha_de(dia) for dia in self._dias]
+
+
+class SerieTasas:
+    def __init__(self, fechas, compra, venta, pais=''):
+        """
+        Tasas de una moneda. Las fechas pueden venir en cualquier orden; si
+        una fecha se repite se conserva el último registro.
+        """
+        dias = fechas_a_dias(list(fechas))
+        orden = np.argsort(dias, kind='stable')
+        dias = dias[orden]
+        ultimo = np.append(dias[1:] != dias[:-1], True) if len(dias) else np.zeros(0, bool)
+        seleccion = orden[ultimo]
+
+        self.indice = IndiceFechas.desde_dias(dias[ultimo])
+        self.compra = np.asarray(compra, dtype=np.float64)[seleccion]
+        self.venta = np.asarray(venta, dtype=np.float64)[seleccion]
+        self.pais = pais
+
+    def vigente(self, fecha_iso, politica='anterior'):
+        """
+        Tasa aplicable a una fecha según la política:
+        {'fecha', 'pais', 'compra_bs', 'venta_bs', 'promedio_bs'}, donde
+        'fecha' es la fecha de publicación usada. None si no hay tasa aplicable.
+        """
+        i = self.indice.posicion(fecha_iso, politica)
+        if i is None:
+            return None
+
+        compra, venta = float(self.compra[i]), float(self.venta[i])
+        return {
+            'fecha': fecha_de(self.indice.dias[i]),
+            'pais': self.pais,
+            'compra_bs': round(compra, 8),
+            'venta_bs': round(venta, 8),
+            'promedio_bs': round((compra + venta) / 2, 8)
+        }
+
+    def vigentes(self, fechas, politica='anterior'):
+        """
+        Versión vectorizada de vigente para un arreglo de fechas en cualquier
+        formato aceptado por normalizar_fecha. Retorna un DataFrame con
+        fecha_consulta, fecha (publicación usada), compra_bs, venta_bs y
+        promedio_bs; NaN (y fecha None) donde no hay tasa aplicable o la
+        fecha no se reconoce.
+        """
+        fechas = np.asarray(fechas, dtype=object)
+        posiciones = self.indice.posiciones(fechas, politica)
+        validas = posiciones >= 0
+        tomar = np.where(validas, posiciones, 0)
+
+        if len(self.indice):
+            compra = np.where(validas, self.compra[tomar], np.nan)
+            venta = np.where(validas, self.venta[tomar], np.nan)
+            fecha = np.where(validas, dias_a_fechas(self.indice.dias[tomar]), None)
+        else:
+            compra = venta = np.full(len(fechas), np.nan)
+            fecha = np.full(len(fechas), None, dtype=object)
+
+        return pd.DataFrame({
+            'fecha_consulta': fechas,
+            'fecha': fecha,
+            'compra_bs': compra,
+            'venta_bs': venta,
+            'promedio_bs': (compra + venta) / 2
+        })
+
+
+def series_por_moneda(df):
+    """{MONEDA: SerieTasas} a partir del dataset consolidado"""
+    return {
+        str(moneda).upper(): SerieTasas(datos['fecha'], datos['compra_bs'], datos['venta_bs'],
+                                        str(datos['pais'].iloc[-1]))
+        for moneda, datos in df.groupby('moneda', sort=True)
+    }
+
+
+def resolver_lote(obtener_serie, dias, monedas, politica='anterior', validas=None):
+    """
+    Resuelve muchas combinaciones (día, moneda) de una vez.
+    obtener_serie recibe un código en mayúsculas y retorna su SerieTasas o None.
+    validas (opcional) marca las filas a resolver; el resto queda sin tasa.
+    Retorna (dias_tasa, compra, venta) alineados con la entrada, con -1 y NaN
+    donde no hay tasa aplicable o la moneda no existe.
+    """
+    total = len(dias)
+    dias_tasa = np.full(total, -1, dtype=np.int64)
+    compra = np.full(total, np.nan)
+    venta = np.full(total, np.nan)
+
+    # Una búsqueda vectorizada por cada moneda distinta de la entrada
+    codigos, distintas = pd.factorize(np.asarray(monedas, dtype=object))
+    orden = np.argsort(codigos, kind='stable')
+    limites = np.searchsorted(codigos[orden], np.arange(len(distintas) + 1))
+
+    for codigo, moneda in enumerate(distintas):
+        serie = obtener_serie(str(moneda).upper())
+        if serie is None or not len(serie.indice):
+            continue
+
+        filas = orden[limites[codigo]:limites[codigo + 1]]
+        if validas is not None:
+            filas = filas[validas[filas]]
+        posiciones = serie.indice.posiciones_dias(dias[filas], politica)
+        resueltas = posiciones >= 0
+        filas, posiciones = filas[resueltas], posiciones[resueltas]
+
+        dias_tasa[filas] = serie.indice.dias[posiciones]
+        compra[filas] = serie.compra[posiciones]
+        venta[filas] = serie.venta[posiciones]
+
+    return dias_tasa, compra, venta
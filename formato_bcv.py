@@ -0,0 +1,122 @@
+"""
+Presentacion de resultados en consola
+Las consultas devuelven datos numericos con nombres canonicos (fecha, moneda,
+pais, compra_bs, venta_bs, promedio_bs); aqui se convierten a texto solo las
+filas que se van a mostrar, ya sea como tabla o registro por registro
+(tabla, CSV o NDJSON) con paginacion
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+
+# Nombre canónico -> encabezado mostrado
+ENCABEZADOS = {
+    'fecha': 'Fecha',
+    'moneda': 'Moneda',
+    'pais': 'Pais',
+    'compra_bs': 'Compra (Bs.)',
+    'venta_bs': 'Venta (Bs.)',
+    'promedio_bs': 'Promedio (Bs.)'
+}
+
+
+def con_encabezados(df):
+    """Mismo DataFrame con los encabezados de presentación (sin copiar los datos)"""
+    return df.rename(columns=ENCABEZADOS)
+
+
+def formatear_numeros(valores, decimales=2):
+    """
+    Convierte una columna numérica a texto con separador de miles
+    (1,234.57). Se formatea la columna completa de una vez con un solo
+    formateador, sin una función por elemento.
+    """
+    formato = f'{{:,.{decimales}f}}'.format
+    return list(map(formato, np.asarray(valores, dtype=np.float64).tolist()))
+
+
+def tabla_texto(df, max_filas=None, decimales=2):
+    """
+    Tabla de texto de un resultado (columnas canónicas o ya con encabezados).
+    Solo se formatean las primeras max_filas filas (todas si es None).
+    """
+    if max_filas is not None:
+        df = df.iloc[:max_filas]
+
+    columnas = {}
+    for nombre, columna in con_encabezados(df).items():
+        if pd.api.types.is_float_dtype(columna.dtype):
+            columnas[nombre] = formatear_numeros(columna.to_numpy(), decimales)
+        else:
+            columnas[nombre] = columna.to_numpy()
+
+    return pd.DataFrame(columnas).to_string(index=False)
+
+
+FORMATOS_SALIDA = ('tabla', 'csv', 'ndjson')
+
+
+def opciones_paginacion():
+    """Opciones de paginación y formato comunes a los scripts de consulta"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--limite', '--limit', type=int, default=None,
+                        help='Maximo de registros a mostrar')
+    parser.add_argument('--saltar', '--offset', type=int, default=0,
+                        help='Registros a omitir desde el mas reciente (default: 0)')
+    parser.add_argument('--desde', '--since', default=None,
+                        help='Solo registros desde esta fecha (inclusive)')
+    parser.add_argument('--formato', choices=FORMATOS_SALIDA, default='tabla',
+                        help='tabla, csv o ndjson (un objeto JSON por linea)')
+    return parser
+
+
+def paginar(registros, saltar=0, limite=None):
+    """Omite los primeros `saltar` registros y corta en `limite`, sin materializar el resto"""
+    return islice(registros, saltar, None if limite is None else saltar + limite)
+
+
+def escribir_registros(registros, columnas, formato='tabla', salida=None, ancho=15, decimales=2):
+    """
+    Escribe registros (diccionarios) a medida que se producen, sin acumularlos:
+    - tabla: una línea de ancho fijo por registro, textos a 15 caracteres y
+      números a `ancho` (los encabezados los imprime quien llama)
+    - csv: encabezado y una fila por registro
+    - ndjson: un objeto JSON por línea
+    Retorna el número de registros escritos.
+    """
+    salida = salida or sys.stdout
+
+    if formato == 'csv':
+        escritor = csv.writer(salida, lineterminator='\n')
+        escritor.writerow(columnas)
+
+        def escribir(registro):
+            escritor.writerow([registro[c] for c in columnas])
+    elif formato == 'ndjson':
+        def escribir(registro):
+            salida.write(json.dumps({c: registro[c] for c in columnas}, ensure_ascii=False) + '\n')
+    else:
+        def escribir(registro):
+            salida.write(' '.join(
+                f"{registro[c]:>{ancho}.{decimales}f}" if isinstance(registro[c], float) else f"{registro[c]:<15}"
+                for c in columnas
+            ) + '\n')
+
+    escritos = 0
+    try:
+        for registro in registros:
+            escribir(registro)
+            escritos += 1
+        salida.flush()
+    except BrokenPipeError:
+        # Quien lee cerró la salida (por ejemplo '| head'): se termina sin error
+        os.dup2(os.open(os.devnull, os.O_WRONLY), salida.fileno())
+    return escritos
@@ -0,0 +1,136 @@
+"""
+Instrumentacion del pipeline de extraccion
+Registra tiempo, filas y bytes por etapa (por archivo y por hoja) y genera
+un reporte JSON, con perfilado opcional mediante cProfile o tracemalloc
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+
+MODOS_PERFIL = ('cprofile', 'tracemalloc')
+
+
+class PerfilExtraccion:
+    def __init__(self, modo=None):
+        if modo is not None and modo not in MODOS_PERFIL:
+            raise ValueError(f"Modo de perfil no valido: {modo}")
+
+        self.modo = modo
+        self.eventos = []
+        self.detalle = {}
+        self._perfilador = None
+        self._inicio = None
+        self._segundos = None
+
+    @contextmanager
+    def etapa(self, nombre, archivo=None, hoja=None):
+        """
+        Mide una etapa. El diccionario entregado permite anotar 'filas' y
+        'bytes' procesados antes de salir del bloque.
+        """
+        evento = {'etapa': nombre, 'archivo': archivo, 'hoja': hoja, 'filas': None, 'bytes': None}
+        inicio = time.perf_counter()
+        try:
+            yield evento
+        finally:
+            evento['segundos'] = time.perf_counter() - inicio
+            self.eventos.append(evento)
+
+    def agregar_eventos(self, eventos):
+        """Incorpora eventos medidos en otro proceso"""
+        self.eventos.extend(eventos)
+
+    @property
+    def activo(self):
+        """Indica si la medición total está en curso"""
+        return self._inicio is not None
+
+    def iniciar(self):
+        """Comienza la medición total y el perfilado opcional"""
+        self._inicio = time.perf_counter()
+
+        if self.modo == 'cprofile':
+            self._perfilador = cProfile.Profile()
+            self._perfilador.enable()
+        elif self.modo == 'tracemalloc':
+            tracemalloc.start()
+
+    def detener(self, top=20):
+        """Detiene la medición y guarda el resumen del perfilado"""
+        if self._inicio is None:
+            return
+
+        self._segundos = time.perf_counter() - self._inicio
+        self._inicio = None
+
+        if self.modo == 'cprofile' and self._perfilador:
+            self._perfilador.disable()
+            salida = io.StringIO()
+            pstats.Stats(self._perfilador, stream=salida).sort_stats('cumulative').print_stats(top)
+            self.detalle['cprofile'] = salida.getvalue().splitlines()
+            self._perfilador = None
+
+        elif self.modo == 'tracemalloc' and tracemalloc.is_tracing():
+            actual, pico = tracemalloc.get_traced_memory()
+            estadisticas = tracemalloc.take_snapshot().statistics('lineno')[:top]
+            tracemalloc.stop()
+            self.detalle['tracemalloc'] = {
+                'memoria_actual_bytes': actual,
+                'memoria_pico_bytes': pico,
+                'top_asignaciones': [
+                    {'linea': str(e.traceback), 'bytes': e.size, 'bloques': e.count}
+                    for e in estadisticas
+                ]
+            }
+
+    def reporte(self):
+        """Resumen por etapa, por archivo y por hoja"""
+        def acumular(destino, evento):
+            resumen = destino.setdefault(evento['etapa'], {'llamadas': 0, 'segundos': 0.0, 'filas': 0, 'bytes': 0})
+            resumen['llamadas'] += 1
+            resumen['segundos'] += evento['segundos']
+            resumen['filas'] += evento['filas'] or 0
+            resumen['bytes'] += evento['bytes'] or 0
+
+        etapas = {}
+        archivos = {}
+        for evento in self.eventos:
+            acumular(etapas, evento)
+            if evento['archivo']:
+                acumular(archivos.setdefault(evento['archivo'], {}), evento)
+
+        for resumen in [*etapas.values(), *(e for a in archivos.values() for e in a.values())]:
+            resumen['segundos'] = round(resumen['segundos'], 6)
+
+        return {
+            'generado': datetime.now().isoformat(),
+            'total_segundos': round(self._segundos, 6) if self._segundos is not None else None,
+            'modo_perfil': self.modo,
+            'etapas': etapas,
+            'archivos': archivos,
+            'hojas': [
+                {**e, 'segundos': round(e['segundos'], 6)}
+                for e in self.eventos if e['hoja'] is not None
+            ],
+            **self.detalle
+        }
+
+    def guardar(self, archivo_salida):
+        """Guarda el reporte en JSON"""
+        with open(archivo_salida, 'w', encoding='utf-8') as f:
+            json.dump(self.reporte(), f, ensure_ascii=False, indent=2)
+        return archivo_salida
+
+    def mostrar_resumen(self):
+        """Muestra el tiempo total por etapa"""
+        print("\n[*] Tiempo por etapa:")
+        for nombre, resumen in self.reporte()['etapas'].items():
+            print(f"   {nombre:22} {resumen['segundos']:>8.3f} s  ({resumen['llamadas']} llamadas, "
+                  f"{resumen['filas']} filas)")
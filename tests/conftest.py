@@ -0,0 +1,39 @@
+"""
+Fixtures compartidas de las pruebas
+Los datos salen de los Excel de Data_xls y se copian a directorios
+temporales, así que las pruebas nunca modifican los archivos del repositorio
+"""
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from datos_bcv import ARCHIVO_CSV  # noqa: E402
+from extractor_bcv import ExtractorBCV  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def consolidado():
+    """DataFrame consolidado de Data_xls (una extracción completa por sesión)"""
+    return ExtractorBCV(str(RAIZ / 'Data_xls')).procesar_todos_archivos()
+
+
+@pytest.fixture
+def directorio_datos(tmp_path, monkeypatch, consolidado):
+    """Directorio de trabajo temporal con el CSV consolidado, su .npz y su .tasas"""
+    monkeypatch.chdir(tmp_path)
+    ExtractorBCV().guardar_csv(consolidado, ARCHIVO_CSV)
+    return tmp_path
+
+
+@pytest.fixture
+def directorio_xls(tmp_path, monkeypatch):
+    """Directorio de trabajo temporal con una copia de Data_xls"""
+    shutil.copytree(RAIZ / 'Data_xls', tmp_path / 'Data_xls')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,33 @@
+"""Pruebas de los historicos por moneda desde linea de comandos"""
+
+import subprocess
+import sys
+
+import pytest
+
+from conftest import RAIZ
+
+
+def ejecutar(script, *argumentos):
+    return subprocess.run([sys.executable, str(RAIZ / script), *argumentos],
+                          capture_output=True, text=True, encoding='utf-8')
+
+
+@pytest.mark.parametrize('script, argumentos', [
+    ('consulta_bcv.py', ['moneda', 'USD', '--desde', 'no es fecha']),
+    ('consulta_bcv.py', ['moneda', 'USD', '--hasta', '2025-13-45']),
+    ('consulta_bcv.py', ['moneda', 'USD', '--desde', 'xx', '--formato', 'csv']),
+    ('consulta_json.py', ['moneda', 'USD', '--desde', 'no es fecha']),
+])
+def test_fecha_invalida_se_rechaza(directorio_datos, script, argumentos):
+    resultado = ejecutar(script, *argumentos)
+    assert resultado.returncode == 1
+    assert '[X] Formato de fecha invalido' in resultado.stdout + resultado.stderr
+    assert 'HISTORICO' not in resultado.stdout
+
+
+def test_fecha_valida_filtra(directorio_datos):
+    resultado = ejecutar('consulta_bcv.py', 'moneda', 'USD', '--desde', '2025-10-13', '--formato', 'csv')
+    assert resultado.returncode == 0
+    assert resultado.stdout.splitlines()[1:] and all(
+        linea >= '2025-10-13' for linea in resultado.stdout.splitlines()[1:])
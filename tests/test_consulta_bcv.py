@@ -0,0 +1,95 @@
+"""Pruebas de ConsultaBCV: datos vigentes tras cambios en el CSV o el almacén"""
+
+import numpy as np
+import pytest
+
+from almacen_bcv import construir_almacen
+from consulta_bcv import ConsultaBCV
+from datos_bcv import ARCHIVO_CSV
+from extractor_bcv import ExtractorBCV
+
+
+FECHA = '2025-10-14'
+
+
+def corregir_tasa(df, fecha, moneda, compra, venta):
+    """Copia del consolidado con la tasa de una fecha y moneda reemplazada"""
+    df = df.copy()
+    fila = (df['fecha'] == fecha) & (df['moneda'] == moneda)
+    assert fila.sum() == 1
+    df.loc[fila, ['compra_bs', 'venta_bs']] = [compra, venta]
+    return df
+
+
+@pytest.fixture
+def consulta(directorio_datos):
+    return ConsultaBCV(ARCHIVO_CSV)
+
+
+@pytest.fixture
+def regenerar(consolidado):
+    """Reescribe el CSV y sus artefactos con la tasa USD de FECHA corregida"""
+    def regenerar():
+        ExtractorBCV().guardar_csv(corregir_tasa(consolidado, FECHA, 'USD', 999.0, 1001.0), ARCHIVO_CSV)
+    return regenerar
+
+
+def test_tasa_tras_cambio_de_datos(consulta, regenerar):
+    assert consulta.tasa(FECHA)['compra_bs'] == pytest.approx(196.752486)
+    regenerar()
+    assert consulta.tasa(FECHA) == {'pais': 'E.U.A.', 'compra_bs': 999.0, 'venta_bs': 1001.0,
+                                    'promedio_bs': 1000.0}
+
+
+@pytest.mark.parametrize('consultar', [
+    lambda c: c.tasa_vigente('2025-10-15')['compra_bs'],
+    lambda c: c.tasas_vigentes(['2025-10-15'])['compra_bs'].iloc[0],
+    lambda c: c.tasas_lote(['2025-10-15'], 'USD')['compra_bs'].iloc[0],
+    lambda c: c.datos_fecha(FECHA).set_index('moneda').loc['USD', 'compra_bs'],
+    lambda c: c.datos_moneda('USD', FECHA, FECHA)['compra_bs'].iloc[0],
+    lambda c: next(c.iterar_moneda('USD'))['compra_bs'],
+], ids=['tasa_vigente', 'tasas_vigentes', 'tasas_lote', 'datos_fecha', 'datos_moneda', 'iterar_moneda'])
+def test_cada_consulta_ve_los_datos_nuevos(consulta, regenerar, consultar):
+    # Primera consulta: llena los resultados en cache y las series memorizadas
+    assert consultar(consulta) == pytest.approx(196.752486)
+    regenerar()
+    # Sin ninguna otra llamada en medio que fuerce la recarga
+    assert consultar(consulta) == 999.0
+
+
+def test_cache_se_invalida_al_cambiar_los_datos(consulta, regenerar):
+    primera = consulta.datos_fecha(FECHA)
+    assert consulta.datos_fecha(FECHA).equals(primera)
+    assert consulta.estadisticas_cache()['aciertos'] == 1
+
+    regenerar()
+    nueva = consulta.datos_fecha(FECHA)
+    assert nueva.set_index('moneda').loc['USD', 'venta_bs'] == 1001.0
+    assert consulta.estadisticas_cache()['invalidaciones'] == 1
+
+
+def test_almacen_reemplazado_sin_cambiar_el_csv(consulta, consolidado):
+    assert consulta.almacen is not None
+    # Solo se reconstruye el .tasas (reemplazo atómico); el CSV queda igual
+    construir_almacen(corregir_tasa(consolidado, FECHA, 'USD', 500.0, 501.0), ARCHIVO_CSV)
+    assert consulta.tasa(FECHA)['compra_bs'] == 500.0
+
+
+def test_historico_de_moneda_son_vistas(consulta):
+    datos = consulta.datos_moneda('USD', '2025-03-01', '2025-03-31')
+    assert datos['fecha'].is_monotonic_decreasing
+    for columna in ('compra_bs', 'venta_bs'):
+        assert np.shares_memory(datos[columna].to_numpy(), consulta._columnas_moneda[columna])
+
+
+def test_tasa_vigente_reconstruye_las_series_tras_cambio(consulta, regenerar):
+    # Sábado: la tasa vigente es la del viernes 2025-10-10
+    assert consulta.tasa_vigente('2025-10-11')['fecha'] == '2025-10-10'
+    assert consulta.tasa_vigente('2025-10-15')['compra_bs'] == pytest.approx(196.752486)
+    anterior = consulta._series['USD']
+
+    regenerar()
+    vigente = consulta.tasa_vigente('2025-10-15')
+    assert vigente['fecha'] == FECHA and vigente['compra_bs'] == 999.0
+    assert consulta._series['USD'] is not anterior
+    assert list(consulta._series) == ['USD']
@@ -0,0 +1,60 @@
+"""Pruebas de la generación de JSON: la actualización incremental equivale a una completa"""
+
+import json
+
+import pytest
+
+from convertir_json import ARCHIVO_MANIFIESTO_JSON, ARCHIVOS_SALIDA, ConvertidorJSON
+from datos_bcv import ARCHIVO_CSV
+from extractor_bcv import ExtractorBCV
+
+
+def leer_salida(directorio):
+    """Archivos generados; del resumen se descarta la marca 'generado'"""
+    archivos = {}
+    for nombre in ARCHIVOS_SALIDA:
+        if nombre == ARCHIVO_MANIFIESTO_JSON:
+            continue
+        contenido = (directorio / nombre).read_bytes()
+        if nombre == 'tipos_cambio_resumen.json':
+            resumen = json.loads(contenido)
+            del resumen['metadata']['generado']
+            contenido = resumen
+        archivos[nombre] = contenido
+    return archivos
+
+
+def generar(directorio, df):
+    directorio.mkdir(exist_ok=True)
+    ExtractorBCV().guardar_csv(df, str(directorio / ARCHIVO_CSV))
+    ConvertidorJSON(str(directorio / ARCHIVO_CSV)).actualizar(str(directorio))
+
+
+@pytest.fixture
+def completa(tmp_path, consolidado):
+    generar(tmp_path / 'completa', consolidado)
+    return leer_salida(tmp_path / 'completa')
+
+
+@pytest.mark.parametrize('cortes', [['2025-10-01'], ['2025-07-01', '2025-09-15', '2025-10-14']])
+def test_incremental_igual_a_completa(tmp_path, consolidado, completa, capsys, cortes):
+    directorio = tmp_path / 'incremental'
+    for corte in cortes:
+        generar(directorio, consolidado[consolidado['fecha'] < corte])
+    capsys.readouterr()
+    generar(directorio, consolidado)
+
+    assert 'Actualizacion incremental' in capsys.readouterr().out
+    assert leer_salida(directorio) == completa
+
+
+def test_cambio_en_filas_previas_regenera_todo(tmp_path, consolidado, completa, capsys):
+    directorio = tmp_path / 'incremental'
+    df = consolidado.copy()
+    df.loc[0, 'compra_bs'] = 1.0
+    generar(directorio, df[df['fecha'] < '2025-10-01'])
+    capsys.readouterr()
+    generar(directorio, consolidado)
+
+    assert 'se regeneran todos los archivos' in capsys.readouterr().out
+    assert leer_salida(directorio) == completa
@@ -0,0 +1,38 @@
+"""Pruebas de la conversion de transacciones a bolivares"""
+
+import pytest
+
+from convertir_transacciones import ConversorTransacciones
+from datos_bcv import ARCHIVO_CSV
+
+
+TRANSACCIONES = (
+    "fecha,moneda,monto\n"
+    "2025-03-07,USD,10\n"
+    "marzo 8 2025,EUR,5\n"
+    "2025-03-07,XXX,1\n"
+)
+
+
+def test_convierte_con_tasa_vigente(directorio_datos):
+    (directorio_datos / 'entrada.csv').write_text(TRANSACCIONES, encoding='utf-8')
+    conversor = ConversorTransacciones(ARCHIVO_CSV)
+
+    assert conversor.convertir('entrada.csv', 'salida.csv', tamano_bloque=2) == (3, 1)
+    lineas = (directorio_datos / 'salida.csv').read_text(encoding='utf-8-sig').splitlines()
+    assert lineas[0] == 'fecha,moneda,monto,fecha_tasa,tasa_bs,monto_bs'
+    assert len(lineas) == 4
+    assert lineas[2].split(',')[3] == '2025-03-07'
+
+
+@pytest.mark.parametrize('opciones, faltante', [
+    ({}, 'moneda'),
+    ({'columna_moneda': 'divisa', 'columna_monto': 'importe'}, 'importe'),
+])
+def test_columna_faltante_no_crea_salida(directorio_datos, opciones, faltante):
+    (directorio_datos / 'entrada.csv').write_text("fecha,divisa,monto\n2025-03-07,USD,10\n", encoding='utf-8')
+    conversor = ConversorTransacciones(ARCHIVO_CSV, **opciones)
+
+    with pytest.raises(ValueError, match=f"Falta la columna '{faltante}'"):
+        conversor.convertir('entrada.csv', 'salida.csv')
+    assert not (directorio_datos / 'salida.csv').exists()
@@ -0,0 +1,112 @@
+"""Pruebas de los resumenes estadisticos combinables"""
+
+import numpy as np
+import pytest
+
+from consulta_usd import ConsultaUSD
+from datos_bcv import ARCHIVO_CSV
+from estadisticas_bcv import SERIES, EstadisticasTasas, ResumenSerie
+from extractor_bcv import ExtractorBCV
+
+
+def directo(df, moneda, serie, desde=None, hasta=None):
+    filas = df[df['moneda'] == moneda]
+    if desde:
+        filas = filas[filas['fecha'].str[:7] >= desde]
+    if hasta:
+        filas = filas[filas['fecha'].str[:7] <= hasta]
+    valores = (filas['compra_bs'] + filas['venta_bs']) / 2 if serie == 'promedio_bs' else filas[serie]
+    return valores.to_numpy(), filas['fecha'].to_numpy()
+
+
+def test_combinar_equivale_a_agregar():
+    valores = [(f'2025-01-{dia:02d}', float(dia) * 1.5) for dia in range(1, 21)]
+    todos, primera, segunda = ResumenSerie(), ResumenSerie(), ResumenSerie()
+    for numero, (fecha, valor) in enumerate(valores):
+        todos.agregar(fecha, valor)
+        (primera if numero < 7 else segunda).agregar(fecha, valor)
+
+    assert primera.combinar(segunda).a_dict() == todos.a_dict()
+    assert ResumenSerie().combinar(todos).a_dict() == todos.a_dict()
+
+
+def test_agregar_equivale_a_desde_dataframe(consolidado):
+    completas = EstadisticasTasas.desde_dataframe(consolidado)
+    previas = len(consolidado) - 300
+    incrementales = EstadisticasTasas.desde_dataframe(consolidado.iloc[:previas])
+    incrementales.agregar_filas(consolidado.iloc[previas:])
+    incrementales.firmar(consolidado)
+
+    assert incrementales.a_dict() == completas.a_dict()
+
+
+@pytest.mark.parametrize('moneda, desde, hasta', [
+    ('USD', None, None), ('USD', '2025-02', '2025-03'), ('EUR', '2025-05', None), ('CNY', None, '2025-01'),
+])
+@pytest.mark.parametrize('serie', SERIES)
+def test_resumen_de_rango(consolidado, moneda, serie, desde, hasta):
+    resumen = EstadisticasTasas.desde_dataframe(consolidado).resumen(moneda, serie, desde, hasta)
+    valores, fechas = directo(consolidado, moneda, serie, desde, hasta)
+
+    assert resumen.registros == len(valores)
+    assert resumen.promedio == pytest.approx(valores.mean())
+    assert resumen.desviacion == pytest.approx(valores.std())
+    assert (resumen.minimo, resumen.maximo) == (valores.min(), valores.max())
+    assert (resumen.primera_fecha, resumen.ultima_fecha) == (fechas.min(), fechas.max())
+
+
+def test_por_moneda(consolidado):
+    stats = EstadisticasTasas.desde_dataframe(consolidado).por_moneda()
+    assert set(stats) == set(consolidado['moneda'])
+    compra, _ = directo(consolidado, 'EUR', 'compra_bs')
+    assert stats['EUR']['registros'] == len(compra)
+    assert stats['EUR']['compra_promedio'] == float(np.round(compra.mean(), 2))
+    assert stats['EUR']['compra_max'] == float(np.round(compra.max(), 2))
+
+
+def test_guardar_y_cargar(directorio_datos, consolidado):
+    estadisticas = EstadisticasTasas.desde_dataframe(consolidado)
+    estadisticas.guardar()
+    assert EstadisticasTasas.cargar().a_dict() == estadisticas.a_dict()
+
+
+def test_consulta_usd_usa_el_archivo_vigente(directorio_datos, consolidado):
+    EstadisticasTasas.desde_dataframe(consolidado).guardar()
+    # El archivo tiene todas las monedas; los resumenes recalculados solo USD
+    assert 'EUR' in ConsultaUSD().estadisticas().monedas
+
+
+def test_consulta_usd_recalcula_con_archivo_desactualizado(directorio_datos, consolidado):
+    EstadisticasTasas.desde_dataframe(consolidado).guardar()
+
+    # Misma cantidad de fechas, misma primera y ultima: solo cambia una tasa intermedia
+    df = consolidado.copy()
+    fila = (df['fecha'] == '2025-05-02') & (df['moneda'] == 'USD')
+    assert fila.sum() == 1
+    df.loc[fila, ['compra_bs', 'venta_bs']] = [999.0, 1001.0]
+    ExtractorBCV().guardar_csv(df, ARCHIVO_CSV)
+
+    estadisticas = ConsultaUSD().estadisticas()
+    assert list(estadisticas.monedas) == ['USD']
+    assert estadisticas.resumen('USD', 'promedio_bs').maximo == 1000.0
+
+
+@pytest.mark.parametrize('desde, hasta, ampliado', [
+    ('2025-02', '2025-03', False),
+    ('febrero 1 2025', '2025-03-31', False),
+    ('2025-02', 'marzo 5 2025', True),
+    ('2025-02-10', None, True),
+])
+def test_aviso_de_rango_ampliado(directorio_datos, capsys, desde, hasta, ampliado):
+    consulta = ConsultaUSD()
+    capsys.readouterr()
+
+    promedio = consulta.mostrar_estadisticas(desde, hasta)
+    salida = capsys.readouterr().out
+    assert promedio.primera_fecha[:7] == '2025-02'
+    assert ('rango ampliado a 2025-02 - ' in salida) == ampliado
+
+
+def test_fecha_invalida_en_rango(directorio_datos, capsys):
+    assert ConsultaUSD().mostrar_estadisticas('no es fecha') is None
+    assert '[X] Formato de fecha invalido' in capsys.readouterr().out
@@ -0,0 +1,63 @@
+"""Pruebas del extractor: todos los modos producen el mismo consolidado"""
+
+import shutil
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from almacen_bcv import AlmacenTasas, ruta_almacen
+from conftest import RAIZ
+from datos_bcv import ARCHIVO_CSV, cargar_columnar, firma_csv, ruta_columnar
+from extractor_bcv import ARCHIVO_MANIFIESTO
+
+
+def extraer(*opciones):
+    resultado = subprocess.run([sys.executable, str(RAIZ / 'extractor_bcv.py'), *opciones],
+                               capture_output=True, text=True, encoding='utf-8')
+    assert resultado.returncode == 0, resultado.stderr
+
+
+def leer_csv(directorio):
+    """
+    Bytes del CSV consolidado, tras verificar que el .npz y el .tasas
+    corresponden a él (llevan su firma, así que no se comparan byte a byte)
+    """
+    columnar = cargar_columnar(ruta_columnar(), firma_esperada=firma_csv(ARCHIVO_CSV))
+    assert columnar is not None
+    pd.testing.assert_frame_equal(columnar, pd.read_csv(ARCHIVO_CSV, encoding='utf-8-sig'))
+    with AlmacenTasas.abrir_vigente() as almacen:
+        assert almacen is not None
+    return (directorio / ARCHIVO_CSV).read_bytes()
+
+
+@pytest.fixture
+def serial(directorio_xls):
+    """CSV de una extracción serial completa (la referencia)"""
+    extraer()
+    return leer_csv(directorio_xls)
+
+
+@pytest.mark.parametrize('opciones', [['--procesos', '2'], ['--flujo'], ['--incremental']])
+def test_modos_identicos_al_serial(directorio_xls, serial, opciones):
+    # Cada modo parte de cero (--incremental sin manifiesto extrae todo)
+    for nombre in (ARCHIVO_CSV, ruta_columnar(), ruta_almacen(), ARCHIVO_MANIFIESTO):
+        (directorio_xls / nombre).unlink()
+    extraer(*opciones)
+    assert leer_csv(directorio_xls) == serial
+
+
+def test_incremental_con_archivo_nuevo(directorio_xls, serial):
+    reservado = directorio_xls / '2_1_2d25_smc.xls'
+    shutil.move(directorio_xls / 'Data_xls' / reservado.name, reservado)
+    extraer('--incremental')
+    assert leer_csv(directorio_xls) != serial
+
+    shutil.move(reservado, directorio_xls / 'Data_xls' / reservado.name)
+    extraer('--incremental')
+    assert leer_csv(directorio_xls) == serial
+
+    # Sin cambios no se reescribe nada
+    extraer('--incremental')
+    assert leer_csv(directorio_xls) == serial
@@ -0,0 +1,92 @@
+"""Pruebas de la interpretación de fechas y de las políticas de tasa vigente"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fechas_bcv import IndiceFechas, SerieTasas, normalizar_fecha
+
+
+# Publicaciones: jueves 6, viernes 7 y lunes 10 de marzo de 2025
+FECHAS = ['2025-03-10', '2025-03-06', '2025-03-07']
+COMPRA = [3.0, 1.0, 2.0]
+
+
+@pytest.fixture
+def serie():
+    return SerieTasas(FECHAS, COMPRA, [c + 0.5 for c in COMPRA], 'E.U.A.')
+
+
+@pytest.mark.parametrize('texto', [
+    '2025-03-08', '2025/03/08', '08/03/2025', '08-03-2025', 'marzo 8 2025', 'mar. 8, 2025',
+    '8 de marzo de 2025', '2025-03-08 10:30',
+])
+def test_normalizar_fecha(texto):
+    assert normalizar_fecha(texto) == '2025-03-08'
+
+
+@pytest.mark.parametrize('texto', ['', 'xx', '2025-02-30', 'marzo 40 2025', None, 20250308])
+def test_normalizar_fecha_invalida(texto):
+    assert normalizar_fecha(texto) is None
+
+
+@pytest.mark.parametrize('consulta, politica, esperada', [
+    # Fin de semana entre el viernes 7 y el lunes 10
+    ('2025-03-08', 'anterior', '2025-03-07'),
+    ('2025-03-08', 'siguiente', '2025-03-10'),
+    ('2025-03-08', 'cercana', '2025-03-07'),
+    ('2025-03-09', 'cercana', '2025-03-10'),
+    ('2025-03-08', 'estricta', None),
+    # Fecha publicada: todas las políticas la usan
+    ('2025-03-07', 'anterior', '2025-03-07'),
+    ('2025-03-07', 'siguiente', '2025-03-07'),
+    ('2025-03-07', 'estricta', '2025-03-07'),
+    # Fuera del rango publicado
+    ('2025-03-01', 'anterior', None),
+    ('2025-03-01', 'siguiente', '2025-03-06'),
+    ('2025-03-20', 'siguiente', None),
+    ('2025-03-20', 'cercana', '2025-03-10'),
+])
+def test_politicas_de_tasa_vigente(serie, consulta, politica, esperada):
+    vigente = serie.vigente(consulta, politica)
+    assert (vigente and vigente['fecha']) == esperada
+
+
+@pytest.mark.parametrize('politica', ['anterior', 'siguiente', 'cercana', 'estricta'])
+def test_vigentes_coincide_con_vigente(serie, politica):
+    consultas = ['2025-03-01', '2025-03-06', '2025-03-08', '2025-03-09', '2025-03-10', '2025-03-20']
+    lote = serie.vigentes(consultas, politica)
+
+    for fila, consulta in zip(lote.itertuples(), consultas):
+        vigente = serie.vigente(consulta, politica)
+        if vigente is None:
+            assert pd.isna(fila.fecha) and np.isnan(fila.compra_bs)
+        else:
+            assert (fila.fecha, fila.compra_bs) == (vigente['fecha'], vigente['compra_bs'])
+
+
+def test_vigentes_acepta_cualquier_formato(serie):
+    lote = serie.vigentes(['marzo 8 2025', '08/03/2025', 'xx', None])
+    assert lote['fecha'].iloc[:2].tolist() == ['2025-03-07', '2025-03-07']
+    assert lote['fecha'].iloc[2:].isna().all()
+    assert lote['compra_bs'].iloc[:2].tolist() == [2.0, 2.0]
+    assert lote['compra_bs'].iloc[2:].isna().all()
+
+
+def test_politica_invalida(serie):
+    with pytest.raises(ValueError):
+        serie.vigente('2025-03-08', 'ultima')
+
+
+def test_fecha_repetida_conserva_el_ultimo_registro():
+    serie = SerieTasas(['2025-03-07', '2025-03-07'], [1.0, 2.0], [1.0, 2.0])
+    assert serie.vigente('2025-03-07')['compra_bs'] == 2.0
+
+
+def test_indice_fechas_cercanas():
+    indice = IndiceFechas(FECHAS)
+    assert indice.anterior('2025-03-09') == '2025-03-07'
+    assert indice.siguiente('2025-03-09') == '2025-03-10'
+    # Ante empate (a 2 días) va primero la anterior
+    assert indice.cercanas('2025-03-08', 3) == [('2025-03-07', -1), ('2025-03-06', -2), ('2025-03-10', 2)]
+    assert '2025-03-07' in indice and '2025-03-08' not in indice
@@ -0,0 +1,195 @@
+"""
+Vigilante del directorio Data_xls
+Detecta archivos Excel nuevos o modificados del BCV y regenera los datos
+consolidados, los JSON y las exportaciones USD sin intervencion manual
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from convertir_json import ARCHIVOS_SALIDA, ConvertidorJSON
+from extractor_bcv import ARCHIVO_MANIFIESTO, ExtractorBCV
+
+
+ARCHIVO_CSV = 'tipos_cambio_bcv_consolidado.csv'
+
+# Revisiones seguidas en que se reintenta un archivo ilegible antes de omitirlo
+INTENTOS_MAXIMOS = 3
+
+
+class VigilanteBCV:
+    def __init__(self, directorio_data='Data_xls', directorio_salida='.', intervalo=5):
+        self.directorio_data = directorio_data
+        self.directorio_salida = directorio_salida
+        self.intervalo = intervalo
+        self.ultima_vista = None
+        self.ultima_procesada = None
+        # Archivos que fallaron: {nombre: {'estado', 'intentos', 'error'}}
+        self.fallidos = {}
+
+    def instantanea(self):
+        """Tamaño y fecha de modificación de cada .xls del directorio"""
+        estado = {}
+        for archivo in Path(self.directorio_data).glob('*.xls'):
+            try:
+                info = archivo.stat()
+            except FileNotFoundError:
+                continue
+            estado[archivo.name] = (info.st_size, info.st_mtime)
+        return estado
+
+    def revisar(self):
+        """
+        Revisa el directorio una vez. Un cambio se procesa cuando el
+        directorio queda estable entre dos revisiones (archivos ya copiados).
+        Los archivos que fallaron se reintentan en las revisiones siguientes
+        hasta INTENTOS_MAXIMOS veces.
+        Retorna True si se publicaron artefactos nuevos.
+        """
+        actual = self.instantanea()
+        estable = actual == self.ultima_vista
+        self.ultima_vista = actual
+
+        if actual == self.ultima_procesada and not self.reintentables(actual):
+            return False
+
+        # Primera revisión: procesar directamente (el extractor detecta si no hay cambios)
+        if not estable and self.ultima_procesada is not None:
+            print(f"[*] Cambios detectados en {self.directorio_data}, esperando a que se estabilicen...")
+            return False
+
+        publicado = self.actualizar()
+        self.ultima_procesada = actual
+        return publicado
+
+    def actualizar(self):
+        """
+        Extrae solo las hojas nuevas o modificadas y, si hubo cambios,
+        actualiza los artefactos en un directorio temporal antes de
+        publicarlos. Retorna True si se publicaron artefactos nuevos.
+        """
+        inicio = time.perf_counter()
+        ruta_csv = os.path.join(self.directorio_salida, ARCHIVO_CSV)
+        ruta_manifiesto = os.path.join(self.directorio_salida, ARCHIVO_MANIFIESTO)
+
+        estado = self.instantanea()
+        omitir = set(self.fallidos) - self.reintentables(estado)
+
+        extractor = ExtractorBCV(self.directorio_data)
+        df, hubo_cambios = extractor.procesar_incremental(ruta_csv, ruta_manifiesto, omitir)
+        self.registrar_errores(extractor.errores, estado, omitir)
+
+        if df is None or not hubo_cambios:
+            return False
+
+        temporal = tempfile.mkdtemp(prefix='.publicando_', dir=self.directorio_salida)
+        try:
+            extractor.guardar_csv(df, os.path.join(temporal, ARCHIVO_CSV))
+
+            # Se parte de los JSON publicados: si solo llegaron fechas nuevas,
+            # se les agregan en lugar de regenerarlos (incluidas las exportaciones USD)
+            for nombre in ARCHIVOS_SALIDA:
+                publicado = os.path.join(self.directorio_salida, nombre)
+                if os.path.exists(publicado):
+                    shutil.copy2(publicado, temporal)
+
+            conversor = ConvertidorJSON(os.path.join(temporal, ARCHIVO_CSV))
+            conversor.actualizar(temporal)
+
+            # El manifiesto se publica al final: si algo falla antes, la
+            # siguiente revisión vuelve a procesar los mismos cambios
+            extractor.guardar_manifiesto(os.path.join(temporal, ARCHIVO_MANIFIESTO))
+            self.publicar(temporal, ruta_manifiesto)
+        finally:
+            shutil.rmtree(temporal, ignore_errors=True)
+
+        print(f"\n[OK] Artefactos publicados en {time.perf_counter() - inicio:.2f} s "
+              f"(ultima fecha: {df['fecha'].max()})")
+        return True
+
+    def reintentables(self, estado):
+        """
+        Archivos fallidos que se vuelven a intentar: los que cambiaron desde
+        el último error o no llegaron aún a INTENTOS_MAXIMOS
+        """
+        return {
+            nombre for nombre, fallo in self.fallidos.items()
+            if estado.get(nombre) != fallo['estado'] or fallo['intentos'] < INTENTOS_MAXIMOS
+        }
+
+    def registrar_errores(self, errores, estado, omitir):
+        """
+        Actualiza los archivos fallidos con el resultado de una extracción y
+        los informa. Un archivo sale de la lista al procesarse bien o al
+        desaparecer del directorio.
+        """
+        for nombre in list(self.fallidos):
+            if nombre not in estado or (nombre not in errores and nombre not in omitir):
+                del self.fallidos[nombre]
+
+        for nombre, error in errores.items():
+            previo = self.fallidos.get(nombre)
+            mismo = previo is not None and previo['estado'] == estado.get(nombre)
+            self.fallidos[nombre] = {
+                'estado': estado.get(nombre),
+                'intentos': previo['intentos'] + 1 if mismo else 1,
+                'error': error
+            }
+
+        if self.fallidos:
+            print(f"\n[!] Archivos con errores ({len(self.fallidos)}):")
+            for nombre, fallo in sorted(self.fallidos.items()):
+                nota = ('se omite hasta que cambie' if fallo['intentos'] >= INTENTOS_MAXIMOS
+                        else f"intento {fallo['intentos']} de {INTENTOS_MAXIMOS}")
+                print(f"    {nombre}: {fallo['error']} ({nota})")
+
+    def publicar(self, temporal, ruta_manifiesto):
+        """Mueve los archivos generados a su destino con reemplazos atómicos"""
+        nombres = sorted(n for n in os.listdir(temporal) if n != ARCHIVO_MANIFIESTO)
+
+        for nombre in nombres:
+            os.replace(os.path.join(temporal, nombre), os.path.join(self.directorio_salida, nombre))
+
+        os.replace(os.path.join(temporal, ARCHIVO_MANIFIESTO), ruta_manifiesto)
+
+    def ejecutar(self):
+        """Revisa el directorio cada `intervalo` segundos hasta Ctrl+C"""
+        print(f">> Vigilando {self.directorio_data} cada {self.intervalo} s (Ctrl+C para salir)\n")
+
+        try:
+            while True:
+                try:
+                    self.revisar()
+                except Exception as e:
+                    # Se reintenta en la siguiente revisión
+                    print(f"[X] Error actualizando artefactos: {e}")
+                    self.ultima_procesada = None
+                time.sleep(self.intervalo)
+        except KeyboardInterrupt:
+            print("\n[*] Saliendo...\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vigila Data_xls y regenera los artefactos del BCV')
+    parser.add_argument('--directorio', default='Data_xls',
+                        help='Directorio con los archivos Excel (default: Data_xls)')
+    parser.add_argument('--intervalo', type=float, default=5,
+                        help='Segundos entre revisiones (default: 5)')
+    parser.add_argument('--una-vez', action='store_true',
+                        help='Revisar una sola vez y salir')
+    args = parser.parse_args()
+
+    vigilante = VigilanteBCV(args.directorio, intervalo=args.intervalo)
+
+    if args.una_vez:
+        vigilante.revisar()
+    else:
+        vigilante.ejecutar()
+
+
+if __name__ == "__main__":
+    main()